@@ -0,0 +1,120 @@
+"""
+Read throughput of the API queries while the ETL is writing.
+
+A writer thread inserts matches with one commit per row, like `main.py`,
+while reader threads run the top-N query used by `/candidates/{id}/top_matches`.
+The same workload runs against a default `create_engine` and against the
+engine from `src.database.create_db_engine` (WAL, synchronous=NORMAL, ...).
+
+    python -m benchmarks.bench_database --duration 5 --readers 4
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, text
+from src.database import create_db_engine
+
+SCHEMA = [
+    "CREATE TABLE jobs (id INTEGER PRIMARY KEY, title VARCHAR, company VARCHAR, location VARCHAR, description VARCHAR)",
+    "CREATE TABLE matches (id INTEGER PRIMARY KEY, job_id INTEGER, candidate_id INTEGER, score INTEGER)",
+    "CREATE INDEX ix_matches_candidate_id_score ON matches (candidate_id, score DESC)",
+]
+TOP_MATCHES_QUERY = text(
+    "SELECT jobs.id, jobs.title, matches.score FROM jobs JOIN matches ON matches.job_id = jobs.id "
+    "WHERE matches.candidate_id = :candidate_id ORDER BY matches.score DESC LIMIT 10"
+)
+
+def seed(engine, jobs: int, candidates: int):
+    with engine.begin() as connection:
+        for statement in SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(
+            text("INSERT INTO jobs (id, title, company, location, description) VALUES (:id, :title, 'Comp', 'Paris', 'Desc')"),
+            [{"id": job_id, "title": f"Job {job_id}"} for job_id in range(1, jobs + 1)],
+        )
+        connection.execute(
+            text("INSERT INTO matches (job_id, candidate_id, score) VALUES (:job_id, :candidate_id, :score)"),
+            [
+                {"job_id": job_id, "candidate_id": candidate_id, "score": (job_id * 31 + candidate_id * 17) % 101}
+                for job_id in range(1, jobs + 1)
+                for candidate_id in range(1, candidates + 1)
+            ],
+        )
+
+def run(engine, duration: float, readers: int, candidates: int):
+    stop = threading.Event()
+    latencies = [[] for _ in range(readers)]
+    errors = [0] * readers
+    writes = [0]
+
+    def writer():
+        candidate_id = candidates + 1
+        while not stop.is_set():
+            # One transaction per row, as the ETL does
+            with engine.begin() as connection:
+                connection.execute(
+                    text("INSERT INTO matches (job_id, candidate_id, score) VALUES (1, :candidate_id, 50)"),
+                    {"candidate_id": candidate_id},
+                )
+            writes[0] += 1
+            candidate_id += 1
+
+    def reader(index: int):
+        candidate_id = index
+        while not stop.is_set():
+            candidate_id = candidate_id % candidates + 1
+            started = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(TOP_MATCHES_QUERY, {"candidate_id": candidate_id}).all()
+            except Exception:
+                errors[index] += 1
+                continue
+            latencies[index].append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    samples = sorted(latency for reader_latencies in latencies for latency in reader_latencies)
+    return {
+        "reads_per_s": len(samples) / duration,
+        "writes_per_s": writes[0] / duration,
+        "p50_ms": statistics.median(samples) * 1000 if samples else float("nan"),
+        "p99_ms": samples[int(len(samples) * 0.99) - 1] * 1000 if samples else float("nan"),
+        "errors": sum(errors),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark reads against SQLite while the ETL writes.")
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--candidates", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    profiles = {
+        "default": lambda url: create_engine(url),
+        "tuned": lambda url: create_db_engine(url),
+    }
+    print(f"{'engine':<10}{'reads/s':>12}{'writes/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, make_engine in profiles.items():
+        with tempfile.TemporaryDirectory() as directory:
+            engine = make_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+            seed(engine, args.jobs, args.candidates)
+            result = run(engine, args.duration, args.readers, args.candidates)
+            engine.dispose()
+        print(
+            f"{name:<10}{result['reads_per_s']:>12.0f}{result['writes_per_s']:>12.0f}"
+            f"{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}{result['errors']:>8}"
+        )
+
+if __name__ == "__main__":
+    main()
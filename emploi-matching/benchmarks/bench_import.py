@@ -0,0 +1,94 @@
+"""
+Cold import time of the API module, checked against a budget.
+
+Each run imports `src.api` in a fresh interpreter, so nothing is cached in
+`sys.modules`. The script fails (exit code 1) when the median import time
+exceeds the budget, or when a dependency that must be loaded lazily shows
+up at import.
+
+    python -m benchmarks.bench_import --runs 5 --budget-ms 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Loaded on first use only: PDF parsing, the synchronous HTTP path, MLflow, the ETL and the columnar snapshot
+LAZY_MODULES = ("mlflow", "PyPDF2", "requests", "pandas", "pymongo", "numpy", "pyarrow")
+
+IMPORT_SCRIPT = f"""
+import json, sys, time
+started = time.perf_counter()
+import src.api
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "loaded": [name for name in {LAZY_MODULES!r} if name in sys.modules]}}))
+"""
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+def measure(runs: int, cwd: str):
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+def slowest_imports(cwd: str, top: int):
+    """
+    Returns the slowest first-level imports of `src.api`, from `python -X importtime`.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import src.api"],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Direct imports of src.api are indented by three spaces in the report
+        if len(name) - len(name.lstrip()) == 3:
+            rows.append((int(cumulative) / 1000, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import time of src.api against a budget.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest imports to show.")
+    args = parser.parse_args(argv)
+
+    cwd = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = measure(args.runs, cwd)
+    median_ms = statistics.median(result["seconds"] for result in results) * 1000
+    loaded = sorted({name for result in results for name in result["loaded"]})
+
+    print(f"import src.api: median {median_ms:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print("Slowest direct imports:")
+    for cumulative_ms, name in slowest_imports(cwd, args.top):
+        print(f"  {cumulative_ms:8.1f} ms  {name}")
+
+    failed = False
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time is over budget by {median_ms - args.budget_ms:.0f} ms")
+        failed = True
+    if loaded:
+        print(f"FAIL: modules that should load lazily were imported: {', '.join(loaded)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Rows per second encoded to a JSON body by the different list endpoint paths.
+
+- models: one Pydantic model built per row, then validated again against
+  `List[Job]` and encoded, as the list endpoints used to do;
+- response_model: row dictionaries validated and encoded by Pydantic, as
+  FastAPI does when an endpoint returns plain data with a `response_model`;
+- fast: row dictionaries encoded directly by `src.serialization.dumps` (orjson).
+
+    python -m benchmarks.bench_serialization --rows 10000 --repeat 5
+"""
+import argparse
+import time
+from typing import List
+from pydantic import BaseModel, TypeAdapter
+from src.serialization import dumps
+
+class Job(BaseModel):
+    # Same fields as api.Job; defined here so the benchmark does not import the API
+    id: int
+    title: str
+    company: str
+    location: str
+    description: str
+
+JOB_LIST = TypeAdapter(List[Job])
+
+def make_rows(count: int):
+    return [
+        {
+            "id": job_id,
+            "title": f"Développeur Python {job_id}",
+            "company": f"Entreprise {job_id % 50}",
+            "location": "Paris",
+            "description": "Conception et développement d'API REST, SQL, Docker. " * 4,
+        }
+        for job_id in range(1, count + 1)
+    ]
+
+def encode_with_models(rows) -> bytes:
+    jobs = [Job(id=row["id"], title=row["title"], company=row["company"], location=row["location"], description=row["description"]) for row in rows]
+    return JOB_LIST.dump_json(JOB_LIST.validate_python(jobs))
+
+def encode_with_response_model(rows) -> bytes:
+    return JOB_LIST.dump_json(JOB_LIST.validate_python(rows))
+
+def encode_fast(rows) -> bytes:
+    return dumps(rows)
+
+PATHS = {
+    "models": encode_with_models,
+    "response_model": encode_with_response_model,
+    "fast": encode_fast,
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare JSON encoding paths for list endpoints.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rows = make_rows(args.rows)
+    results = {}
+    for name, encode in PATHS.items():
+        encode(rows) # Warm up
+        best = float("inf")
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            body = encode(rows)
+            best = min(best, time.perf_counter() - started)
+        results[name] = (args.rows / best, len(body))
+
+    baseline = results["models"][0]
+    print(f"{'path':<16}{'rows/s':>14}{'speedup':>10}{'body bytes':>14}")
+    for name, (rows_per_second, size) in results.items():
+        print(f"{name:<16}{rows_per_second:>14,.0f}{rows_per_second / baseline:>9.1f}x{size:>14,}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+HTTP load generator for the API, with per-endpoint latency percentiles.
+
+Traffic is a weighted mix of four endpoints: `/jobs/`,
+`/ai_smartjob/recommendations/{nom}`, and the two CV uploads
+(`recommend_from_cv`, `extract_skills_from_cv`) sending a sample PDF
+(`dummy_cv.pdf` at the repository root, or a generated one).
+
+Two traffic models:
+- closed loop (`--concurrency N`): N clients each send a request as soon as
+  the previous one completed; the result is the sustainable throughput;
+- open loop (`--rate R`): requests start at R per second whatever the
+  response times, and latency is measured from the scheduled start, so
+  queueing in the API is not hidden (no coordinated omission).
+
+Either run against an instance that is already up, after seeding its
+database the way the test fixtures do:
+
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --seed-database sqlite:///emploi.db
+
+or let the tool start a mock Ollama and the API on a temporary seeded database:
+
+    python -m benchmarks.load_test --spawn --concurrency 16 --duration 30
+    python -m benchmarks.load_test --spawn --rate 50 --duration 30 --mix jobs=1,extract_skills=1 --json load.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from benchmarks import synthetic
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PDF = os.path.join(os.path.dirname(PROJECT_DIR), "dummy_cv.pdf")
+DEFAULT_MIX = "jobs=6,recommendations=2,recommend_from_cv=1,extract_skills=1"
+HISTOGRAM_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+PERCENTILES = (50, 95, 99)
+
+def seed_database(database_url: str, username: str, password: str, jobs: int, candidates: int):
+    """
+    Seeds the admin and load test users and synthetic jobs and candidates,
+    like the benchmark suite. Existing rows are kept.
+    """
+    from src import api
+    from src.database import create_db_engine
+
+    engine = create_db_engine(database_url)
+    synthetic.seed_database(
+        engine, synthetic.make_jobs(jobs), synthetic.make_candidates(candidates),
+        users=[("admin", "admin"), (username, password)],
+    )
+    with engine.connect() as connection:
+        candidate_names = list(connection.execute(api.CandidateDB.__table__.select().with_only_columns(api.CandidateDB.nom).limit(1000)).scalars())
+    # A running API sees the new jobs through the catalog signature (row count and max id)
+    engine.dispose()
+    return candidate_names
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_up(url: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout:.0f} s")
+
+@contextlib.contextmanager
+def spawned_stack(database_url: str, args):
+    """
+    Starts the mock Ollama and the API (uvicorn) as subprocesses on free ports.
+    """
+    ollama_port, api_port = free_port(), free_port()
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url,
+        "OLLAMA_API_URL": f"http://127.0.0.1:{ollama_port}/api/generate",
+        "MLFLOW_SAMPLE_RATE": "0",
+    }
+    # The servers' own output would interleave with the report
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-m", "src.mock_ollama", "--port", str(ollama_port),
+             "--latency-ms", str(args.llm_latency_ms), "--tokens-per-second", str(args.llm_tokens_per_second)],
+            cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL,
+        ),
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "src.api:app", "--port", str(api_port), "--log-level", "warning",
+             "--workers", str(args.api_workers)],
+            cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL,
+        ),
+    ]
+    try:
+        url = f"http://127.0.0.1:{api_port}"
+        wait_until_up(f"http://127.0.0.1:{ollama_port}/mock/config")
+        wait_until_up(f"{url}/metrics")
+        yield url
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait(timeout=30)
+
+class Endpoint:
+    def __init__(self, name: str, send):
+        self.name = name
+        self.send = send
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+
+    def record(self, latency: float, status):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not (isinstance(status, int) and status < 400):
+            self.errors += 1
+
+def build_endpoints(pdf: bytes, candidate_names):
+    rng = random.Random(0)
+
+    async def jobs(client):
+        return await client.get("/jobs/", params={"limit": 100, "include_total": "false"})
+
+    async def recommendations(client):
+        return await client.get(f"/ai_smartjob/recommendations/{rng.choice(candidate_names)}")
+
+    async def recommend_from_cv(client):
+        return await client.post("/ai_smartjob/recommend_from_cv/", files={"fichier_cv": ("cv.pdf", pdf, "application/pdf")})
+
+    async def extract_skills(client):
+        return await client.post("/ai_smartjob/extract_skills_from_cv/", files={"fichier_cv": ("cv.pdf", pdf, "application/pdf")})
+
+    return {function.__name__: Endpoint(function.__name__, function) for function in (jobs, recommendations, recommend_from_cv, extract_skills)}
+
+def parse_mix(mix: str, endpoints):
+    weights = {}
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in endpoints:
+            raise ValueError(f"unknown endpoint '{name}' in --mix (choose from {', '.join(endpoints)})")
+        weights[name] = float(weight or 1)
+    return [endpoints[name] for name in weights], list(weights.values())
+
+async def call(client, endpoint: Endpoint, scheduled: float):
+    try:
+        response = await endpoint.send(client)
+        status = response.status_code
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    endpoint.record(time.perf_counter() - scheduled, status)
+
+async def closed_loop(client, choices, weights, concurrency: int, duration: float):
+    rng = random.Random(1)
+    deadline = time.perf_counter() + duration
+
+    async def user():
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(choices, weights)[0]
+            await call(client, endpoint, time.perf_counter())
+
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    return 0
+
+async def open_loop(client, choices, weights, rate: float, duration: float, max_in_flight: int):
+    """
+    Starts requests at Poisson arrival times. Arrivals beyond `max_in_flight`
+    are dropped and counted, rather than queued in the generator.
+    """
+    rng = random.Random(1)
+    started = time.perf_counter()
+    next_arrival = started
+    in_flight = set()
+    dropped = 0
+    while next_arrival < started + duration:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        endpoint = rng.choices(choices, weights)[0]
+        if len(in_flight) >= max_in_flight:
+            dropped += 1
+        else:
+            task = asyncio.create_task(call(client, endpoint, next_arrival))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        next_arrival += rng.expovariate(rate)
+    if in_flight:
+        await asyncio.wait(in_flight)
+    return dropped
+
+def percentile(sorted_values, percent: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def histogram(latencies_ms):
+    counts = [0] * (len(HISTOGRAM_BUCKETS_MS) + 1)
+    for latency in latencies_ms:
+        for index, bound in enumerate(HISTOGRAM_BUCKETS_MS):
+            if latency <= bound:
+                counts[index] += 1
+                break
+        else:
+            counts[-1] += 1
+    labels = [f"<= {bound} ms" for bound in HISTOGRAM_BUCKETS_MS] + [f"> {HISTOGRAM_BUCKETS_MS[-1]} ms"]
+    return dict(zip(labels, counts))
+
+def summarize(endpoints, elapsed: float, dropped: int):
+    report = {"elapsed_seconds": elapsed, "dropped": dropped, "endpoints": {}}
+    for endpoint in endpoints:
+        if not endpoint.latencies:
+            continue
+        latencies_ms = sorted(latency * 1000 for latency in endpoint.latencies)
+        count = len(latencies_ms)
+        report["endpoints"][endpoint.name] = {
+            "requests": count,
+            "throughput_rps": count / elapsed,
+            "error_rate": endpoint.errors / count,
+            "statuses": {str(status): number for status, number in sorted(endpoint.statuses.items(), key=str)},
+            "latency_ms": {
+                **{f"p{percent}": percentile(latencies_ms, percent) for percent in PERCENTILES},
+                "mean": sum(latencies_ms) / count,
+                "max": latencies_ms[-1],
+            },
+            "histogram": histogram(latencies_ms),
+        }
+    return report
+
+def print_report(report):
+    print(f"\n{'endpoint':<20}{'requests':>9}{'req/s':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}  statuses")
+    for name, stats in report["endpoints"].items():
+        latency = stats["latency_ms"]
+        statuses = " ".join(f"{status}:{count}" for status, count in stats["statuses"].items())
+        print(
+            f"{name:<20}{stats['requests']:>9}{stats['throughput_rps']:>9.1f}{stats['error_rate']:>8.1%}"
+            f"{latency['p50']:>9.1f}{latency['p95']:>9.1f}{latency['p99']:>9.1f}{latency['max']:>9.1f}  {statuses}"
+        )
+    for name, stats in report["endpoints"].items():
+        print(f"\n{name} latency histogram")
+        widest = max(stats["histogram"].values()) or 1
+        for label, count in stats["histogram"].items():
+            if count:
+                print(f"  {label:>12} {count:>7} {'#' * max(1, round(40 * count / widest))}")
+    if report["dropped"]:
+        print(f"\n{report['dropped']} arrivals dropped (more than --max-in-flight requests pending)")
+
+async def run_load(url: str, args, candidate_names, pdf: bytes):
+    endpoints = build_endpoints(pdf, candidate_names or ["Candidat 1"])
+    choices, weights = parse_mix(args.mix, endpoints)
+    limits = httpx.Limits(max_connections=max(args.concurrency, args.max_in_flight))
+    async with httpx.AsyncClient(base_url=url, auth=(args.user, args.password), timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        if args.rate:
+            dropped = await open_loop(client, choices, weights, args.rate, args.duration, args.max_in_flight)
+        else:
+            dropped = await closed_loop(client, choices, weights, args.concurrency, args.duration)
+        elapsed = time.perf_counter() - started
+    return summarize(endpoints.values(), elapsed, dropped)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the API and report per-endpoint latency percentiles.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running API.")
+    target.add_argument("--spawn", action="store_true", help="Start a mock Ollama and the API on a temporary seeded database.")
+    parser.add_argument("--seed-database", help="With --url: database URL of the running API, seeded before the run.")
+    parser.add_argument("--user", default="loadtest")
+    parser.add_argument("--password", default="loadtest")
+    parser.add_argument("--jobs", type=int, default=1000, help="Jobs seeded in the catalog.")
+    parser.add_argument("--candidates", type=int, default=1000, help="Candidates seeded.")
+    parser.add_argument("--pdf", default=SAMPLE_PDF, help="CV uploaded by the CV endpoints (a generated one if the file is missing).")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Endpoint weights, e.g. 'jobs=1,extract_skills=1'.")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of traffic.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed loop: number of concurrent clients.")
+    parser.add_argument("--rate", type=float, help="Open loop: requests started per second (replaces --concurrency).")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Open loop: pending requests beyond which arrivals are dropped.")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--llm-latency-ms", type=float, default=200, help="With --spawn: mock Ollama latency.")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0, help="With --spawn: mock Ollama generation speed (0 = instantaneous).")
+    parser.add_argument("--api-workers", type=int, default=1, help="With --spawn: uvicorn worker processes.")
+    parser.add_argument("--json", help="Also write the report to this JSON file.")
+    args = parser.parse_args(argv)
+
+    if os.path.exists(args.pdf):
+        with open(args.pdf, "rb") as f:
+            pdf = f.read()
+    else:
+        pdf = synthetic.make_pdf(synthetic.make_cv_text(60))
+
+    with tempfile.TemporaryDirectory(prefix="emploi-load-") as workdir:
+        if args.spawn:
+            database_url = f"sqlite:///{os.path.join(workdir, 'load.db')}"
+            candidate_names = seed_database(database_url, args.user, args.password, args.jobs, args.candidates)
+            with spawned_stack(database_url, args) as url:
+                report = asyncio.run(run_load(url, args, candidate_names, pdf))
+        else:
+            candidate_names = None
+            if args.seed_database:
+                candidate_names = seed_database(args.seed_database, args.user, args.password, args.jobs, args.candidates)
+            report = asyncio.run(run_load(args.url, args, candidate_names, pdf))
+
+    mode = f"open loop at {args.rate:g} req/s" if args.rate else f"closed loop with {args.concurrency} clients"
+    print(f"{mode}, {report['elapsed_seconds']:.1f} s")
+    print_report(report)
+    if args.json:
+        report["mode"] = {"rate": args.rate, "concurrency": None if args.rate else args.concurrency, "mix": args.mix}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,439 @@
+"""
+Benchmark suite for the ETL, matching and API hot paths.
+
+Each benchmark runs on synthetic data (`benchmarks.synthetic`) at the
+requested scales and reports the best and median time over `--repeat` runs.
+Results are written as JSON; when a baseline file exists, every result is
+compared with it and the script fails (exit code 1) if one is slower than
+the baseline by more than `--threshold`.
+
+The suite never touches `emploi.db` or a real Ollama: it works in a temporary
+directory and starts the mock Ollama server (`src.mock_ollama`) in-process.
+Parsers run on recorded Ollama responses.
+
+    python -m benchmarks.suite --scales 1k,10k --save-baseline   # on the reference branch
+    python -m benchmarks.suite --scales 1k,10k                   # on the change, compared with the baseline
+    python -m benchmarks.suite --only 'parse_*,api_*' --scales 100k
+"""
+import argparse
+import contextlib
+import datetime
+import fnmatch
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from benchmarks import synthetic
+
+SCALES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIR, "latest.json")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+DEFAULT_THRESHOLD = float(os.getenv("BENCHMARK_THRESHOLD", "0.25"))
+
+BENCHMARKS = {}
+
+def benchmark(name: str, max_size: int = None, repeat: int = None, warmup: bool = True):
+    """
+    Registers a benchmark. The decorated function receives the size and a
+    working directory, prepares the data and returns `(run, items)`: the
+    zero-argument function to time and the number of items it processes.
+    """
+    def register(setup):
+        BENCHMARKS[name] = {"setup": setup, "max_size": max_size, "repeat": repeat, "warmup": warmup}
+        return setup
+    return register
+
+def import_etl():
+    # Imported as part of the package, so it shares src.matching and its metrics with the API
+    from src import main
+    return main
+
+@contextlib.contextmanager
+def mock_ollama_server():
+    """
+    Runs the mock Ollama server in a background thread and points the
+    Ollama client at it.
+    """
+    import uvicorn
+    from src.mock_ollama import create_app, MockOllamaConfig
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(create_app(MockOllamaConfig(seed=0)), host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    # Read by ollama_client when it is first imported
+    os.environ["OLLAMA_API_URL"] = f"http://127.0.0.1:{port}/api/generate"
+    try:
+        yield
+    finally:
+        server.should_exit = True
+        thread.join()
+
+# ETL (main.py)
+
+@benchmark("assign_category")
+def bench_assign_category(size, workdir):
+    from src.scraping import assign_category_from_text
+    jobs = synthetic.make_jobs(size)
+
+    def run():
+        for job in jobs:
+            assign_category_from_text(job["title"], job["description"])
+    return run, size
+
+@benchmark("etl_normalize_jobs")
+def bench_etl_normalize_jobs(size, workdir):
+    etl = import_etl()
+    raw_jobs = synthetic.make_raw_jobs(size)
+
+    def run():
+        [etl.normalize_job(job_data) for job_data in raw_jobs]
+    return run, size
+
+@benchmark("etl_load_jobs")
+def bench_etl_load_jobs(size, workdir):
+    etl = import_etl()
+    etl.init_database()
+    normalized_jobs = [etl.normalize_job(job_data) for job_data in synthetic.make_raw_jobs(size)]
+
+    def run():
+        etl.load_jobs(normalized_jobs)
+    return run, size
+
+# One Ollama call, one lookup and one commit per pair: the larger scales take too long
+@benchmark("etl_match", max_size=10_000, repeat=1, warmup=False)
+def bench_etl_match(size, workdir):
+    etl = import_etl()
+    etl.init_database()
+    jobs_per_candidate = 10
+    normalized_jobs = [etl.normalize_job(job_data) for job_data in synthetic.make_raw_jobs(jobs_per_candidate)]
+    candidates = synthetic.make_candidates(max(1, size // jobs_per_candidate))
+    etl.load_jobs(normalized_jobs)
+
+    def run():
+        etl.load_candidates_and_matches(candidates, normalized_jobs)
+    return run, len(candidates) * jobs_per_candidate
+
+# CV upload
+
+@benchmark("pdf_extract")
+def bench_pdf_extract(size, workdir):
+    from src.pdf_extractor import extract_text_from_pdf
+    # Scale is the number of text lines, 50 per page
+    pdf = synthetic.make_pdf(synthetic.make_cv_text(size))
+
+    def run():
+        extract_text_from_pdf(pdf)
+    return run, size
+
+# Prompt building and parsing of Ollama responses, against a catalog of `size` jobs
+
+@benchmark("prompt_build_recommendations")
+def bench_prompt_build_recommendations(size, workdir):
+    from src.ai_recommender import _build_recommendation_request
+    jobs = synthetic.make_jobs(size)
+    candidate = synthetic.make_candidates(1)[0]
+
+    def run():
+        _build_recommendation_request(candidate, jobs)
+    return run, size
+
+@benchmark("parse_recommendations")
+def bench_parse_recommendations(size, workdir):
+    from src.ai_recommender import _parse_recommendations
+    jobs = synthetic.make_jobs(size)
+    result = synthetic.recorded_recommendations(jobs)
+
+    def run():
+        _parse_recommendations(result, jobs)
+    return run, size
+
+@benchmark("parse_cv_recommendations")
+def bench_parse_cv_recommendations(size, workdir):
+    from src.ai_recommender import _parse_cv_recommendations
+    jobs = synthetic.make_jobs(size)
+    result = synthetic.recorded_cv_recommendations(jobs)
+
+    def run():
+        _parse_cv_recommendations(result, jobs)
+    return run, size
+
+@benchmark("parse_skills")
+def bench_parse_skills(size, workdir):
+    from src.ai_recommender import _parse_skills
+    responses = [synthetic.recorded_skills(seed) for seed in range(min(size, 100))]
+
+    def run():
+        for index in range(size):
+            _parse_skills(responses[index % len(responses)])
+    return run, size
+
+@benchmark("parse_matching_score")
+def bench_parse_matching_score(size, workdir):
+    from src.matching import _parse_matching_score
+    responses = [synthetic.recorded_matching_score(seed) for seed in range(min(size, 100))]
+
+    def run():
+        for index in range(size):
+            _parse_matching_score(responses[index % len(responses)])
+    return run, size
+
+# List endpoints: every page of `size` rows, MAX_PAGE_SIZE rows at a time
+
+_api_databases = {}
+
+def api_client(size, workdir):
+    """
+    Returns a TestClient on a database seeded with `size` jobs, candidates
+    and matches. Authentication is bypassed: bcrypt is not what is measured.
+    """
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+    from src import api
+    from src.database import create_db_engine
+
+    if size not in _api_databases:
+        engine = create_db_engine(f"sqlite:///{os.path.join(workdir, f'api_{size}.db')}")
+        synthetic.seed_database(engine, synthetic.make_jobs(size), synthetic.make_candidates(size), [
+            {"id": row_id, "job_id": row_id, "candidate_id": (row_id * 7) % size + 1, "score": (row_id * 31) % 101}
+            for row_id in range(1, size + 1)
+        ])
+        _api_databases[size] = sessionmaker(bind=engine)
+    session_factory = _api_databases[size]
+
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    api.app.dependency_overrides[api.get_db] = get_db
+    api.app.dependency_overrides[api.get_current_user] = lambda: api.UserDB(id=1, username="bench")
+    api.job_catalog.invalidate()
+    return TestClient(api.app), api.MAX_PAGE_SIZE
+
+def page_through(client, path, page_size):
+    after_id = None
+    while True:
+        params = {"limit": page_size, "include_total": "false"}
+        if after_id is not None:
+            params["after_id"] = after_id
+        response = client.get(path, params=params)
+        response.raise_for_status()
+        after_id = response.headers.get("X-Next-Cursor")
+        if not after_id:
+            return
+
+def list_endpoint_benchmark(name, path):
+    @benchmark(name)
+    def setup(size, workdir):
+        client, page_size = api_client(size, workdir)
+
+        def run():
+            page_through(client, path, page_size)
+        return run, size
+    return setup
+
+list_endpoint_benchmark("api_list_jobs", "/jobs/")
+list_endpoint_benchmark("api_list_candidates", "/candidates/")
+list_endpoint_benchmark("api_list_matches", "/matches/")
+
+# Columnar snapshot: every candidate is scored against COLUMNAR_JOBS jobs, as in the ETL
+
+COLUMNAR_JOBS = 10
+_columnar_databases = {}
+
+def columnar_database(size, workdir):
+    """
+    Returns an engine on a database with `size` candidates, COLUMNAR_JOBS
+    jobs and all their matches, and the directory of its columnar snapshot.
+    """
+    from src.columnar_store import export_snapshot
+    from src.database import create_db_engine
+
+    if size not in _columnar_databases:
+        engine = create_db_engine(f"sqlite:///{os.path.join(workdir, f'columnar_{size}.db')}")
+        synthetic.seed_database(engine, synthetic.make_jobs(COLUMNAR_JOBS), synthetic.make_candidates(size), (
+            {"job_id": job_id, "candidate_id": candidate_id, "score": (candidate_id * 31 + job_id * 7) % 101}
+            for candidate_id in range(1, size + 1)
+            for job_id in range(1, COLUMNAR_JOBS + 1)
+        ))
+        directory = os.path.join(workdir, f"columnar_{size}")
+        export_snapshot(engine, directory)
+        _columnar_databases[size] = (engine, directory)
+    return _columnar_databases[size]
+
+@benchmark("columnar_export", repeat=1, warmup=False)
+def bench_columnar_export(size, workdir):
+    from src.columnar_store import export_snapshot
+    engine, directory = columnar_database(size, workdir)
+
+    def run():
+        export_snapshot(engine, directory)
+    return run, size * COLUMNAR_JOBS
+
+@benchmark("columnar_load_scores")
+def bench_columnar_load_scores(size, workdir):
+    from src.columnar_store import load_snapshot
+    _, directory = columnar_database(size, workdir)
+
+    def run():
+        _, _, scores = load_snapshot(directory).pairs()
+        scores.mean()
+    return run, size * COLUMNAR_JOBS
+
+@benchmark("sql_load_scores")
+def bench_sql_load_scores(size, workdir):
+    # The same scores read from the matches table, for comparison
+    from sqlalchemy import text
+    engine, _ = columnar_database(size, workdir)
+
+    def run():
+        with engine.connect() as connection:
+            rows = connection.execute(text("SELECT candidate_id, job_id, score FROM matches")).all()
+        sum(row.score for row in rows) / len(rows)
+    return run, size * COLUMNAR_JOBS
+
+# Runner
+
+def time_benchmark(spec, size, workdir, repeat):
+    run, items = spec["setup"](size, workdir)
+    repeat = min(repeat, spec["repeat"] or repeat)
+    # The code under test prints a lot; keep the terminal out of the measurement
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        if spec["warmup"]:
+            run()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+    best = min(timings)
+    return {
+        "items": items,
+        "runs": len(timings),
+        "seconds": best,
+        "median_seconds": statistics.median(timings),
+        "items_per_second": items / best if best else None,
+    }
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: dict, baseline: dict, threshold: float):
+    """
+    Returns the rows of the comparison table and the names of the regressions.
+    """
+    rows = []
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get("results", {}).get(key)
+        change = None
+        if reference and reference["seconds"]:
+            change = result["seconds"] / reference["seconds"] - 1
+            if change > threshold:
+                regressions.append(key)
+        rows.append((key, result, reference, change))
+    return rows, regressions
+
+def print_report(rows, threshold):
+    print(f"{'benchmark':<42}{'best s':>11}{'items/s':>14}{'baseline s':>12}{'change':>9}")
+    for key, result, reference, change in rows:
+        baseline_seconds = f"{reference['seconds']:.4f}" if reference else "-"
+        change_text = f"{change:+.0%}" if change is not None else "-"
+        flag = "  REGRESSION" if change is not None and change > threshold else ""
+        print(f"{key:<42}{result['seconds']:>11.4f}{result['items_per_second'] or 0:>14,.0f}{baseline_seconds:>12}{change_text:>9}{flag}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ETL, matching and API benchmarks and compare them with a baseline.")
+    parser.add_argument("--scales", default="1k,10k", help=f"Comma-separated scales among {', '.join(SCALES)}.")
+    parser.add_argument("--only", default="*", help="Comma-separated benchmark name patterns, e.g. 'parse_*,api_*'.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the JSON results.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Results to compare with, if the file exists.")
+    parser.add_argument("--save-baseline", action="store_true", help="Also write the results to the baseline file.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Slowdown over the baseline counted as a regression (0.25 = 25%%).")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit.")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, spec in BENCHMARKS.items():
+            limit = f" (up to {spec['max_size']:,} items)" if spec["max_size"] else ""
+            print(f"{name}{limit}")
+        return 0
+
+    scales = [scale.strip() for scale in args.scales.split(",") if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        parser.error(f"unknown scale(s): {', '.join(unknown)}")
+    patterns = [pattern.strip() for pattern in args.only.split(",")]
+    selected = [name for name in BENCHMARKS if any(fnmatch.fnmatch(name, pattern) for pattern in patterns)]
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="emploi-bench-") as workdir:
+        # Set before anything imports the database or Ollama settings
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'etl.db')}"
+        os.environ["MLFLOW_SAMPLE_RATE"] = "0"
+        with mock_ollama_server():
+            for name in selected:
+                spec = BENCHMARKS[name]
+                for scale in scales:
+                    size = SCALES[scale]
+                    if spec["max_size"] and size > spec["max_size"]:
+                        print(f"{name}[{scale}]: skipped (limited to {spec['max_size']:,} items)")
+                        continue
+                    key = f"{name}[{scale}]"
+                    results[key] = {"benchmark": name, "scale": scale, **time_benchmark(spec, size, workdir, args.repeat)}
+                    print(f"{key}: {results[key]['seconds']:.4f} s")
+
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    rows, regressions = compare(results, baseline, args.threshold)
+    print()
+    print_report(rows, args.threshold)
+    if baseline:
+        print(f"\nCompared with {args.baseline} (commit {baseline.get('commit')}, {baseline.get('created')})")
+    if regressions:
+        print(f"FAIL: {len(regressions)} benchmark(s) slower than the baseline by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        return 1
+    print("OK")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Deterministic synthetic data for the benchmarks: job catalogs, candidates,
+CV PDFs and recorded Ollama responses. The same seed and size always give
+the same data, so results from different runs can be compared.
+"""
+import json
+import random
+
+SKILLS = [
+    "Python", "SQL", "Java", "Spring", "React", "Angular", "Node.js", "C++", "JavaScript", "AWS", "Docker",
+    "Machine Learning", "Data Analysis", "Cloud Computing", "Cybersecurity", "Project Management",
+    "Communication", "Teamwork", "Problem Solving",
+]
+TITLES = [
+    "Développeur Python", "Data Scientist", "Ingénieur DevOps", "Développeur Frontend React", "Chef de projet",
+    "Analyste Cybersécurité", "Ingénieur QA", "Développeur Mobile Android", "Architecte Cloud", "Comptable",
+    "Chargé de communication", "Technicien support", "Product Owner", "Juriste conformité", "Commercial",
+]
+COMPANIES = ["Capgemini", "Sopra Steria", "Atos", "Thales", "Orange", "Doctolib", "BlaBlaCar", "Criteo", "OVHcloud", "Dassault Systèmes"]
+CITIES = ["Paris", "Lyon", "Marseille", "Toulouse", "Nantes", "Lille", "Bordeaux", "Rennes", "Nice", "Strasbourg"]
+SECTORS = ["informatique", "finance", "santé", "industrie", "commerce", "énergie", "télécoms"]
+DESCRIPTION_WORDS = [
+    "conception", "développement", "API", "REST", "microservices", "tests", "automatisation", "cloud", "données",
+    "analyse", "équipe", "agile", "client", "qualité", "sécurité", "performance", "production", "support",
+]
+
+def make_jobs(count: int, seed: int = 0):
+    rng = random.Random(seed)
+    jobs = []
+    for job_id in range(1, count + 1):
+        # Titles are made unique, as the recommendation parsers look jobs up by title
+        title = f"{rng.choice(TITLES)} {job_id}"
+        description = " ".join(rng.choices(DESCRIPTION_WORDS + SKILLS, k=40))
+        jobs.append({
+            "id": job_id,
+            "title": title,
+            "company": rng.choice(COMPANIES),
+            "location": rng.choice(CITIES),
+            "description": description,
+        })
+    return jobs
+
+def make_candidates(count: int, seed: int = 0):
+    rng = random.Random(seed + 1)
+    return [
+        {
+            "id": candidate_id,
+            "nom": f"Candidat {candidate_id}",
+            "email": f"candidat{candidate_id}@example.org",
+            "compétences": ", ".join(rng.sample(SKILLS, 5)),
+            "expérience": rng.randint(0, 10),
+            "localisation": rng.choice(CITIES),
+            "secteur": rng.choice(SECTORS),
+        }
+        for candidate_id in range(1, count + 1)
+    ]
+
+def seed_database(engine, jobs=(), candidates=(), matches=(), users=()):
+    """
+    Creates the tables and indexes, then inserts the given job, candidate and
+    match rows and the (username, password) users. Tables that already hold
+    rows and users that already exist are left as they are, so seeding a
+    database twice is harmless.
+    """
+    from src import api
+
+    api.init_database(engine)
+    with engine.begin() as connection:
+        existing_users = set(connection.execute(api.UserDB.__table__.select().with_only_columns(api.UserDB.username)).scalars())
+        new_users = [
+            {"username": username, "hashed_password": api.get_password_hash(password)}
+            for username, password in users if username not in existing_users
+        ]
+        if new_users:
+            connection.execute(api.UserDB.__table__.insert(), new_users)
+        for model, rows in ((api.JobDB, jobs), (api.CandidateDB, candidates), (api.MatchDB, matches)):
+            rows = list(rows)
+            if rows and not connection.execute(model.__table__.select().limit(1)).first():
+                connection.execute(model.__table__.insert(), rows)
+
+def make_raw_jobs(count: int, seed: int = 0):
+    """
+    Jobs shaped like the ETL input: half from Adzuna (nested company and
+    location), half from the scraper (flat strings and a category).
+    """
+    raw_jobs = []
+    for job in make_jobs(count, seed):
+        if job["id"] % 2:
+            raw_jobs.append({
+                "title": job["title"],
+                "company": {"display_name": job["company"]},
+                "location": {"display_name": job["location"], "area": ["France", job["location"]]},
+                "description": job["description"],
+            })
+        else:
+            raw_jobs.append({**job, "category": "web"})
+    return raw_jobs
+
+def make_cv_text(lines: int, seed: int = 0):
+    rng = random.Random(seed + 2)
+    return "\n".join(
+        f"{rng.choice(TITLES)} chez {rng.choice(COMPANIES)} - {', '.join(rng.sample(SKILLS, 3))}"
+        for _ in range(lines)
+    )
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def make_pdf(text: str, lines_per_page: int = 50) -> bytes:
+    """
+    Writes a minimal PDF (Helvetica, one text object per page) with the given
+    text. Characters outside Latin-1 are replaced.
+    """
+    lines = text.split("\n")
+    pages = [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)] or [[]]
+
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None, # Page tree, written once the page object numbers are known
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    page_numbers = []
+    for page_lines in pages:
+        content = "BT /F1 10 Tf 12 TL 50 780 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in page_lines) + " ET"
+        stream = content.encode("latin-1", "replace")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        content_number = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Resources << /Font << /F1 3 0 R >> >> /Contents {content_number} 0 R >>")
+        page_numbers.append(len(objects))
+    objects[1] = f"<< /Type /Pages /Count {len(page_numbers)} /Kids [{' '.join(f'{number} 0 R' for number in page_numbers)}] >>"
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        body = body if isinstance(body, bytes) else body.encode("latin-1")
+        pdf += f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode("latin-1")
+    return bytes(pdf)
+
+# Recorded Ollama answers, in the shape of /api/generate non-streaming responses
+def recorded_recommendations(jobs, seed: int = 0):
+    rng = random.Random(seed + 3)
+    titles = [job["title"] for job in rng.sample(jobs, min(3, len(jobs)))]
+    return {"model": "mistral", "response": "\n".join(f"{index}. {title}" for index, title in enumerate(titles, start=1)), "done": True}
+
+def recorded_cv_recommendations(jobs, seed: int = 0):
+    listing = recorded_recommendations(jobs, seed)["response"]
+    advice = "Votre profil présente des compétences solides en développement. " * 12
+    return {"model": "mistral", "response": f"Jobs Recommandés:\n{listing}\n\nRecommandation de Carrière:\n{advice}", "done": True}
+
+def recorded_skills(seed: int = 0):
+    rng = random.Random(seed + 4)
+    return json.dumps([{"skill": skill, "score": rng.randint(40, 100)} for skill in rng.sample(SKILLS, 10)])
+
+def recorded_matching_score(seed: int = 0):
+    return {"model": "mistral", "response": f"{random.Random(seed + 5).randint(0, 100)}", "done": True}
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from fastapi import HTTPException, status
+from prometheus_client import Counter, Gauge, Histogram
+
+# Prometheus Metrics (exposed through the instrumentator's /metrics endpoint)
+llm_queue_depth_gauge = Gauge(
+    "llm_queue_depth",
+    "Number of requests waiting for an LLM slot",
+    ["endpoint"]
+)
+llm_inflight_gauge = Gauge(
+    "llm_inflight_requests",
+    "Number of LLM generations currently running",
+    ["endpoint"]
+)
+llm_queue_wait_histogram = Histogram(
+    "llm_queue_wait_seconds",
+    "Time spent waiting for an LLM slot",
+    ["endpoint"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+llm_admission_rejected_counter = Counter(
+    "llm_admission_rejected_total",
+    "Total number of LLM requests rejected by admission control",
+    ["endpoint", "reason"]
+)
+
+def _env_setting(endpoint, name, default, cast=int):
+    """
+    Reads `LLM_<ENDPOINT>_<NAME>`, falling back to `LLM_<NAME>` and then to the default.
+    """
+    specific = os.getenv(f"LLM_{endpoint.upper()}_{name}")
+    if specific is not None:
+        return cast(specific)
+    return cast(os.getenv(f"LLM_{name}", default))
+
+class AdmissionRejected(HTTPException):
+    """
+    Raised when a request cannot be admitted. Being an HTTPException, it is
+    returned as-is by FastAPI with its `Retry-After` header.
+    """
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+class AdmissionController:
+    """
+    Limits concurrent LLM calls for one endpoint and queues the overflow.
+
+    Waiters are grouped per user and served round-robin, so one user sending a
+    burst cannot starve the others. When the global queue (or the user's share
+    of it) is full, or a waiter exceeds `queue_timeout`, the request is rejected
+    immediately instead of piling up inside Ollama.
+    """
+    def __init__(self, endpoint: str, max_concurrency: int, max_queue: int,
+                 max_queue_per_user: int, queue_timeout: float, retry_after: int):
+        self.endpoint = endpoint
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self._active = 0
+        self._waiting = 0
+        self._queues = OrderedDict() # user key -> deque of futures, in round-robin order
+
+    @classmethod
+    def from_env(cls, endpoint: str):
+        return cls(
+            endpoint,
+            max_concurrency=_env_setting(endpoint, "MAX_CONCURRENCY", "4"),
+            max_queue=_env_setting(endpoint, "MAX_QUEUE", "32"),
+            max_queue_per_user=_env_setting(endpoint, "MAX_QUEUE_PER_USER", "4"),
+            queue_timeout=_env_setting(endpoint, "QUEUE_TIMEOUT", "30", cast=float),
+            retry_after=_env_setting(endpoint, "RETRY_AFTER", "5"),
+        )
+
+    @property
+    def active(self):
+        return self._active
+
+    @property
+    def waiting(self):
+        return self._waiting
+
+    def _reject(self, status_code, reason, detail):
+        llm_admission_rejected_counter.labels(endpoint=self.endpoint, reason=reason).inc()
+        raise AdmissionRejected(status_code, detail, self.retry_after)
+
+    def _update_gauges(self):
+        llm_queue_depth_gauge.labels(endpoint=self.endpoint).set(self._waiting)
+        llm_inflight_gauge.labels(endpoint=self.endpoint).set(self._active)
+
+    def _remove_waiter(self, user_key, future):
+        queue = self._queues.get(user_key)
+        if queue is None or future not in queue:
+            return
+        queue.remove(future)
+        if not queue:
+            del self._queues[user_key]
+        self._waiting -= 1
+
+    async def acquire(self, user_key: str):
+        if self._active < self.max_concurrency and not self._waiting:
+            self._active += 1
+            self._update_gauges()
+            llm_queue_wait_histogram.labels(endpoint=self.endpoint).observe(0)
+            return
+
+        if self._waiting >= self.max_queue:
+            self._reject(status.HTTP_503_SERVICE_UNAVAILABLE, "queue_full",
+                         "Le service d'IA est surchargé. Veuillez réessayer plus tard.")
+        if len(self._queues.get(user_key, ())) >= self.max_queue_per_user:
+            self._reject(status.HTTP_429_TOO_MANY_REQUESTS, "user_queue_full",
+                         "Trop de requêtes d'IA en attente pour cet utilisateur.")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user_key, deque()).append(future)
+        self._waiting += 1
+        self._update_gauges()
+
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, timeout=self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just as we gave up: pass it on.
+                self.release()
+            else:
+                self._remove_waiter(user_key, future)
+                self._update_gauges()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self._reject(status.HTTP_503_SERVICE_UNAVAILABLE, "queue_timeout",
+                         "Le service d'IA est surchargé. Veuillez réessayer plus tard.")
+        finally:
+            llm_queue_wait_histogram.labels(endpoint=self.endpoint).observe(time.perf_counter() - start)
+
+    def release(self):
+        # Hand the slot directly to the next user in round-robin order
+        while self._queues:
+            user_key, queue = self._queues.popitem(last=False)
+            future = queue.popleft()
+            if queue:
+                self._queues[user_key] = queue
+            self._waiting -= 1
+            if not future.done():
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self._active -= 1
+        self._update_gauges()
+
+    @asynccontextmanager
+    async def slot(self, user_key: str):
+        await self.acquire(user_key)
+        try:
+            yield
+        finally:
+            self.release()
+
+_controllers = {}
+
+def get_admission_controller(endpoint: str) -> AdmissionController:
+    """
+    Returns the admission controller for an endpoint, created from the
+    environment on first use.
+    """
+    controller = _controllers.get(endpoint)
+    if controller is None:
+        controller = _controllers[endpoint] = AdmissionController.from_env(endpoint)
+    return controller
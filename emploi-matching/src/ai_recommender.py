@@ -1,30 +1,54 @@
-import requests
 import json
 import re
+import httpx
 
-import os
-OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
+try:
+    from .ollama_client import OLLAMA_MODEL, generate, generate_async, get_generation_options
+    from .llm_metrics import observe_parse_failure
+    from .tracing import span
+    from .logging_config import get_logger
+except ImportError:
+    from ollama_client import OLLAMA_MODEL, generate, generate_async, get_generation_options
+    from llm_metrics import observe_parse_failure
+    from tracing import span
+    from logging_config import get_logger
 
-def get_ai_recommendations(candidate_info, all_jobs):
+logger = get_logger(__name__)
+
+# Bump a version whenever its prompt or parsing changes, so cached or
+# coalesced results produced by the previous prompt are not reused.
+RECOMMENDATION_PROMPT_VERSION = 1
+CV_RECOMMENDATION_PROMPT_VERSION = 1
+SKILLS_PROMPT_VERSION = 1
+
+def _format_job_descriptions(all_jobs):
+    return "\n".join([
+        f"Job Title: {job.get('title', 'N/A')}\nDescription: {job.get('description', 'N/A')}"
+        for job in all_jobs
+    ])
+
+def _find_jobs_by_titles(titles, all_jobs, context=""):
     """
-    Generates job recommendations for a candidate using Mistral via Ollama.
-    
-    Args:
-        candidate_info (dict): A dictionary containing candidate details (e.g., 'nom', 'compétences').
-        all_jobs (list): A list of dictionaries, where each dictionary represents a job
-                         and contains at least 'title' and 'description'.
-                         
-    Returns:
-        list: A list of recommended job dictionaries (up to 3).
+    Maps recommended titles back to the full job dictionaries, preserving order.
     """
-    
+    recommended_jobs = []
+    for title in titles:
+        found = False
+        for job in all_jobs:
+            # Use .lower() and .strip() for robust comparison
+            if job.get('title', '').strip().lower() == title.strip().lower():
+                recommended_jobs.append(job)
+                found = True
+                break # Move to the next recommended title
+        if not found:
+            logger.warning("Recommended job title not found in available jobs", extra={"title": title, "context": context})
+    return recommended_jobs
+
+def _build_recommendation_request(candidate_info, all_jobs):
     candidate_skills = candidate_info.get('compétences', 'Aucune compétence spécifiée')
     candidate_name = candidate_info.get('nom', 'Candidat inconnu')
 
-    job_descriptions = "\n".join([
-        f"Job Title: {job.get('title', 'N/A')}\nDescription: {job.get('description', 'N/A')}"
-        for job in all_jobs
-    ])
+    job_descriptions = _format_job_descriptions(all_jobs)
 
     # Construct the prompt for Mistral
     prompt = (
@@ -37,84 +61,87 @@ def get_ai_recommendations(candidate_info, all_jobs):
         f"Veuillez ne répondre qu'avec une liste numérotée des titres des jobs recommandés, sans aucune autre information ou texte explicatif."
     
     )
-    print(f"Prompt sent to Mistral:\n{prompt[:500]}...") # Print first 500 chars of prompt
+    logger.debug("Prompt built", extra={"function": "recommendations", "prompt_chars": len(prompt), "prompt": prompt})
 
-    headers = {'Content-Type': 'application/json'}
+    _, options = get_generation_options("recommendations")
     data = {
-        "model": "mistral",
+        "model": OLLAMA_MODEL,
         "prompt": prompt,
         "stream": False, # We want a single response
-        "temperature": 0.7,
-        "top_k": 40,
-        "top_p": 0.9,
-        "repeat_penalty": 1.1,
-        "num_ctx": 4096,
-            }
+        "options": options,
+    }
+    return data
 
-    try:
-        response = requests.post(OLLAMA_API_URL, headers=headers, data=json.dumps(data))
-        response.raise_for_status() # Raise an HTTPError for bad responses (4xx or 5xx)
-        
-        result = response.json()
-        print(f"Raw response from Ollama API:\n{result}")
-        
-        # Extract the content from the response
-        generated_text = result.get('response', '')
-        print(f"Generated text from Mistral:\n{generated_text}")
-        
-        # Parse the generated text to get job titles
-        recommended_titles = []
-        for line in generated_text.split('\n'):
-            line = line.strip()
-            if line.startswith(('1.', '2.', '3.')):
-                # Extract title after the number and period
-                title = line.split('.', 1)[1].strip()
-                recommended_titles.append(title)
-        print(f"Extracted recommended titles: {recommended_titles}")
-        
-        # Filter all_jobs to get the full job details for the recommended titles
-        recommended_jobs = []
-        for title in recommended_titles:
-            found = False
-            for job in all_jobs:
-                # Use .lower() and .strip() for robust comparison
-                if job.get('title', '').strip().lower() == title.strip().lower():
-                    recommended_jobs.append(job)
-                    found = True
-                    break # Move to the next recommended title
-            if not found:
-                print(f"Warning: Recommended job title '{title}' not found in available jobs.")
-        
-        print(f"Final recommended jobs (full data): {recommended_jobs}")
-        # Return only the top 3 jobs as requested
-        return recommended_jobs[:3]
+def _parse_recommendations(result, all_jobs):
+    # Extract the content from the response
+    generated_text = result.get('response', '')
+    logger.debug("Ollama response", extra={"function": "recommendations", "response": generated_text})
 
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error communicating with Ollama API: {e}")
-        return []
-    except json.JSONDecodeError:
-        print(f"❌ Error decoding JSON response from Ollama API. Response text: {response.text}")
-        return []
+    # Parse the generated text to get job titles
+    recommended_titles = []
+    for line in generated_text.split('\n'):
+        line = line.strip()
+        if line.startswith(('1.', '2.', '3.')):
+            # Extract title after the number and period
+            title = line.split('.', 1)[1].strip()
+            recommended_titles.append(title)
 
-def get_ai_recommendations_from_cv(cv_text: str, all_jobs: list):
+    # Filter all_jobs to get the full job details for the recommended titles
+    recommended_jobs = _find_jobs_by_titles(recommended_titles, all_jobs)
+
+    logger.debug("Recommendations parsed", extra={"titles": recommended_titles, "matched": len(recommended_jobs)})
+    # Return only the top 3 jobs as requested
+    return recommended_jobs[:3]
+
+def get_ai_recommendations(candidate_info, all_jobs):
     """
-    Generates job recommendations and a career recommendation text for a candidate
-    based on their CV using Mistral via Ollama.
+    Generates job recommendations for a candidate using Mistral via Ollama.
     
     Args:
-        cv_text (str): The extracted text content of the candidate's CV.
+        candidate_info (dict): A dictionary containing candidate details (e.g., 'nom', 'compétences').
         all_jobs (list): A list of dictionaries, where each dictionary represents a job
                          and contains at least 'title' and 'description'.
                          
     Returns:
-        tuple: A tuple containing:
-            - list: A list of recommended job dictionaries (up to 3).
-            - str: A career recommendation text.
+        list: A list of recommended job dictionaries (up to 3).
     """
-    job_descriptions = "\n".join([
-        f"Job Title: {job.get('title', 'N/A')}\nDescription: {job.get('description', 'N/A')}"
-        for job in all_jobs
-    ])
+    data = _build_recommendation_request(candidate_info, all_jobs)
+
+    try:
+        result = generate(data, function="recommendations")
+        return _parse_recommendations(result, all_jobs)
+
+    except httpx.HTTPError as e:
+        logger.error("Error communicating with Ollama API", extra={"function": "recommendations", "error": str(e)})
+        return []
+    except json.JSONDecodeError:
+        logger.error("Error decoding JSON response from Ollama API", extra={"function": "recommendations"})
+        return []
+
+async def get_ai_recommendations_async(candidate_info, all_jobs):
+    """
+    Async version of `get_ai_recommendations` built on the shared Ollama client.
+    The event loop stays free while Mistral generates. Transport and HTTP errors
+    (httpx.HTTPError) are raised, so the caller can answer from the local fallback.
+    """
+    with span("prompt_build"):
+        data = _build_recommendation_request(candidate_info, all_jobs)
+
+    try:
+        with span("ollama"):
+            result = await generate_async(data, function="recommendations")
+        with span("parse"):
+            recommended_jobs = _parse_recommendations(result, all_jobs)
+        if not recommended_jobs:
+            observe_parse_failure("recommendations", data["model"])
+        return recommended_jobs
+
+    except json.JSONDecodeError:
+        logger.error("Error decoding JSON response from Ollama API", extra={"function": "recommendations"})
+        return []
+
+def _build_cv_recommendation_request(cv_text, all_jobs):
+    job_descriptions = _format_job_descriptions(all_jobs)
 
     # Prompt for job recommendations and career recommendation text
     prompt = (
@@ -130,138 +157,148 @@ def get_ai_recommendations_from_cv(cv_text: str, all_jobs: list):
         f"des suggestions d'amélioration ou de développement de compétences, et des perspectives de carrière. "
         f"Veuillez placer ce texte sous la section 'Recommandation de Carrière:'."
     )
-    print(f"Prompt sent to Mistral for CV analysis:\n{prompt[:500]}...")
+    logger.debug("Prompt built", extra={"function": "recommend_from_cv", "prompt_chars": len(prompt), "prompt": prompt})
 
-    headers = {'Content-Type': 'application/json'}
+    _, options = get_generation_options("recommend_from_cv")
     data = {
-        "model": "mistral",
+        "model": OLLAMA_MODEL,
         "prompt": prompt,
         "stream": False,
-        "temperature": 0.7,
-        "top_k": 40,
-        "top_p": 0.9,
-        "repeat_penalty": 1.1,
-        "num_ctx": 4096,
-        }
-                
+        "options": options,
+    }
+    return data
+
+def _parse_cv_recommendations(result, all_jobs):
+    generated_text = result.get('response', '')
+    logger.debug("Ollama response", extra={"function": "recommend_from_cv", "response": generated_text})
     
-    try:
-        response = requests.post(OLLAMA_API_URL, headers=headers, data=json.dumps(data))
-        response.raise_for_status()
-        
-        result = response.json()
-        print(f"Raw response from Ollama API (CV analysis):\n{result}")
-        
-        generated_text = result.get('response', '')
-        print(f"Generated text from Mistral (CV analysis):\n{generated_text}")
-        
-        recommended_titles = []
-        career_recommendation_text = ""
-
-        # Parse the generated text
-        career_recommendation_text = ""
-        job_section_raw = generated_text # Initialize with full text
-
-        # First, try to extract the career recommendation text by splitting at its header
-        parts_by_career_header = generated_text.split("Recommandation de Carrière:", 1)
-        if len(parts_by_career_header) > 1:
-            job_section_raw = parts_by_career_header[0] # Content before career recommendation
-            career_recommendation_text = parts_by_career_header[1].strip() # Actual career recommendation text
-        else:
-            # If "Recommandation de Carrière:" header is not found, assume the entire text is the recommendation
-            # and we will try to extract jobs from it.
-            career_recommendation_text = generated_text.strip()
-
-        # --- Robust Job Title Extraction ---
-        available_job_titles = [job.get('title', '').strip().lower() for job in all_jobs]
-        found_titles_from_ai = []
-
-        # Strategy 1: Look for explicit numbered/bulleted lists in the *entire* generated text
-        # This is because the AI might put the list anywhere.
-        list_pattern = re.compile(r'^\s*(?:\d+\.|\-)\s*(.+)$', re.MULTILINE)
-        for match in list_pattern.finditer(generated_text):
-            extracted_title_candidate = match.group(1).strip()
-            # Check if this extracted title is close to any actual job title
-            for actual_title in available_job_titles:
-                if actual_title in extracted_title_candidate.lower() or extracted_title_candidate.lower() in actual_title:
-                    found_titles_from_ai.append(actual_title)
-                    break
-        
-        # Strategy 2: Look for embedded job titles within the text, matching against available job titles
-        # This is a more general approach if the AI doesn't follow the list format.
+    recommended_titles = []
+    career_recommendation_text = ""
+
+    # Parse the generated text
+    career_recommendation_text = ""
+
+    # First, try to extract the career recommendation text by splitting at its header
+    parts_by_career_header = generated_text.split("Recommandation de Carrière:", 1)
+    if len(parts_by_career_header) > 1:
+        career_recommendation_text = parts_by_career_header[1].strip() # Actual career recommendation text
+    else:
+        # If "Recommandation de Carrière:" header is not found, assume the entire text is the recommendation
+        # and we will try to extract jobs from it.
+        career_recommendation_text = generated_text.strip()
+
+    # --- Robust Job Title Extraction ---
+    available_job_titles = [job.get('title', '').strip().lower() for job in all_jobs]
+    found_titles_from_ai = []
+
+    # Strategy 1: Look for explicit numbered/bulleted lists in the *entire* generated text
+    # This is because the AI might put the list anywhere.
+    list_pattern = re.compile(r'^\s*(?:\d+\.|\-)\s*(.+)$', re.MULTILINE)
+    for match in list_pattern.finditer(generated_text):
+        extracted_title_candidate = match.group(1).strip()
+        # Check if this extracted title is close to any actual job title
         for actual_title in available_job_titles:
-            # Use word boundaries to avoid partial matches (e.g., "developer" matching "web developer")
-            # and escape special characters in the title for regex safety.
-            if re.search(r'\b' + re.escape(actual_title) + r'\b', generated_text.lower()):
+            if actual_title in extracted_title_candidate.lower() or extracted_title_candidate.lower() in actual_title:
                 found_titles_from_ai.append(actual_title)
+                break
+    
+    # Strategy 2: Look for embedded job titles within the text, matching against available job titles
+    # This is a more general approach if the AI doesn't follow the list format.
+    for actual_title in available_job_titles:
+        # Use word boundaries to avoid partial matches (e.g., "developer" matching "web developer")
+        # and escape special characters in the title for regex safety.
+        if re.search(r'\b' + re.escape(actual_title) + r'\b', generated_text.lower()):
+            found_titles_from_ai.append(actual_title)
 
-        # Filter out potential duplicates and ensure we only take unique titles, preserving order
-        recommended_titles = list(dict.fromkeys(found_titles_from_ai))
-        
-        # Limit to top 3 recommendations as requested in the prompt
-        recommended_titles = recommended_titles[:3]
-
-        # --- Clean up career_recommendation_text ---
-        # Remove the lines that were identified as job titles from the career_recommendation_text.
-        # This is crucial to avoid redundancy in the final output.
-        if recommended_titles and career_recommendation_text:
-            lines = career_recommendation_text.split('\n')
-            cleaned_lines = []
-            for line in lines:
-                is_job_title_line = False
-                # Check if the line contains any of the extracted job titles (case-insensitive)
-                for title in recommended_titles:
-                    if re.search(r'\b' + re.escape(title) + r'\b', line.lower()):
-                        is_job_title_line = True
-                        break
-                # Also remove the "1. Jobs Recommandés :" and "2. Recommandation de Carrière :" lines if they appear
-                if re.match(r'^\s*\d+\.\s*Jobs Recommandés\s*:\s*$', line, re.IGNORECASE) or \
-                   re.match(r'^\s*\d+\.\s*Recommandation de Carrière\s*:\s*$', line, re.IGNORECASE):
-                    is_job_title_line = True
+    # Filter out potential duplicates and ensure we only take unique titles, preserving order
+    recommended_titles = list(dict.fromkeys(found_titles_from_ai))
+    
+    # Limit to top 3 recommendations as requested in the prompt
+    recommended_titles = recommended_titles[:3]
 
-                if not is_job_title_line and line.strip(): # Keep non-job title/header lines that are not empty
-                    cleaned_lines.append(line)
-            career_recommendation_text = "\n".join(cleaned_lines).strip()
-
-        # Final fallback: if after all extraction and cleanup, the career_recommendation_text is empty,
-        # but the original generated text had content, use the original text as a fallback.
-        if not career_recommendation_text and generated_text.strip():
-            career_recommendation_text = generated_text.strip()
-
-        print(f"Extracted recommended titles from CV analysis: {recommended_titles}")
-        print(f"Extracted career recommendation text: {career_recommendation_text[:200]}...") # Print first 200 chars
-
-        recommended_jobs = []
-        for title in recommended_titles:
-            found = False
-            for job in all_jobs:
-                if job.get('title', '').strip().lower() == title.strip().lower():
-                    recommended_jobs.append(job)
-                    found = True
+    # --- Clean up career_recommendation_text ---
+    # Remove the lines that were identified as job titles from the career_recommendation_text.
+    # This is crucial to avoid redundancy in the final output.
+    if recommended_titles and career_recommendation_text:
+        lines = career_recommendation_text.split('\n')
+        cleaned_lines = []
+        for line in lines:
+            is_job_title_line = False
+            # Check if the line contains any of the extracted job titles (case-insensitive)
+            for title in recommended_titles:
+                if re.search(r'\b' + re.escape(title) + r'\b', line.lower()):
+                    is_job_title_line = True
                     break
-            if not found:
-                print(f"Warning: Recommended job title '{title}' from CV analysis not found in available jobs.")
-        
-        return recommended_jobs[:3], career_recommendation_text
+            # Also remove the "1. Jobs Recommandés :" and "2. Recommandation de Carrière :" lines if they appear
+            if re.match(r'^\s*\d+\.\s*Jobs Recommandés\s*:\s*$', line, re.IGNORECASE) or \
+               re.match(r'^\s*\d+\.\s*Recommandation de Carrière\s*:\s*$', line, re.IGNORECASE):
+                is_job_title_line = True
 
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error communicating with Ollama API for CV analysis: {e}")
-        return [], "Erreur lors de la génération de la recommandation de carrière."
-    except json.JSONDecodeError:
-        print(f"❌ Error decoding JSON response from Ollama API (CV analysis). Response text: {response.text}")
-        return [], "Erreur lors du décodage de la réponse de l'API pour la recommandation de carrière."
+            if not is_job_title_line and line.strip(): # Keep non-job title/header lines that are not empty
+                cleaned_lines.append(line)
+        career_recommendation_text = "\n".join(cleaned_lines).strip()
 
-def extract_skills_with_scores_from_cv(cv_text: str):
+    # Final fallback: if after all extraction and cleanup, the career_recommendation_text is empty,
+    # but the original generated text had content, use the original text as a fallback.
+    if not career_recommendation_text and generated_text.strip():
+        career_recommendation_text = generated_text.strip()
+
+    logger.debug("CV recommendations parsed", extra={"titles": recommended_titles, "career_recommendation": career_recommendation_text})
+
+    recommended_jobs = _find_jobs_by_titles(recommended_titles, all_jobs, context=" from CV analysis")
+    
+    return recommended_jobs[:3], career_recommendation_text
+
+def get_ai_recommendations_from_cv(cv_text: str, all_jobs: list):
     """
-    Extracts 10 key skills from the CV text and assigns a score (0-100) to each
-    using Mistral via Ollama.
+    Generates job recommendations and a career recommendation text for a candidate
+    based on their CV using Mistral via Ollama.
     
     Args:
         cv_text (str): The extracted text content of the candidate's CV.
-                          
+        all_jobs (list): A list of dictionaries, where each dictionary represents a job
+                         and contains at least 'title' and 'description'.
+                         
     Returns:
-        list: A list of dictionaries, each with 'skill' (str) and 'score' (int).
+        tuple: A tuple containing:
+            - list: A list of recommended job dictionaries (up to 3).
+            - str: A career recommendation text.
     """
+    data = _build_cv_recommendation_request(cv_text, all_jobs)
+
+    try:
+        result = generate(data, function="recommend_from_cv")
+        return _parse_cv_recommendations(result, all_jobs)
+
+    except httpx.HTTPError as e:
+        logger.error("Error communicating with Ollama API", extra={"function": "recommend_from_cv", "error": str(e)})
+        return [], "Erreur lors de la génération de la recommandation de carrière."
+    except json.JSONDecodeError:
+        logger.error("Error decoding JSON response from Ollama API", extra={"function": "recommend_from_cv"})
+        return [], "Erreur lors du décodage de la réponse de l'API pour la recommandation de carrière."
+
+async def get_ai_recommendations_from_cv_async(cv_text: str, all_jobs: list):
+    """
+    Async version of `get_ai_recommendations_from_cv` built on the shared Ollama client.
+    Raises httpx.HTTPError when Ollama cannot be reached or answers with an error.
+    """
+    with span("prompt_build"):
+        data = _build_cv_recommendation_request(cv_text, all_jobs)
+
+    try:
+        with span("ollama"):
+            result = await generate_async(data, function="recommend_from_cv")
+        with span("parse"):
+            recommended_jobs, career_recommendation_text = _parse_cv_recommendations(result, all_jobs)
+        if not recommended_jobs:
+            observe_parse_failure("recommend_from_cv", data["model"])
+        return recommended_jobs, career_recommendation_text
+
+    except json.JSONDecodeError:
+        logger.error("Error decoding JSON response from Ollama API", extra={"function": "recommend_from_cv"})
+        return [], "Erreur lors du décodage de la réponse de l'API pour la recommandation de carrière."
+
+def _build_skills_request(cv_text):
     prompt = (
         f"Réponds en français.\n\n"
         f"En tant qu'expert en analyse de CV, veuillez extraire les 10 compétences clés "
@@ -277,52 +314,104 @@ def extract_skills_with_scores_from_cv(cv_text: str):
         f"]\n"
         f"Assurez-vous que la réponse est un JSON valide et ne contient aucun autre texte."
     )
-    print(f"Prompt sent to Mistral for skill extraction:\n{prompt[:500]}...")
+    logger.debug("Prompt built", extra={"function": "extract_skills", "prompt_chars": len(prompt), "prompt": prompt})
 
-    headers = {'Content-Type': 'application/json'}
+    _, options = get_generation_options("extract_skills")
     data = {
-        "model": "mistral",
+        "model": OLLAMA_MODEL,
         "prompt": prompt,
-        "stream": False
+        "stream": False,
+        "options": options,
     }
+    return data
 
-    try:
-        response = requests.post(OLLAMA_API_URL, headers=headers, data=json.dumps(data))
-        response.raise_for_status()
+def _parse_skills(generated_text):
+    """
+    Parses and validates the JSON skill list generated by Mistral.
+
+    Raises:
+        json.JSONDecodeError: If the generated text is not valid JSON.
+        ValueError: If the JSON does not have the expected structure.
+    """
+    # Attempt to parse the JSON response
+    skills_data = json.loads(generated_text)
+    
+    # Validate the structure and content
+    if not isinstance(skills_data, list):
+        raise ValueError("Expected a JSON list.")
+    
+    extracted_skills = []
+    for item in skills_data:
+        if not isinstance(item, dict) or "skill" not in item or "score" not in item:
+            raise ValueError("Each item in the JSON list must be an object with 'skill' and 'score'.")
+        if not isinstance(item["skill"], str) or not isinstance(item["score"], int):
+            raise ValueError("Skill must be a string and score must be an integer.")
         
-        result = response.json()
+        # Ensure score is within 0-100
+        item["score"] = max(0, min(100, item["score"]))
+        extracted_skills.append(item)
+    
+    # Return up to 10 skills
+    return extracted_skills[:10]
+
+def extract_skills_with_scores_from_cv(cv_text: str):
+    """
+    Extracts 10 key skills from the CV text and assigns a score (0-100) to each
+    using Mistral via Ollama.
+    
+    Args:
+        cv_text (str): The extracted text content of the candidate's CV.
+                          
+    Returns:
+        list: A list of dictionaries, each with 'skill' (str) and 'score' (int).
+    """
+    data = _build_skills_request(cv_text)
+    generated_text = ""
+
+    try:
+        result = generate(data, function="extract_skills")
         generated_text = result.get('response', '').strip()
-        print(f"Generated text from Mistral (skill extraction):\n{generated_text}")
-        
-        # Attempt to parse the JSON response
-        skills_data = json.loads(generated_text)
+        logger.debug("Ollama response", extra={"function": "extract_skills", "response": generated_text})
         
-        # Validate the structure and content
-        if not isinstance(skills_data, list):
-            raise ValueError("Expected a JSON list.")
-        
-        extracted_skills = []
-        for item in skills_data:
-            if not isinstance(item, dict) or "skill" not in item or "score" not in item:
-                raise ValueError("Each item in the JSON list must be an object with 'skill' and 'score'.")
-            if not isinstance(item["skill"], str) or not isinstance(item["score"], int):
-                raise ValueError("Skill must be a string and score must be an integer.")
-            
-            # Ensure score is within 0-100
-            item["score"] = max(0, min(100, item["score"]))
-            extracted_skills.append(item)
-        
-        # Return up to 10 skills
-        return extracted_skills[:10]
+        return _parse_skills(generated_text)
 
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error communicating with Ollama API for skill extraction: {e}")
+    except httpx.HTTPError as e:
+        logger.error("Error communicating with Ollama API", extra={"function": "extract_skills", "error": str(e)})
         return []
     except json.JSONDecodeError:
-        print(f"❌ Error decoding JSON response from Ollama API (skill extraction). Response text: {generated_text}")
+        logger.warning("Skill extraction response is not valid JSON", extra={"response": generated_text})
+        return []
+    except ValueError as e:
+        logger.warning("Invalid skill extraction response", extra={"error": str(e), "response": generated_text})
+        return []
+
+async def extract_skills_with_scores_from_cv_async(cv_text: str):
+    """
+    Async version of `extract_skills_with_scores_from_cv` built on the shared Ollama client.
+    Raises httpx.HTTPError when Ollama cannot be reached or answers with an error.
+    """
+    with span("prompt_build"):
+        data = _build_skills_request(cv_text)
+    generated_text = ""
+
+    try:
+        with span("ollama"):
+            result = await generate_async(data, function="extract_skills")
+        generated_text = result.get('response', '').strip()
+        logger.debug("Ollama response", extra={"function": "extract_skills", "response": generated_text})
+
+        with span("parse"):
+            return _parse_skills(generated_text)
+
+    except json.JSONDecodeError:
+        logger.warning("Skill extraction response is not valid JSON", extra={"response": generated_text})
+        if generated_text:
+            # Ollama answered, but not with the JSON list we asked for
+            observe_parse_failure("extract_skills", data["model"])
         return []
     except ValueError as e:
-        print(f"❌ Error parsing or validating skill extraction response: {e}. Raw response: {generated_text}")
+        logger.warning("Invalid skill extraction response", extra={"error": str(e), "response": generated_text})
+        observe_parse_failure("extract_skills", data["model"])
         return []
 
 if __name__ == '__main__':
@@ -1,22 +1,47 @@
-from fastapi import FastAPI, Depends, HTTPException, APIRouter, UploadFile, File, status, Request
+from fastapi import FastAPI, Depends, HTTPException, APIRouter, UploadFile, File, Query, status, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from prometheus_fastapi_instrumentator import Instrumentator
 from prometheus_client import Counter
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey
+from sqlalchemy import func, select, Column, Integer, String, Text, LargeBinary, DateTime, ForeignKey, Index
 from sqlalchemy.orm import sessionmaker, Session, declarative_base
-from typing import List
+from typing import Any, List, Optional
+from datetime import datetime
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from .ai_recommender import get_ai_recommendations, get_ai_recommendations_from_cv, extract_skills_with_scores_from_cv
+from .ai_recommender import get_ai_recommendations_async, get_ai_recommendations_from_cv_async, extract_skills_with_scores_from_cv_async, RECOMMENDATION_PROMPT_VERSION
+from .ollama_client import close_async_client, get_generation_options, OLLAMA_MODEL
+from .admission import get_admission_controller
+from .singleflight import SingleFlight
+from .fallback import call_with_fallback
+from .matching import local_recommendations, local_recommendations_from_cv, local_skills_from_cv
 from .pdf_extractor import extract_text_from_pdf
+from .auth_cache import VerifiedCredentialCache
+from .catalog import JobCatalog
+from .database import DATABASE_URL, create_db_engine
+from .cv_jobs import CVJobQueue
+from .experiment_log import ExperimentLogger
+from .serialization import FastJSONResponse, dumps, row_caster
+from .tracing import TRACING_ENABLED, span, start_trace, end_trace, finish_trace, trace_exporter
+from .profiling import ProfileStore, ProfilingMiddleware, start_profiling
+from .logging_config import RequestIdMiddleware, get_logger
+from .columnar_store import COLUMNAR_DIR, ColumnarStore
+from .recommendation_store import RecommendationStore, RecommendationRefresher, candidate_info_from_row, recommendation_fingerprint, recommendations_served_counter
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from passlib.context import CryptContext
-import mlflow
+import asyncio
+import csv
+import io
+import json
 import os
+import time
 
 
 # Database setup
+logger = get_logger(__name__)
+
 Base = declarative_base()
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -38,7 +63,7 @@ class JobDB(Base):
 class CandidateDB(Base):
     __tablename__ = 'candidates'
     id = Column(Integer, primary_key=True)
-    nom = Column(String)
+    nom = Column(String, index=True)
     email = Column(String)
     compétences = Column(String)
     expérience = Column(Integer)
@@ -50,7 +75,13 @@ class MatchDB(Base):
     id = Column(Integer, primary_key=True)
     job_id = Column(Integer, ForeignKey('jobs.id'))
     candidate_id = Column(Integer, ForeignKey('candidates.id'))
-    score = Column(Integer)
+    score = Column(Integer, index=True)
+    __table_args__ = (
+        # Top-N rankings per candidate and per job are read straight from these
+        # indexes; they also cover lookups on candidate_id or job_id alone.
+        Index("ix_matches_candidate_id_score", "candidate_id", score.desc()),
+        Index("ix_matches_job_id_score", "job_id", score.desc()),
+    )
 
 class Job(BaseModel):
     id: int
@@ -74,6 +105,48 @@ class Match(BaseModel):
     candidate_id: int
     score: float
 
+class JobMatch(Job):
+    score: float
+
+class CandidateMatch(Candidate):
+    score: float
+
+class CatalogVersionDB(Base):
+    __tablename__ = 'catalog_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0) # Bumped by the ETL each time it reloads the jobs table
+
+class RecommendationDB(Base):
+    __tablename__ = 'recommendations'
+    candidate_id = Column(Integer, ForeignKey('candidates.id'), primary_key=True)
+    job_ids = Column(String) # JSON list of recommended job ids, best first
+    fingerprint = Column(String) # Hash of the candidate data, catalog version, model, prompt and profile
+    computed_at = Column(DateTime)
+
+class RecommendationRefreshLeaseDB(Base):
+    __tablename__ = 'recommendation_refresh_lease'
+    id = Column(Integer, primary_key=True) # Single row
+    owner = Column(String) # Refresher currently allowed to regenerate recommendations
+    expires_at = Column(DateTime)
+
+class CVJobDB(Base):
+    __tablename__ = 'cv_jobs'
+    id = Column(String, primary_key=True) # Random hex id returned to the client
+    kind = Column(String) # "recommend_from_cv" or "extract_skills"
+    username = Column(String, index=True)
+    status = Column(String) # queued, running, done or failed
+    cv_content = Column(LargeBinary, nullable=True) # Uploaded PDF, cleared once the job is finished
+    result = Column(Text, nullable=True) # JSON response body
+    error = Column(String, nullable=True)
+    error_status = Column(Integer, nullable=True)
+    attempts = Column(Integer, default=0)
+    created_at = Column(DateTime)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    __table_args__ = (
+        Index("ix_cv_jobs_status_created_at", "status", "created_at"),
+    )
+
 class FeedbackDB(Base):
     __tablename__ = 'feedback'
     id = Column(Integer, primary_key=True, index=True)
@@ -87,6 +160,7 @@ class SkillScore(BaseModel):
 
 class SkillsExtractionResponse(BaseModel):
     extracted_skills: List[SkillScore]
+    degraded: bool = False
 
 class UserCreate(BaseModel):
     username: str
@@ -99,6 +173,18 @@ class User(BaseModel):
 class CVRecommendationResponse(BaseModel):
     recommended_jobs: List[Job]
     career_recommendation_text: str
+    degraded: bool = False
+
+class CVJobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    status_url: str
+    result_url: str
 
 class FeedbackCreate(BaseModel):
     rating: int
@@ -110,14 +196,39 @@ class Feedback(BaseModel):
     rating: int
     comment: str = None
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///emploi.db")
-engine = create_engine(DATABASE_URL)
-Base.metadata.create_all(engine)
-mlflow.set_tracking_uri("http://host.docker.internal:5000")
-print(f"MLflow Tracking URI set to: {mlflow.get_tracking_uri()}")
+engine = create_db_engine(DATABASE_URL)
+
+def ensure_indexes(bind):
+    """
+    Creates the indexes declared on the models that are missing from the
+    database. `create_all` only creates indexes along with new tables, so
+    databases created before an index was declared need this.
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+def init_database(bind):
+    """
+    Creates the missing tables and indexes. Run from the startup hook rather
+    than at import, so importing the module never touches the database.
+    """
+    Base.metadata.create_all(bind)
+    ensure_indexes(bind)
+
+# MLflow runs are buffered and sent by a background thread
+experiment_logger = ExperimentLogger()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Shared, versioned snapshot of the jobs table used by the list and AI endpoints
+job_catalog = JobCatalog(JobDB, CatalogVersionDB)
+
+# Precomputed recommendations, kept up to date by a background worker
+recommendation_store = RecommendationStore(CandidateDB, RecommendationDB, job_catalog)
+# One refresher per process; the lease lets only one of them run at a time
+recommendation_refresher = RecommendationRefresher(recommendation_store, SessionLocal, lease_model=RecommendationRefreshLeaseDB)
+
 # Dependency
 def get_db():
     db = SessionLocal()
@@ -126,7 +237,22 @@ def get_db():
     finally:
         db.close()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(init_database, engine)
+    logger.info("MLflow tracking URI set", extra={"tracking_uri": experiment_logger.tracking_uri})
+    recommendation_refresher.start()
+    cv_job_queue.start()
+    yield
+    await cv_job_queue.stop()
+    await recommendation_refresher.stop()
+    await asyncio.to_thread(experiment_logger.close)
+    if trace_exporter is not None:
+        await asyncio.to_thread(trace_exporter.close)
+    # Release the pooled connections to Ollama
+    await close_async_client()
+
+app = FastAPI(lifespan=lifespan)
 
 # Prometheus Metrics
 non_pdf_upload_counter = Counter(
@@ -139,6 +265,22 @@ instrumentator = Instrumentator()
 instrumentator.instrument(app)
 instrumentator.expose(app, "/metrics")
 
+if TRACING_ENABLED:
+    @app.middleware("http")
+    async def trace_request_stages(request: Request, call_next):
+        # Stages recorded with `span` during the request end up in the Server-Timing header
+        trace, token = start_trace(request.url.path)
+        try:
+            response = await call_next(request)
+        finally:
+            end_trace(token)
+        total = time.perf_counter() - trace.started
+        response.headers["Server-Timing"] = trace.server_timing(total)
+        # Route templates keep the endpoint label bounded (no ids from the path)
+        route = request.scope.get("route")
+        finish_trace(trace, getattr(route, "path", "unmatched"), total)
+        return response
+
 origins = [
     "http://localhost",
     "http://localhost:8000",
@@ -154,9 +296,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Admin-only request profiling (`X-Profile: 1` or `?profile=1`)
+profile_store = ProfileStore()
+app.add_middleware(ProfilingMiddleware, store=profile_store)
+
+# Added last so it wraps everything: every log line of a request carries its id
+app.add_middleware(RequestIdMiddleware)
+
 # Security
 security = HTTPBasic()
 
+# Credentials that already passed bcrypt, so repeated Basic auth requests skip the hash
+credential_cache = VerifiedCredentialCache(
+    max_size=int(os.getenv("AUTH_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL", "300")),
+)
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -166,49 +321,265 @@ def get_password_hash(password):
 def get_user(db: Session, username: str):
     return db.query(UserDB).filter(UserDB.username == username).first()
 
-def get_current_user(credentials: HTTPBasicCredentials = Depends(security), db: Session = Depends(get_db)):
+def authenticate_user(user: UserDB, password: str) -> bool:
+    if credential_cache.is_verified(user.username, password, user.hashed_password):
+        return True
+    if verify_password(password, user.hashed_password):
+        credential_cache.add(user.username, password, user.hashed_password)
+        return True
+    return False
+
+def get_current_user(request: Request, credentials: HTTPBasicCredentials = Depends(security), db: Session = Depends(get_db)):
     user = get_user(db, credentials.username)
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not authenticate_user(user, credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Basic"},
         )
+    # The profiling flag is ignored for everyone but the admin
+    if user.username == "admin":
+        start_profiling(request.scope)
     return user
 
+# Pagination
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+
+class PageParams:
+    """
+    Query parameters shared by the list endpoints: keyset cursor, page size,
+    field projection and optional total count.
+    """
+    def __init__(
+        self,
+        after_id: Optional[int] = Query(None, description="Curseur : ne renvoie que les lignes dont l'id est strictement supérieur (valeur de l'en-tête X-Next-Cursor de la page précédente)."),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Nombre maximal de lignes par page."),
+        fields: Optional[str] = Query(None, description="Liste de champs séparés par des virgules à renvoyer (par exemple `id,title,company`). L'id est toujours inclus."),
+        include_total: bool = Query(True, description="Renvoie le nombre total de lignes dans l'en-tête X-Total-Count. Mettre à false pour éviter le comptage."),
+    ):
+        self.after_id = after_id
+        self.limit = limit
+        self.fields = fields
+        self.include_total = include_total
+
+def select_fields(schema, fields: Optional[str]):
+    if not fields:
+        return list(schema.model_fields)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in schema.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Champ(s) inconnu(s) : {', '.join(unknown)}")
+    return list(dict.fromkeys(["id"] + requested))
+
+def page_response(rows, page: PageParams, count_total, headers=None):
+    """
+    Encodes a page of row dictionaries straight to JSON, with the pagination
+    headers. The rows come from typed columns, so they are not validated
+    again against the response model.
+    """
+    headers = dict(headers or {})
+    if page.include_total:
+        headers["X-Total-Count"] = str(count_total())
+    if len(rows) == page.limit:
+        headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    return FastJSONResponse(content=rows, headers=headers)
+
+def paginate(db: Session, model, schema, page: PageParams):
+    """
+    Returns one page of rows ordered by id, using keyset pagination on `id`.
+
+    Only the selected columns are loaded, as plain rows, so the cost of a page
+    does not depend on the size of the table.
+    """
+    names = select_fields(schema, page.fields)
+    columns = [getattr(model, name) for name in names]
+    query = db.query(*columns).order_by(model.id)
+    if page.after_id is not None:
+        query = query.filter(model.id > page.after_id)
+    cast = row_caster(schema, names)
+    rows = [cast(row._asdict()) for row in query.limit(page.limit)]
+    return page_response(rows, page, lambda: db.query(func.count(model.id)).scalar())
+
+def if_none_match(header: Optional[str], etag: str) -> bool:
+    """
+    Evaluates an If-None-Match header against the current ETag (RFC 9110,
+    section 13.1.2): `*`, or a comma-separated list of entity tags compared
+    weakly, so `W/` tags rewritten by proxies still match.
+    """
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
 # Main Endpoints
 @app.get(
     "/jobs/",
     response_model=List[Job],
-    summary="Récupérer toutes les offres d'emploi",
-    description="Récupère la liste de toutes les offres d'emploi enregistrées dans la base de données. Requiert une authentification (utilisateur ou administrateur).",
+    summary="Récupérer les offres d'emploi",
+    description="Récupère les offres d'emploi enregistrées dans la base de données, page par page (pagination par curseur sur l'id). L'en-tête ETag identifie la version du catalogue et la page (curseur, taille, champs) ; une requête avec If-None-Match correspondant (y compris une étiquette faible `W/` ou `*`) reçoit une réponse 304. Requiert une authentification (utilisateur ou administrateur).",
     tags=["ETL"]
 )
-def read_jobs(db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    jobs = db.query(JobDB).all()
-    return [Job(id=job.id, title=job.title, company=job.company, location=job.location, description=job.description) for job in jobs]
+def read_jobs(request: Request, page: PageParams = Depends(), db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+    # Served from the in-memory catalog snapshot; the ETag is its version plus the page parameters
+    snapshot = job_catalog.get(db)
+    names = select_fields(Job, page.fields) if page.fields else None
+    etag = snapshot.etag(page.after_id, page.limit, names or ())
+    if if_none_match(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    rows = snapshot.page(page.after_id, page.limit)
+    if names:
+        rows = [{name: job[name] for name in names} for job in rows]
+    return page_response(rows, page, lambda: len(snapshot.jobs), headers={"ETag": etag})
 
 @app.get(
     "/candidates/",
     response_model=List[Candidate],
-    summary="Récupérer tous les candidats",
-    description="Récupère la liste de tous les candidats enregistrés dans la base de données. Requiert une authentification (utilisateur ou administrateur).",
+    summary="Récupérer les candidats",
+    description="Récupère les candidats enregistrés dans la base de données, page par page (pagination par curseur sur l'id). Requiert une authentification (utilisateur ou administrateur).",
     tags=["ETL"]
 )
-def read_candidates(db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    candidates = db.query(CandidateDB).all()
-    return [Candidate(id=candidate.id, nom=candidate.nom, email=candidate.email, compétences=candidate.compétences, expérience=candidate.expérience, localisation=candidate.localisation, secteur=candidate.secteur) for candidate in candidates]
+def read_candidates(page: PageParams = Depends(), db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+    return paginate(db, CandidateDB, Candidate, page)
 
 @app.get(
     "/matches/",
     response_model=List[Match],
-    summary="Récupérer toutes les correspondances (matches)",
-    description="Récupère la liste de toutes les correspondances entre les offres d'emploi et les candidats. Requiert une authentification (utilisateur ou administrateur).",
+    summary="Récupérer les correspondances (matches)",
+    description="Récupère les correspondances entre les offres d'emploi et les candidats, page par page (pagination par curseur sur l'id). Requiert une authentification (utilisateur ou administrateur).",
     tags=["ETL"]
 )
-def read_matches(db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
-    matches = db.query(MatchDB).all()
-    return [Match(id=match.id, job_id=match.job_id, candidate_id=match.candidate_id, score=match.score) for match in matches]
+def read_matches(page: PageParams = Depends(), db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+    return paginate(db, MatchDB, Match, page)
+
+TOP_N_DEFAULT = 10
+TOP_N_MAX = 100
+
+# Memory-mapped snapshot written by the ETL; the rankings fall back to SQL without it
+columnar_store = ColumnarStore(COLUMNAR_DIR) if COLUMNAR_DIR else None
+
+def columnar_snapshot():
+    return columnar_store.get() if columnar_store is not None else None
+
+@app.get(
+    "/candidates/{candidate_id}/top_matches",
+    response_model=List[JobMatch],
+    summary="Meilleures offres pour un candidat",
+    description="Renvoie les offres d'emploi ayant le meilleur score de correspondance pré-calculé pour un candidat, par score décroissant. Lu dans l'instantané en colonnes de l'ETL quand `COLUMNAR_DIR` est défini (en-tête `X-Match-Source: columnar`). Requiert une authentification (utilisateur ou administrateur).",
+    tags=["ETL"]
+)
+def read_top_matches_for_candidate(
+    candidate_id: int,
+    limit: int = Query(TOP_N_DEFAULT, ge=1, le=TOP_N_MAX, description="Nombre d'offres à renvoyer."),
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    if db.get(CandidateDB, candidate_id) is None:
+        raise HTTPException(status_code=404, detail=f"Candidat {candidate_id} non trouvé")
+    cast = row_caster(JobMatch)
+    snapshot = columnar_snapshot()
+    ranked = snapshot.top_jobs(candidate_id, limit) if snapshot is not None else None
+    if ranked is not None:
+        return FastJSONResponse(content=[cast(row) for row in ranked], headers={"X-Match-Source": "columnar"})
+    columns = [getattr(JobDB, name) for name in Job.model_fields]
+    rows = (
+        db.query(*columns, MatchDB.score)
+        .join(MatchDB, MatchDB.job_id == JobDB.id)
+        .filter(MatchDB.candidate_id == candidate_id)
+        .order_by(MatchDB.score.desc())
+        .limit(limit)
+    )
+    return FastJSONResponse(content=[cast(row._asdict()) for row in rows])
+
+@app.get(
+    "/jobs/{job_id}/top_candidates",
+    response_model=List[CandidateMatch],
+    summary="Meilleurs candidats pour une offre",
+    description="Renvoie les candidats ayant le meilleur score de correspondance pré-calculé pour une offre d'emploi, par score décroissant. Lu dans l'instantané en colonnes de l'ETL quand `COLUMNAR_DIR` est défini (en-tête `X-Match-Source: columnar`). Requiert une authentification (utilisateur ou administrateur).",
+    tags=["ETL"]
+)
+def read_top_candidates_for_job(
+    job_id: int,
+    limit: int = Query(TOP_N_DEFAULT, ge=1, le=TOP_N_MAX, description="Nombre de candidats à renvoyer."),
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    if db.get(JobDB, job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Offre d'emploi {job_id} non trouvée")
+    cast = row_caster(CandidateMatch)
+    snapshot = columnar_snapshot()
+    ranked = snapshot.top_candidates(job_id, limit) if snapshot is not None else None
+    if ranked is not None:
+        return FastJSONResponse(content=[cast(row) for row in ranked], headers={"X-Match-Source": "columnar"})
+    columns = [getattr(CandidateDB, name) for name in Candidate.model_fields]
+    rows = (
+        db.query(*columns, MatchDB.score)
+        .join(MatchDB, MatchDB.candidate_id == CandidateDB.id)
+        .filter(MatchDB.job_id == job_id)
+        .order_by(MatchDB.score.desc())
+        .limit(limit)
+    )
+    return FastJSONResponse(content=[cast(row._asdict()) for row in rows])
+
+# Export Endpoints
+export_router = APIRouter(prefix="/export", tags=["Export"])
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+EXPORT_TABLES = {
+    "jobs": (JobDB, Job),
+    "candidates": (CandidateDB, Candidate),
+    "matches": (MatchDB, Match),
+}
+
+def stream_export_rows(bind, model, schema, export_format: str):
+    """
+    Yields the table as NDJSON or CSV chunks, one chunk per batch of rows.
+
+    Rows are read through a streaming cursor with its own session, so memory
+    stays proportional to EXPORT_BATCH_SIZE whatever the size of the table.
+    """
+    columns = [getattr(model, name) for name in schema.model_fields]
+    names = list(schema.model_fields)
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(names)
+        yield buffer.getvalue()
+
+    with Session(bind=bind) as stream_db:
+        result = stream_db.execute(
+            select(*columns).order_by(model.id).execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+        )
+        for batch in result.partitions():
+            if export_format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows(batch)
+                yield buffer.getvalue()
+            else:
+                yield b"".join(dumps(dict(zip(names, row))) + b"\n" for row in batch)
+
+@export_router.get(
+    "/{table}",
+    summary="Exporter une table en flux (NDJSON ou CSV)",
+    description="Exporte toutes les lignes d'une table (`jobs`, `candidates` ou `matches`) en flux continu au format NDJSON ou CSV, lot par lot, sans charger la table en mémoire. Requiert une authentification (utilisateur ou administrateur).",
+)
+def export_table(
+    table: str,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Format d'export : `ndjson` ou `csv`."),
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    if table not in EXPORT_TABLES:
+        raise HTTPException(status_code=404, detail=f"Table '{table}' inconnue. Tables exportables : {', '.join(EXPORT_TABLES)}")
+    model, schema = EXPORT_TABLES[table]
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        stream_export_rows(db.get_bind(), model, schema, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{table}.{format}"'},
+    )
 
 # User Management Endpoints
 user_router = APIRouter(prefix="/users", tags=["User Management"])
@@ -249,42 +620,109 @@ def read_users(db: Session = Depends(get_db), current_user: UserDB = Depends(get
 # AI SmartJob Endpoints
 ai_router = APIRouter(prefix="/ai_smartjob", tags=["AI SmartJob"])
 
+# Identical concurrent recommendation requests share one Mistral generation
+recommendation_flights = SingleFlight("recommendations")
+
+def set_generation_headers(response: Response, endpoint: str):
+    """
+    Records the generation profile and effective Ollama options used for the result,
+    so that a response can be reproduced or served again from memoized output.
+    """
+    profile, options = get_generation_options(endpoint)
+    response.headers["X-Generation-Profile"] = profile
+    response.headers["X-Generation-Options"] = json.dumps(options, sort_keys=True, separators=(",", ":"))
+    return profile, options
+
+def set_degraded_headers(response: Response, reason: Optional[str]):
+    """
+    Flags a response that was answered by the local fallback instead of the LLM.
+    """
+    if reason:
+        response.headers["X-Degraded"] = "true"
+        response.headers["X-Degraded-Reason"] = reason
+
+budget_query = Query(
+    None,
+    ge=1,
+    description="Budget de latence en millisecondes. Au-delà, la réponse est calculée localement (par recoupement de mots-clés) et marquée comme dégradée."
+)
+
+def load_recommendation_inputs(db: Session, nom_candidat: str, profile: str, fresh: bool):
+    """
+    Reads everything a recommendation request needs from the database, then
+    releases the connection. Blocking: run it in the threadpool.
+
+    Returns:
+        tuple: The candidate id and info, the catalog snapshot, the recommendation
+               fingerprint and the stored jobs (None when missing, stale or `fresh`).
+    """
+    try:
+        # Récupérer les informations du candidat
+        candidate_db = db.query(CandidateDB).filter(CandidateDB.nom == nom_candidat).first()
+        if not candidate_db:
+            raise HTTPException(status_code=404, detail=f"Candidat '{nom_candidat}' non trouvé")
+        candidate_info = candidate_info_from_row(candidate_db)
+
+        # Récupérer toutes les offres d'emploi (instantané partagé du catalogue)
+        with span("catalog_load"):
+            catalog = job_catalog.get(db)
+        if not catalog.jobs:
+            raise HTTPException(status_code=404, detail="Aucune offre d'emploi trouvée dans la base de données pour la recommandation.")
+
+        fingerprint = recommendation_fingerprint(candidate_info, catalog.version, profile)
+        stored_jobs = None if fresh else recommendation_store.lookup(db, candidate_db.id, fingerprint, catalog)
+        return candidate_db.id, candidate_info, catalog, fingerprint, stored_jobs
+    finally:
+        # Release the connection before queueing for the LLM: under overload the
+        # admission queue, not the DB pool, has to be the one that fills up
+        db.close()
+
 @ai_router.get(
     "/recommendations/{nom_candidat}",
     response_model=List[Job],
     summary="Obtenir des recommandations d'emploi pour un candidat",
-    description="Récupère une liste d'offres d'emploi recommandées pour un candidat spécifique, basée sur ses informations enregistrées. Requiert une authentification (utilisateur ou administrateur).",
+    description="Récupère une liste d'offres d'emploi recommandées pour un candidat spécifique, basée sur ses informations enregistrées. Les recommandations pré-calculées en arrière-plan sont servies tant que le candidat et le catalogue n'ont pas changé ; `fresh=true` force une génération en direct. Requiert une authentification (utilisateur ou administrateur).",
     tags=["AI SmartJob"]
 )
-def get_recommendations_for_candidate(
+async def get_recommendations_for_candidate(
     nom_candidat: str,
+    response: Response,
+    fresh: bool = Query(False, description="Ignore les recommandations pré-calculées et interroge le modèle en direct."),
+    budget_ms: Optional[int] = budget_query,
     db: Session = Depends(get_db),
     current_user: UserDB = Depends(get_current_user)
 ):
-    # Récupérer les informations du candidat
-    candidate_db = db.query(CandidateDB).filter(CandidateDB.nom == nom_candidat).first()
-    if not candidate_db:
-        raise HTTPException(status_code=404, detail=f"Candidat '{nom_candidat}' non trouvé")
-
-    candidate_info = {
-        "nom": candidate_db.nom,
-        "compétences": candidate_db.compétences,
-        "expérience": candidate_db.expérience,
-        "localisation": candidate_db.localisation,
-        "secteur": candidate_db.secteur
-    }
-
-    # Récupérer toutes les offres d'emploi
-    all_jobs_db = db.query(JobDB).all()
-    all_jobs_list = [
-        {"id": job.id, "title": job.title, "company": job.company, "location": job.location, "description": job.description}
-        for job in all_jobs_db
-    ]
-    if not all_jobs_list:
-        raise HTTPException(status_code=404, detail="Aucune offre d'emploi trouvée dans la base de données pour la recommandation.")
+    profile, _ = set_generation_headers(response, "recommendations")
+    candidate_id, candidate_info, catalog, fingerprint, stored_jobs = await run_in_threadpool(
+        load_recommendation_inputs, db, nom_candidat, profile, fresh
+    )
+    all_jobs_list = catalog.jobs
+
+    # Servir les recommandations pré-calculées si elles sont à jour
+    if stored_jobs is not None:
+        recommendations_served_counter.labels(source="precomputed").inc()
+        response.headers["X-Recommendation-Source"] = "precomputed"
+        return [Job(**job_data) for job_data in stored_jobs]
 
     # Obtenir les recommandations du modèle AI
-    recommended_jobs_data = get_ai_recommendations(candidate_info, all_jobs_list)
+    async def generate():
+        async with get_admission_controller("recommendations").slot(current_user.username):
+            return await get_ai_recommendations_async(candidate_info, all_jobs_list)
+
+    flight_key = (candidate_id, catalog.version, OLLAMA_MODEL, RECOMMENDATION_PROMPT_VERSION, profile)
+    recommended_jobs_data, degraded_reason = await call_with_fallback(
+        "recommendations",
+        lambda: recommendation_flights.do(flight_key, generate),
+        lambda: local_recommendations(candidate_info, all_jobs_list),
+        budget_ms,
+    )
+    set_degraded_headers(response, degraded_reason)
+    recommendations_served_counter.labels(source="degraded" if degraded_reason else "live").inc()
+    response.headers["X-Recommendation-Source"] = "degraded" if degraded_reason else "live"
+
+    # Store the live answer so that the next request is served from the table
+    if recommended_jobs_data and not degraded_reason:
+        await run_in_threadpool(recommendation_store.save, db, candidate_id, fingerprint, recommended_jobs_data)
 
     # Convertir les données des offres d'emploi recommandées en modèles Pydantic Job pour la réponse
     response_jobs = []
@@ -293,6 +731,86 @@ def get_recommendations_for_candidate(
     
     return response_jobs
 
+async def read_cv_text(cv_content: bytes) -> str:
+    # PDF parsing is CPU-bound: keep it off the event loop
+    cv_text = await run_in_threadpool(extract_text_from_pdf, cv_content)
+    if not cv_text.strip():
+        raise HTTPException(status_code=400, detail="Impossible d'extraire le texte du PDF. Le PDF pourrait être vide ou basé sur des images.")
+    return cv_text
+
+async def analyse_cv_for_recommendations(cv_text: str, db: Session, username: str, budget_ms: Optional[int] = None):
+    """
+    Recommends jobs and writes a career analysis for a CV, with the local fallback.
+
+    Returns:
+        tuple: The CVRecommendationResponse and the degradation reason, or None.
+    """
+    # Retrieve all jobs from the shared catalog snapshot
+    with span("catalog_load"):
+        all_jobs_list = (await run_in_threadpool(job_catalog.get, db)).jobs
+    # Nothing else is read from the database: don't hold a connection while waiting for a slot
+    await run_in_threadpool(db.close)
+    if not all_jobs_list:
+        raise HTTPException(status_code=404, detail="No jobs found in database to recommend from.")
+
+    async def generate():
+        async with get_admission_controller("recommend_from_cv").slot(username):
+            return await get_ai_recommendations_from_cv_async(cv_text, all_jobs_list)
+
+    (recommended_jobs_data, career_recommendation_text), degraded_reason = await call_with_fallback(
+        "recommend_from_cv",
+        generate,
+        lambda: local_recommendations_from_cv(cv_text, all_jobs_list),
+        budget_ms,
+    )
+
+    response_jobs = []
+    for job_data in recommended_jobs_data:
+        response_jobs.append(Job(**job_data))
+
+    recommendation = CVRecommendationResponse(
+        recommended_jobs=response_jobs,
+        career_recommendation_text=career_recommendation_text,
+        degraded=degraded_reason is not None
+    )
+    return recommendation, degraded_reason
+
+async def analyse_cv_skills(cv_text: str, username: str, budget_ms: Optional[int] = None):
+    """
+    Extracts scored skills from a CV, with the local fallback, and queues an MLflow run.
+
+    Returns:
+        tuple: The SkillsExtractionResponse and the degradation reason, or None.
+    """
+    profile, options = get_generation_options("extract_skills")
+
+    async def generate():
+        async with get_admission_controller("extract_skills").slot(username):
+            return await extract_skills_with_scores_from_cv_async(cv_text)
+
+    extracted_skills, degraded_reason = await call_with_fallback(
+        "extract_skills",
+        generate,
+        lambda: local_skills_from_cv(cv_text),
+        budget_ms,
+    )
+
+    # Queued for the background MLflow logger: never waits for the tracking server
+    experiment_logger.log_run(
+        params={
+            "cv_text_length": len(cv_text),
+            # The effective generation options, so the run can be reproduced
+            "generation_profile": profile,
+            **{f"option_{name}": value for name, value in options.items()},
+            "degraded": degraded_reason is not None,
+        },
+        metrics={"num_extracted_skills": len(extracted_skills)},
+        dicts={"extracted_skills.json": {"extracted_skills": extracted_skills}},
+    )
+
+    skills = SkillsExtractionResponse(extracted_skills=extracted_skills, degraded=degraded_reason is not None)
+    return skills, degraded_reason
+
 @ai_router.post(
     "/recommend_from_cv/",
     response_model=CVRecommendationResponse,
@@ -301,7 +819,9 @@ def get_recommendations_for_candidate(
     tags=["AI SmartJob"]
 )
 async def recommend_jobs_from_cv(
+    response: Response,
     fichier_cv: UploadFile = File(..., description="Le fichier PDF du CV à télécharger."),
+    budget_ms: Optional[int] = budget_query,
     db: Session = Depends(get_db),
     current_user: UserDB = Depends(get_current_user)
 ):
@@ -310,35 +830,19 @@ async def recommend_jobs_from_cv(
         raise HTTPException(status_code=400, detail="Seuls les fichiers PDF sont supportés.")
 
     try:
-        cv_content = await fichier_cv.read()
-        cv_text = extract_text_from_pdf(cv_content)
-        
-        if not cv_text.strip():
-            raise HTTPException(status_code=400, detail="Impossible d'extraire le texte du PDF. Le PDF pourrait être vide ou basé sur des images.")
-
-        # Retrieve all jobs
-        all_jobs_db = db.query(JobDB).all()
-        all_jobs_list = [
-            {"id": job.id, "title": job.title, "company": job.company, "location": job.location, "description": job.description}
-            for job in all_jobs_db
-        ]
-        if not all_jobs_list:
-            raise HTTPException(status_code=404, detail="No jobs found in database to recommend from.")
-
-        recommended_jobs_data, career_recommendation_text = get_ai_recommendations_from_cv(cv_text, all_jobs_list)
-
-        response_jobs = []
-        for job_data in recommended_jobs_data:
-            response_jobs.append(Job(**job_data))
-        
-        return CVRecommendationResponse(
-            recommended_jobs=response_jobs,
-            career_recommendation_text=career_recommendation_text
-        )
+        with span("upload_read"):
+            cv_content = await fichier_cv.read()
+        cv_text = await read_cv_text(cv_content)
+
+        set_generation_headers(response, "recommend_from_cv")
+        recommendation, degraded_reason = await analyse_cv_for_recommendations(cv_text, db, current_user.username, budget_ms)
+        set_degraded_headers(response, degraded_reason)
+        return recommendation
 
     except HTTPException as e:
         raise e
     except Exception as e:
+        logger.exception("Error in recommend_jobs_from_cv")
         raise HTTPException(status_code=500, detail=f"Une erreur interne du serveur s'est produite : {e}")
 
 @ai_router.post(
@@ -349,45 +853,176 @@ async def recommend_jobs_from_cv(
     tags=["AI SmartJob"]
 )
 async def extract_skills_from_cv_endpoint(
+    response: Response,
     fichier_cv: UploadFile = File(..., description="Le fichier PDF du CV à télécharger."),
+    budget_ms: Optional[int] = budget_query,
+    db: Session = Depends(get_db),
     current_user: UserDB = Depends(get_current_user)
 ):
+    # The session only served authentication: don't hold a connection while waiting for a slot
+    await run_in_threadpool(db.close)
     if not fichier_cv.filename.endswith('.pdf'):
         non_pdf_upload_counter.labels(endpoint="/ai_smartjob/extract_skills_from_cv/").inc()
         raise HTTPException(status_code=400, detail="Seuls les fichiers PDF sont supportés.")
 
     try:
-        cv_content = await fichier_cv.read()
-        cv_text = extract_text_from_pdf(cv_content)
-        
-        if not cv_text.strip():
-            raise HTTPException(status_code=400, detail="Impossible d'extraire le texte du PDF. Le PDF pourrait être vide ou basé sur des images.")
-
-        with mlflow.start_run():
-            # Log input CV text (or a hash/summary to avoid logging large texts)
-            mlflow.log_param("cv_text_length", len(cv_text))
-            
-            # import hashlib
-            # mlflow.log_param("cv_content_hash", hashlib.sha256(cv_content).hexdigest())
-
-            extracted_skills = extract_skills_with_scores_from_cv(cv_text)
-            
-            # Log extracted skills as a dictionary or JSON
-            # The extract_skills_with_scores_from_cv function already returns a list of dictionaries
-            mlflow.log_dict({"extracted_skills": extracted_skills}, "extracted_skills.json")
-            mlflow.log_metric("num_extracted_skills", len(extracted_skills))
-
-        return SkillsExtractionResponse(extracted_skills=extracted_skills)
+        with span("upload_read"):
+            cv_content = await fichier_cv.read()
+        cv_text = await read_cv_text(cv_content)
+
+        set_generation_headers(response, "extract_skills")
+        skills, degraded_reason = await analyse_cv_skills(cv_text, current_user.username, budget_ms)
+        set_degraded_headers(response, degraded_reason)
+        return skills
 
     except HTTPException as e:
         raise e
     except Exception as e:
-        # Log exceptions to MLflow if a run is active, or just print/log
-        print(f"Error in extract_skills_from_cv_endpoint: {e}")
+        logger.exception("Error in extract_skills_from_cv_endpoint")
         raise HTTPException(status_code=500, detail=f"Une erreur interne du serveur s'est produite : {e}")
 
+# Asynchronous CV analysis: the upload returns a job id, a worker pool runs the
+# analysis and the client polls for the result.
+async def run_recommend_from_cv_job(db: Session, cv_content: bytes, username: str):
+    cv_text = await read_cv_text(cv_content)
+    recommendation, _ = await analyse_cv_for_recommendations(cv_text, db, username)
+    return recommendation.model_dump()
+
+async def run_extract_skills_job(db: Session, cv_content: bytes, username: str):
+    cv_text = await read_cv_text(cv_content)
+    skills, _ = await analyse_cv_skills(cv_text, username)
+    return skills.model_dump()
+
+cv_job_queue = CVJobQueue(CVJobDB, SessionLocal, {
+    "recommend_from_cv": run_recommend_from_cv_job,
+    "extract_skills": run_extract_skills_job,
+})
+
+def cv_job_status(job: CVJobDB) -> CVJobStatus:
+    return CVJobStatus(
+        job_id=job.id,
+        kind=job.kind,
+        status=job.status,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        error=job.error,
+        status_url=f"/ai_smartjob/jobs/{job.id}",
+        result_url=f"/ai_smartjob/jobs/{job.id}/result",
+    )
+
+async def submit_cv_job(kind: str, endpoint: str, fichier_cv: UploadFile, db: Session, current_user: UserDB):
+    if not fichier_cv.filename.endswith('.pdf'):
+        non_pdf_upload_counter.labels(endpoint=endpoint).inc()
+        raise HTTPException(status_code=400, detail="Seuls les fichiers PDF sont supportés.")
+    with span("upload_read"):
+        cv_content = await fichier_cv.read()
+    # Inserting the PDF and committing is blocking I/O: keep it off the event loop
+    job = await run_in_threadpool(cv_job_queue.submit, db, kind, current_user.username, cv_content)
+    return cv_job_status(job)
+
+def get_own_cv_job(job_id: str, db: Session, current_user: UserDB) -> CVJobDB:
+    job = cv_job_queue.get(db, job_id)
+    if job is None or (job.username != current_user.username and current_user.username != "admin"):
+        raise HTTPException(status_code=404, detail=f"Tâche '{job_id}' non trouvée")
+    return job
+
+@ai_router.post(
+    "/jobs/recommend_from_cv/",
+    response_model=CVJobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Soumettre un CV pour des recommandations (asynchrone)",
+    description="Enregistre un CV PDF pour une analyse de recommandations en arrière-plan et renvoie immédiatement l'identifiant de la tâche. Le résultat s'obtient ensuite via `result_url`. Requiert une authentification (utilisateur ou administrateur).",
+    tags=["AI SmartJob"]
+)
+async def submit_recommend_from_cv_job(
+    fichier_cv: UploadFile = File(..., description="Le fichier PDF du CV à télécharger."),
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    return await submit_cv_job("recommend_from_cv", "/ai_smartjob/jobs/recommend_from_cv/", fichier_cv, db, current_user)
+
+@ai_router.post(
+    "/jobs/extract_skills_from_cv/",
+    response_model=CVJobStatus,
+    status_code=status.HTTP_202_ACCEPTED,
+    summary="Soumettre un CV pour l'extraction de compétences (asynchrone)",
+    description="Enregistre un CV PDF pour une extraction de compétences en arrière-plan et renvoie immédiatement l'identifiant de la tâche. Le résultat s'obtient ensuite via `result_url`. Requiert une authentification (utilisateur ou administrateur).",
+    tags=["AI SmartJob"]
+)
+async def submit_extract_skills_job(
+    fichier_cv: UploadFile = File(..., description="Le fichier PDF du CV à télécharger."),
+    db: Session = Depends(get_db),
+    current_user: UserDB = Depends(get_current_user)
+):
+    return await submit_cv_job("extract_skills", "/ai_smartjob/jobs/extract_skills_from_cv/", fichier_cv, db, current_user)
+
+@ai_router.get(
+    "/jobs/{job_id}",
+    response_model=CVJobStatus,
+    summary="Consulter l'état d'une analyse de CV",
+    description="Renvoie l'état d'une tâche d'analyse de CV (`queued`, `running`, `done` ou `failed`). Seul l'auteur de la tâche ou l'administrateur y a accès.",
+    tags=["AI SmartJob"]
+)
+def read_cv_job(job_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+    return cv_job_status(get_own_cv_job(job_id, db, current_user))
+
+@ai_router.get(
+    "/jobs/{job_id}/result",
+    response_model=Any,
+    summary="Récupérer le résultat d'une analyse de CV",
+    description="Renvoie le résultat d'une tâche terminée, au format de l'appel synchrone correspondant. Tant que la tâche n'est pas terminée, renvoie 202 avec son état et un en-tête Retry-After ; si elle a échoué, renvoie l'erreur d'origine.",
+    tags=["AI SmartJob"]
+)
+def read_cv_job_result(job_id: str, db: Session = Depends(get_db), current_user: UserDB = Depends(get_current_user)):
+    job = get_own_cv_job(job_id, db, current_user)
+    if job.status == "done":
+        return JSONResponse(content=json.loads(job.result))
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error_status or 500, detail=job.error)
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=cv_job_status(job).model_dump(mode="json"),
+        headers={"Retry-After": str(max(1, int(cv_job_queue.poll_interval)))},
+    )
+
+# Profiling Endpoints
+profile_router = APIRouter(prefix="/profiles", tags=["Profiling"])
+
+@profile_router.get(
+    "/",
+    response_model=List[str],
+    summary="Lister les profils de requêtes",
+    description="Liste les identifiants des profils enregistrés, du plus récent au plus ancien. Un profil est créé lorsqu'un administrateur envoie une requête avec l'en-tête `X-Profile: 1` ou le paramètre `?profile=1` ; son identifiant est renvoyé dans l'en-tête `X-Profile-Id`. Requiert des privilèges d'administrateur."
+)
+def read_profiles(current_user: UserDB = Depends(get_current_user)):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admin can view profiles")
+    return profile_store.list()
+
+@profile_router.get(
+    "/{profile_id}",
+    response_class=PlainTextResponse,
+    summary="Obtenir un profil de requête",
+    description="Renvoie un profil enregistré, sous forme d'arbre d'appels (`format=tree`) ou de piles repliées compatibles avec flamegraph.pl et speedscope (`format=collapsed`). Requiert des privilèges d'administrateur."
+)
+def read_profile(
+    profile_id: str,
+    format: str = Query("tree", pattern="^(tree|collapsed)$", description="`tree` ou `collapsed`."),
+    current_user: UserDB = Depends(get_current_user)
+):
+    if current_user.username != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admin can view profiles")
+    path = profile_store.path(profile_id, format)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Profil '{profile_id}' non trouvé")
+    with open(path, "r", encoding="utf-8") as f:
+        return PlainTextResponse(f.read())
+
 app.include_router(user_router)
+app.include_router(export_router)
 app.include_router(ai_router)
+app.include_router(profile_router)
 
 # Feedback Endpoints
 @app.post(
@@ -0,0 +1,63 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class VerifiedCredentialCache:
+    """
+    Bounded TTL cache of credentials that already passed the bcrypt check.
+
+    Entries are HMAC digests of (username, password, stored hash) under a
+    per-process random key, so plain passwords are never kept in memory and a
+    password change (a new stored hash) invalidates the entry automatically.
+    A lookup costs one HMAC-SHA256 instead of a full bcrypt verification.
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._key = os.urandom(32)
+        self._entries = OrderedDict() # username -> (digest, expires_at)
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_size > 0 and self.ttl > 0
+
+    def _digest(self, username: str, password: str, hashed_password: str) -> bytes:
+        message = "\0".join((username, password, hashed_password)).encode("utf-8")
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def is_verified(self, username: str, password: str, hashed_password: str) -> bool:
+        if not self.enabled:
+            return False
+        digest = self._digest(username, password, hashed_password)
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return False
+            cached_digest, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[username]
+                return False
+            self._entries.move_to_end(username)
+        return hmac.compare_digest(cached_digest, digest)
+
+    def add(self, username: str, password: str, hashed_password: str):
+        if not self.enabled:
+            return
+        digest = self._digest(username, password, hashed_password)
+        with self._lock:
+            self._entries[username] = (digest, time.monotonic() + self.ttl)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
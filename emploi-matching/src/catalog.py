@@ -0,0 +1,87 @@
+import bisect
+import hashlib
+import os
+import threading
+import time
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+CATALOG_CHECK_INTERVAL = float(os.getenv("CATALOG_CHECK_INTERVAL", "1"))
+JOB_FIELDS = ("id", "title", "company", "location", "description")
+
+def compute_catalog_version(jobs):
+    """
+    Returns a short digest of the job catalog content.
+    """
+    digest = hashlib.sha1()
+    for job in jobs:
+        digest.update("\x1f".join(str(job[field]) for field in JOB_FIELDS).encode("utf-8") + b"\x1e")
+    return digest.hexdigest()[:16]
+
+class CatalogSnapshot:
+    """
+    An immutable view of the jobs table: job dictionaries sorted by id and the
+    version (content digest) they were built from. Consumers must not mutate it.
+    """
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.ids = [job["id"] for job in jobs]
+        self.version = compute_catalog_version(jobs)
+
+    def etag(self, after_id=None, limit=None, fields=()):
+        """
+        Returns the strong ETag of one page: each cursor, page size and field
+        projection is a different representation of the same catalog version.
+        """
+        page_key = f"{after_id}:{limit}:{','.join(fields)}"
+        return f'"{self.version}-{hashlib.sha1(page_key.encode("utf-8")).hexdigest()[:8]}"'
+
+    def page(self, after_id=None, limit=None):
+        start = 0 if after_id is None else bisect.bisect_right(self.ids, after_id)
+        end = len(self.jobs) if limit is None else start + limit
+        return self.jobs[start:end]
+
+class JobCatalog:
+    """
+    Process-wide job catalog, loaded once and reloaded only when it changes.
+
+    A change is detected from a cheap signature: the change counter bumped by
+    the ETL in the `catalog_version` table, plus the row count and max id of
+    the jobs table for writers that do not bump it. The signature is checked
+    at most every CATALOG_CHECK_INTERVAL seconds.
+    """
+    def __init__(self, job_model, version_model, check_interval: float = CATALOG_CHECK_INTERVAL):
+        self.job_model = job_model
+        self.version_model = version_model
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._signature = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _read_signature(self, db: Session):
+        counter = db.query(self.version_model.version).filter(self.version_model.id == 1).scalar()
+        count, max_id = db.query(func.count(self.job_model.id), func.max(self.job_model.id)).one()
+        return (counter, count, max_id)
+
+    def _load(self, db: Session):
+        columns = [getattr(self.job_model, field) for field in JOB_FIELDS]
+        rows = db.query(*columns).order_by(self.job_model.id).all()
+        return CatalogSnapshot([row._asdict() for row in rows])
+
+    def get(self, db: Session) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        with self._lock:
+            signature = self._read_signature(db)
+            if self._snapshot is None or signature != self._signature:
+                self._snapshot = self._load(db)
+                self._signature = signature
+            self._checked_at = time.monotonic()
+            return self._snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._signature = None
@@ -0,0 +1,56 @@
+import time
+from prometheus_client import Gauge
+
+circuit_open_gauge = Gauge(
+    "llm_circuit_open",
+    "1 if the circuit breaker in front of the LLM is open, 0 otherwise",
+    ["name"]
+)
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a failing dependency for a while.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    `allow_request()` returns False. Once `reset_timeout` seconds have passed,
+    a single probe request is let through every `reset_timeout` seconds; the
+    first success closes the circuit again.
+    """
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        circuit_open_gauge.labels(name=name).set(0)
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def allow_request(self) -> bool:
+        if self._opened_at is None:
+            return True
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            # Half-open: let this request probe the dependency and re-arm the timer
+            self._opened_at = time.monotonic()
+            return True
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        if self._opened_at is not None:
+            self._opened_at = None
+            circuit_open_gauge.labels(name=self.name).set(0)
+
+    def record_failure(self):
+        self._failures += 1
+        if self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                circuit_open_gauge.labels(name=self.name).set(1)
+            self._opened_at = time.monotonic()
+
+    def reset(self):
+        self._failures = 0
+        self._opened_at = None
+        circuit_open_gauge.labels(name=self.name).set(0)
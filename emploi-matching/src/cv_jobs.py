@@ -0,0 +1,227 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from prometheus_client import Gauge, Histogram
+from sqlalchemy import and_, delete, func, or_, update
+from sqlalchemy.orm import Session
+
+try:
+    from .admission import AdmissionRejected
+    from .logging_config import get_logger
+except ImportError:
+    from admission import AdmissionRejected
+    from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+CV_JOB_WORKERS = int(os.getenv("CV_JOB_WORKERS", "2"))
+CV_JOB_POLL_INTERVAL = float(os.getenv("CV_JOB_POLL_INTERVAL", "1"))
+CV_JOB_LEASE_TIMEOUT = float(os.getenv("CV_JOB_LEASE_TIMEOUT", "900"))
+CV_JOB_RETENTION = float(os.getenv("CV_JOB_RETENTION", "86400"))
+CV_JOB_METRICS_INTERVAL = float(os.getenv("CV_JOB_METRICS_INTERVAL", "5"))
+
+# Prometheus Metrics
+cv_job_queue_length_gauge = Gauge(
+    "cv_job_queue_length",
+    "Number of CV analysis jobs waiting for a worker"
+)
+cv_job_oldest_age_gauge = Gauge(
+    "cv_job_oldest_age_seconds",
+    "Age of the oldest CV analysis job waiting for a worker"
+)
+cv_job_processing_histogram = Histogram(
+    "cv_job_processing_seconds",
+    "Time spent processing a CV analysis job",
+    ["kind", "status"],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+
+def utcnow() -> datetime:
+    # Naive UTC, as stored by SQLite
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class CVJobQueue:
+    """
+    Database-backed queue for CV analyses, processed by in-process workers.
+
+    Jobs are rows of the `cv_jobs` table. A worker claims the oldest queued
+    job with a conditional UPDATE, so several workers (or API processes
+    sharing the database) never run the same job twice. A job left "running"
+    for longer than `lease_timeout` seconds, e.g. after a crash, is picked up
+    again. Every `metrics_interval` seconds, busy or idle, a worker refreshes
+    the queue gauges and purges the expired results.
+
+    Args:
+        job_model: The SQLAlchemy model of the `cv_jobs` table.
+        session_factory: Creates the database sessions used by the workers.
+        handlers (dict): Maps a job kind to a coroutine function taking
+            (db, cv_content, username) and returning a JSON-serializable result.
+    """
+    def __init__(self, job_model, session_factory, handlers, workers: int = CV_JOB_WORKERS,
+                 poll_interval: float = CV_JOB_POLL_INTERVAL, lease_timeout: float = CV_JOB_LEASE_TIMEOUT,
+                 retention: float = CV_JOB_RETENTION, metrics_interval: float = CV_JOB_METRICS_INTERVAL):
+        self.job_model = job_model
+        self.session_factory = session_factory
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease_timeout = lease_timeout
+        self.retention = retention
+        self.metrics_interval = metrics_interval
+        self._tasks = []
+        self._wakeup = None
+        self._purged_at = 0.0
+        self._metrics_at = float("-inf")
+
+    def submit(self, db: Session, kind: str, username: str, cv_content: bytes):
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown CV job kind '{kind}'.")
+        job = self.job_model(
+            id=uuid.uuid4().hex,
+            kind=kind,
+            username=username,
+            status="queued",
+            cv_content=cv_content,
+            attempts=0,
+            created_at=utcnow(),
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return job
+
+    def get(self, db: Session, job_id: str):
+        return db.get(self.job_model, job_id)
+
+    def _claimable(self, now: datetime):
+        model = self.job_model
+        lease_expired = now - timedelta(seconds=self.lease_timeout)
+        return or_(model.status == "queued", and_(model.status == "running", model.started_at < lease_expired))
+
+    def _claim(self):
+        model = self.job_model
+        db = self.session_factory()
+        try:
+            while True:
+                now = utcnow()
+                job_id = db.query(model.id).filter(self._claimable(now)).order_by(model.created_at).limit(1).scalar()
+                if job_id is None:
+                    return None
+                claimed = db.execute(
+                    update(model)
+                    .where(model.id == job_id, self._claimable(now))
+                    .values(status="running", started_at=now, attempts=model.attempts + 1)
+                ).rowcount
+                db.commit()
+                if claimed:
+                    job = db.get(model, job_id)
+                    return job.id, job.kind, job.username, job.cv_content
+                # Another worker claimed it first: try the next one
+        finally:
+            db.close()
+
+    def _update(self, job_id: str, **values):
+        db = self.session_factory()
+        try:
+            db.execute(update(self.job_model).where(self.job_model.id == job_id).values(**values))
+            db.commit()
+        finally:
+            db.close()
+
+    def _refresh_metrics(self):
+        model = self.job_model
+        db = self.session_factory()
+        try:
+            count, oldest = db.query(func.count(model.id), func.min(model.created_at)).filter(model.status == "queued").one()
+            cv_job_queue_length_gauge.set(count)
+            cv_job_oldest_age_gauge.set((utcnow() - oldest).total_seconds() if oldest else 0)
+
+            if time.monotonic() - self._purged_at > 60:
+                # Drop finished jobs once their results are past the retention period
+                db.execute(delete(model).where(model.finished_at < utcnow() - timedelta(seconds=self.retention)))
+                db.commit()
+                self._purged_at = time.monotonic()
+        finally:
+            db.close()
+
+    async def _run_handler(self, kind: str, cv_content: bytes, username: str):
+        db = self.session_factory()
+        try:
+            return await self.handlers[kind](db, cv_content, username)
+        finally:
+            db.close()
+
+    async def process_next(self) -> bool:
+        """
+        Claims and processes the oldest queued job.
+
+        Returns:
+            bool: False if there was no job to process.
+        """
+        claimed = await asyncio.to_thread(self._claim)
+        if claimed is None:
+            return False
+        job_id, kind, username, cv_content = claimed
+
+        started = time.perf_counter()
+        try:
+            result = await self._run_handler(kind, cv_content, username)
+        except AdmissionRejected as e:
+            # The LLM is saturated: put the job back and let the worker back off
+            await asyncio.to_thread(self._update, job_id, status="queued", started_at=None)
+            await asyncio.sleep(float(e.headers.get("Retry-After", self.poll_interval)))
+            return True
+        except HTTPException as e:
+            status, values = "failed", {"error": str(e.detail), "error_status": e.status_code}
+        except Exception as e:
+            logger.exception("CV job failed", extra={"job_id": job_id})
+            status, values = "failed", {"error": f"Une erreur interne du serveur s'est produite : {e}", "error_status": 500}
+        else:
+            status, values = "done", {"result": json.dumps(result, ensure_ascii=False)}
+
+        # The uploaded CV is no longer needed once the job is finished
+        await asyncio.to_thread(self._update, job_id, status=status, finished_at=utcnow(), cv_content=None, **values)
+        cv_job_processing_histogram.labels(kind=kind, status=status).observe(time.perf_counter() - started)
+        return True
+
+    async def _worker(self):
+        while True:
+            try:
+                # On a timer rather than only when idle, so a busy queue still reports its backlog
+                if time.monotonic() - self._metrics_at >= self.metrics_interval:
+                    self._metrics_at = time.monotonic()
+                    await asyncio.to_thread(self._refresh_metrics)
+                if await self.process_next():
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("CV job worker error")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self):
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._wakeup = None
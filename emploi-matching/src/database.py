@@ -0,0 +1,77 @@
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///emploi.db")
+
+# SQLite settings, applied to every new connection
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+# Connection pool settings (file SQLite databases and server databases)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+def _is_memory_database(url) -> bool:
+    return url.database in (None, "", ":memory:") or "mode=memory" in str(url)
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Switches a new SQLite connection to WAL mode and applies the tuning pragmas.
+
+    In WAL mode readers no longer wait for the writer, so the API keeps
+    answering while the ETL is loading data. `synchronous=NORMAL` is durable
+    across application crashes in WAL mode and avoids an fsync per commit.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+def create_db_engine(database_url: str = None, **kwargs):
+    """
+    Creates the SQLAlchemy engine shared by the API and the ETL.
+
+    Args:
+        database_url (str, optional): The database URL. Defaults to `DATABASE_URL`.
+        **kwargs: Extra arguments passed to `create_engine`, overriding the defaults.
+
+    Returns:
+        Engine: An engine with WAL mode and tuned pragmas for SQLite files, or
+                a sized, pre-pinged connection pool for server databases such
+                as PostgreSQL.
+    """
+    url = make_url(database_url or DATABASE_URL)
+
+    if url.get_backend_name() == "sqlite":
+        if _is_memory_database(url):
+            # In-memory databases live in a single connection: keep SQLAlchemy's defaults
+            return create_engine(url, **kwargs)
+        options = {
+            "pool_size": DB_POOL_SIZE,
+            "max_overflow": DB_MAX_OVERFLOW,
+            "pool_timeout": DB_POOL_TIMEOUT,
+            "connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        }
+        options.update(kwargs)
+        engine = create_engine(url, **options)
+        event.listen(engine, "connect", set_sqlite_pragmas)
+        return engine
+
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        # Drop connections closed by the server or a proxy instead of failing a request
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    options.update(kwargs)
+    return create_engine(url, **options)
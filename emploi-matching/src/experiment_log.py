@@ -0,0 +1,166 @@
+import os
+import queue
+import random
+import threading
+import time
+from prometheus_client import Counter, Gauge
+
+try:
+    from .logging_config import get_logger
+except ImportError:
+    from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://host.docker.internal:5000")
+MLFLOW_EXPERIMENT_ID = os.getenv("MLFLOW_EXPERIMENT_ID", "0")
+MLFLOW_SAMPLE_RATE = float(os.getenv("MLFLOW_SAMPLE_RATE", "1"))
+MLFLOW_QUEUE_SIZE = int(os.getenv("MLFLOW_QUEUE_SIZE", "1000"))
+MLFLOW_FLUSH_INTERVAL = float(os.getenv("MLFLOW_FLUSH_INTERVAL", "5"))
+MLFLOW_BATCH_SIZE = int(os.getenv("MLFLOW_BATCH_SIZE", "50"))
+
+# Prometheus Metrics
+experiment_log_counter = Counter(
+    "mlflow_log_entries_total",
+    "Total number of experiment log entries, by outcome (queued, sampled_out, dropped, logged, failed)",
+    ["outcome"]
+)
+experiment_log_queue_gauge = Gauge(
+    "mlflow_log_queue_depth",
+    "Number of experiment log entries waiting to be sent to MLflow"
+)
+
+_STOP = object()
+
+class ExperimentLogger:
+    """
+    Sends MLflow runs from a background thread, off the request path.
+
+    `log_run` only samples the entry and puts it in a bounded in-memory
+    queue; when the queue is full the entry is dropped instead of slowing
+    the request down. The thread sends the queued runs in batches every
+    `flush_interval` seconds (or as soon as `batch_size` entries are
+    waiting), each with a single `log_batch` call. If MLflow is unreachable
+    the batch is dropped and counted as failed.
+    """
+    def __init__(self, tracking_uri: str = MLFLOW_TRACKING_URI, experiment_id: str = MLFLOW_EXPERIMENT_ID,
+                 sample_rate: float = MLFLOW_SAMPLE_RATE, max_queue: int = MLFLOW_QUEUE_SIZE,
+                 flush_interval: float = MLFLOW_FLUSH_INTERVAL, batch_size: int = MLFLOW_BATCH_SIZE):
+        self.tracking_uri = tracking_uri
+        self.experiment_id = experiment_id
+        self.sample_rate = sample_rate
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._client = None
+
+    def log_run(self, params: dict = None, metrics: dict = None, dicts: dict = None) -> bool:
+        """
+        Queues one MLflow run. Never blocks and never raises.
+
+        Args:
+            params (dict, optional): Run parameters.
+            metrics (dict, optional): Run metrics.
+            dicts (dict, optional): Maps an artifact file name to a dictionary
+                logged as JSON.
+
+        Returns:
+            bool: True if the run was queued, False if it was sampled out or dropped.
+        """
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            experiment_log_counter.labels(outcome="sampled_out").inc()
+            return False
+        entry = {
+            "params": params or {},
+            "metrics": metrics or {},
+            "dicts": dicts or {},
+            "timestamp": int(time.time() * 1000),
+        }
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            experiment_log_counter.labels(outcome="dropped").inc()
+            return False
+        experiment_log_counter.labels(outcome="queued").inc()
+        experiment_log_queue_gauge.set(self._queue.qsize())
+        self._ensure_started()
+        return True
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="mlflow-logger", daemon=True)
+                self._thread.start()
+
+    def _next_batch(self):
+        """
+        Waits up to `flush_interval` seconds for entries and returns at most
+        `batch_size` of them, and whether the stop marker was seen.
+        """
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            try:
+                entry = self._queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if entry is _STOP:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self):
+        while True:
+            batch, stop = self._next_batch()
+            if batch:
+                self._send(batch)
+            experiment_log_queue_gauge.set(self._queue.qsize())
+            if stop:
+                return
+
+    def _get_client(self):
+        if self._client is None:
+            # Imported here: mlflow is slow to import and only needed by this thread
+            from mlflow.tracking import MlflowClient
+            self._client = MlflowClient(tracking_uri=self.tracking_uri)
+        return self._client
+
+    def _send(self, batch):
+        from mlflow.entities import Metric, Param
+
+        sent = 0
+        try:
+            client = self._get_client()
+            for entry in batch:
+                run = client.create_run(self.experiment_id, start_time=entry["timestamp"])
+                run_id = run.info.run_id
+                client.log_batch(
+                    run_id,
+                    metrics=[Metric(name, float(value), entry["timestamp"], 0) for name, value in entry["metrics"].items()],
+                    params=[Param(name, str(value)) for name, value in entry["params"].items()],
+                )
+                for file_name, content in entry["dicts"].items():
+                    client.log_dict(run_id, content, file_name)
+                client.set_terminated(run_id)
+                sent += 1
+        except Exception as e:
+            # Drop the rest of the batch rather than retrying against a failing server
+            logger.error("Error sending runs to MLflow", extra={"runs": len(batch) - sent, "error": str(e)})
+            experiment_log_counter.labels(outcome="failed").inc(len(batch) - sent)
+        experiment_log_counter.labels(outcome="logged").inc(sent)
+
+    def close(self, timeout: float = 5):
+        """
+        Sends what is still queued and stops the thread. Called on shutdown.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
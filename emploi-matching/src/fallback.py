@@ -0,0 +1,68 @@
+import asyncio
+import os
+import httpx
+from prometheus_client import Counter
+
+try:
+    from .ollama_client import ollama_circuit_breaker
+    from .tracing import span
+    from .logging_config import get_logger
+except ImportError:
+    from ollama_client import ollama_circuit_breaker
+    from tracing import span
+    from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+llm_fallback_counter = Counter(
+    "llm_fallback_total",
+    "Total number of AI responses served by the local fallback instead of the LLM",
+    ["endpoint", "reason"]
+)
+llm_answered_counter = Counter(
+    "llm_answered_total",
+    "Total number of AI responses served by the LLM",
+    ["endpoint"]
+)
+
+def get_latency_budget(endpoint: str, budget_ms: int = None):
+    """
+    Resolves the latency budget in seconds: the request value first, then
+    `LLM_<ENDPOINT>_BUDGET_MS`, then `LLM_BUDGET_MS`. None means no budget.
+    """
+    if budget_ms is None:
+        configured = os.getenv(f"LLM_{endpoint.upper()}_BUDGET_MS") or os.getenv("LLM_BUDGET_MS")
+        budget_ms = int(configured) if configured else None
+    return budget_ms / 1000 if budget_ms else None
+
+async def call_with_fallback(endpoint: str, llm_call, local_call, budget_ms: int = None):
+    """
+    Runs the LLM call within the latency budget, or answers from the local scorer
+    when it times out, the circuit is open or Ollama fails (httpx.HTTPError).
+
+    Args:
+        endpoint (str): The endpoint name, used for configuration and metrics.
+        llm_call: A zero-argument coroutine function calling the LLM.
+        local_call: A zero-argument function computing the local answer.
+        budget_ms (int, optional): The latency budget requested by the client.
+
+    Returns:
+        tuple: The result and the degradation reason ("timeout",
+               "circuit_open" or "error"), or None if the LLM answered.
+    """
+    if not ollama_circuit_breaker.allow_request():
+        reason = "circuit_open"
+    else:
+        try:
+            result = await asyncio.wait_for(llm_call(), timeout=get_latency_budget(endpoint, budget_ms))
+            llm_answered_counter.labels(endpoint=endpoint).inc()
+            return result, None
+        except asyncio.TimeoutError:
+            reason = "timeout"
+        except httpx.HTTPError as e:
+            # Already counted by the circuit breaker in generate_async
+            logger.warning("LLM call failed, answering from the local fallback", extra={"endpoint": endpoint, "error": str(e)})
+            reason = "error"
+    llm_fallback_counter.labels(endpoint=endpoint, reason=reason).inc()
+    with span("local_fallback"):
+        return local_call(), reason
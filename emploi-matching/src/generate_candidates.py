@@ -1,24 +1,251 @@
+"""
+Synthetic candidates and job offers, from a handful of rows for the ETL to
+millions of rows for scale and load tests.
+
+Rows are generated in chunks of `GENERATOR_CHUNK_SIZE` with vectorized NumPy
+sampling, in worker processes, and written to the output file as they come,
+so memory depends on the chunk size and not on the row count. Each chunk has
+its own random stream derived from the seed and the chunk index: the same
+seed and chunk size give the same file whatever the number of workers.
+
+    python src/generate_candidates.py --count 1000000 --output data/candidats_1m.parquet --workers 8 --seed 42
+    python src/generate_candidates.py --kind jobs --count 100000 --output data/jobs_100k.csv
+
+Writing Parquet needs pyarrow.
+"""
+import argparse
+import os
+import time
+import unicodedata
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
 import pandas as pd
-from faker import Faker
-
-fake = Faker('fr_FR')
-
-def generate_candidate():
-    skills = set(fake.words(nb=5, ext_word_list=['Python', 'SQL', 'Java', 'Spring', 'React', 'Angular', 'Node.js', 'C++', 'JavaScript', 'AWS', 'Docker', 'Machine Learning', 'Data Analysis', 'Cloud Computing', 'Cybersecurity', 'Project Management', 'Communication', 'Teamwork', 'Problem Solving']))  # Added more skills
-    return {
-        'id': fake.random_number(digits=5),
-        'nom': fake.name(),
-        'email': fake.email(),
-        'compétences': ', '.join(skills),  # Removed duplicates
-        'expérience': fake.random_int(min=0, max=10),
-        'localisation': fake.city(),
-        'secteur': fake.job()
-    }
-
-def generate_candidates_csv(num_candidates=10):
-    candidates = [generate_candidate() for _ in range(num_candidates)]
-    df = pd.DataFrame(candidates)
-    df.to_csv('emploi-matching/data/candidats.csv', index=False)
+
+GENERATOR_CHUNK_SIZE = int(os.getenv("GENERATOR_CHUNK_SIZE", "100000"))
+GENERATOR_WORKERS = int(os.getenv("GENERATOR_WORKERS", str(os.cpu_count() or 1)))
+
+CANDIDATES_CSV_PATH = 'emploi-matching/data/candidats.csv'
+
+SKILLS = [
+    'Python', 'SQL', 'Java', 'Spring', 'React', 'Angular', 'Node.js', 'C++', 'JavaScript', 'AWS', 'Docker',
+    'Machine Learning', 'Data Analysis', 'Cloud Computing', 'Cybersecurity', 'Project Management',
+    'Communication', 'Teamwork', 'Problem Solving'
+]
+FIRST_NAMES = [
+    'Camille', 'Léa', 'Manon', 'Chloé', 'Emma', 'Inès', 'Sarah', 'Julie', 'Louise', 'Claire', 'Océane', 'Zoé',
+    'Lucas', 'Hugo', 'Louis', 'Thomas', 'Nicolas', 'Julien', 'Maxime', 'Antoine', 'Mathieu', 'Stéphane', 'Michel',
+    'Théo', 'Nathan', 'Gabriel', 'Mehdi', 'Karim', 'Yasmine', 'Amélie', 'Élodie', 'François', 'Jérôme', 'Sébastien'
+]
+LAST_NAMES = [
+    'Martin', 'Bernard', 'Dubois', 'Thomas', 'Robert', 'Richard', 'Petit', 'Durand', 'Leroy', 'Moreau', 'Simon',
+    'Laurent', 'Lefebvre', 'Michel', 'Garcia', 'David', 'Bertrand', 'Roux', 'Vincent', 'Fournier', 'Morel',
+    'Girard', 'André', 'Lefèvre', 'Mercier', 'Dupont', 'Lambert', 'Bonnet', 'François', 'Martinez', 'Ferrand',
+    'Benali', 'Nguyen', 'Lemaire', 'Chevalier', 'Gauthier'
+]
+# Rough weights, so the largest cities hold most of the candidates and jobs
+CITIES = {
+    'Paris': 20, 'Lyon': 8, 'Marseille': 7, 'Toulouse': 6, 'Nantes': 5, 'Lille': 5, 'Bordeaux': 5, 'Rennes': 4,
+    'Nice': 4, 'Strasbourg': 4, 'Montpellier': 4, 'Grenoble': 3, 'Rouen': 2, 'Dijon': 2, 'Brest': 2,
+    'Clermont-Ferrand': 2, 'Tours': 2, 'Metz': 2, 'Angers': 1, 'Limoges': 1
+}
+SECTORS = [
+    'informatique', 'finance', 'santé', 'industrie', 'commerce', 'énergie', 'télécoms', 'transport',
+    'administration', 'éducation', 'conseil', 'assurance'
+]
+JOB_TITLES = [
+    'Développeur Python', 'Data Scientist', 'Ingénieur DevOps', 'Développeur Frontend React', 'Chef de projet',
+    'Analyste Cybersécurité', 'Ingénieur QA', 'Développeur Mobile Android', 'Architecte Cloud', 'Comptable',
+    'Chargé de communication', 'Technicien support', 'Product Owner', 'Juriste conformité', 'Commercial',
+    'Développeur Java', 'Data Engineer', 'Administrateur systèmes', 'UX Designer', 'Consultant SAP'
+]
+COMPANIES = [
+    'Capgemini', 'Sopra Steria', 'Atos', 'Thales', 'Orange', 'Doctolib', 'BlaBlaCar', 'Criteo', 'OVHcloud',
+    'Dassault Systèmes', 'Airbus', 'Société Générale', 'BNP Paribas', 'Decathlon', 'Leboncoin'
+]
+DESCRIPTION_WORDS = [
+    'conception', 'développement', 'API', 'REST', 'microservices', 'tests', 'automatisation', 'cloud', 'données',
+    'analyse', 'équipe', 'agile', 'client', 'qualité', 'sécurité', 'performance', 'production', 'support'
+] + SKILLS
+
+MIN_SKILLS, MAX_SKILLS = 3, 5
+MAX_EXPERIENCE = 10
+DESCRIPTION_LENGTH = 30
+
+def _ascii_lower(text: str) -> str:
+    return unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower().replace(' ', '')
+
+_FIRST_NAMES = np.array(FIRST_NAMES, dtype=object)
+_LAST_NAMES = np.array(LAST_NAMES, dtype=object)
+_EMAIL_FIRST_NAMES = np.array([_ascii_lower(name) for name in FIRST_NAMES], dtype=object)
+_EMAIL_LAST_NAMES = np.array([_ascii_lower(name) for name in LAST_NAMES], dtype=object)
+_SKILLS = np.array(SKILLS, dtype=object)
+_CITIES = np.array(list(CITIES), dtype=object)
+_CITY_WEIGHTS = np.array(list(CITIES.values()), dtype=float) / sum(CITIES.values())
+_SECTORS = np.array(SECTORS, dtype=object)
+_JOB_TITLES = np.array(JOB_TITLES, dtype=object)
+_COMPANIES = np.array(COMPANIES, dtype=object)
+_DESCRIPTION_WORDS = np.array(DESCRIPTION_WORDS, dtype=object)
+
+def chunk_rng(seed: int, kind: str, chunk_index: int) -> np.random.Generator:
+    """
+    Random stream of one chunk. It only depends on the seed, the kind of rows
+    and the chunk position, so chunks can be generated in any order.
+    """
+    return np.random.default_rng([seed, KINDS.index(kind), chunk_index])
+
+def _join_rows(values: np.ndarray, lengths: np.ndarray, separator: str):
+    return [separator.join(row[:length]) for row, length in zip(values.tolist(), lengths.tolist())]
+
+def generate_candidates(count: int, rng: np.random.Generator, start_id: int = 1) -> pd.DataFrame:
+    """
+    Generates `count` candidates with consecutive ids, in the columns of
+    `data/candidats.csv`.
+    """
+    ids = np.arange(start_id, start_id + count)
+    first = rng.integers(0, len(_FIRST_NAMES), count)
+    last = rng.integers(0, len(_LAST_NAMES), count)
+
+    # Distinct skills per candidate: the positions of the smallest random keys
+    keys = rng.random((count, len(_SKILLS)))
+    skill_indexes = np.argpartition(keys, MAX_SKILLS - 1, axis=1)[:, :MAX_SKILLS]
+    skill_counts = rng.integers(MIN_SKILLS, MAX_SKILLS + 1, count)
+
+    emails = _EMAIL_FIRST_NAMES[first] + '.' + _EMAIL_LAST_NAMES[last] + ids.astype(str).astype(object) + '@example.org'
+    return pd.DataFrame({
+        'id': ids,
+        'nom': _FIRST_NAMES[first] + ' ' + _LAST_NAMES[last],
+        'email': emails,
+        'compétences': _join_rows(_SKILLS[skill_indexes], skill_counts, ', '),
+        'expérience': rng.integers(0, MAX_EXPERIENCE + 1, count),
+        'localisation': rng.choice(_CITIES, count, p=_CITY_WEIGHTS),
+        'secteur': rng.choice(_SECTORS, count),
+    })
+
+def generate_jobs(count: int, rng: np.random.Generator, start_id: int = 1) -> pd.DataFrame:
+    """
+    Generates `count` job offers with consecutive ids, in the normalized
+    shape loaded by the ETL (title, company, location, description).
+    """
+    ids = np.arange(start_id, start_id + count)
+    words = _DESCRIPTION_WORDS[rng.integers(0, len(_DESCRIPTION_WORDS), (count, DESCRIPTION_LENGTH))]
+    return pd.DataFrame({
+        'id': ids,
+        'title': rng.choice(_JOB_TITLES, count),
+        'company': rng.choice(_COMPANIES, count),
+        'location': rng.choice(_CITIES, count, p=_CITY_WEIGHTS),
+        'description': _join_rows(words, np.full(count, DESCRIPTION_LENGTH), ' '),
+    })
+
+GENERATORS = {'candidates': generate_candidates, 'jobs': generate_jobs}
+KINDS = list(GENERATORS)
+
+def _generate_chunk(kind: str, seed: int, chunk_index: int, start_id: int, count: int) -> pd.DataFrame:
+    return GENERATORS[kind](count, chunk_rng(seed, kind, chunk_index), start_id)
+
+def _generate_csv_chunk(kind: str, seed: int, chunk_index: int, start_id: int, count: int) -> bytes:
+    # Encoded in the worker: CSV formatting costs more than the generation itself
+    chunk = _generate_chunk(kind, seed, chunk_index, start_id, count)
+    return chunk.to_csv(header=chunk_index == 0, index=False).encode('utf-8')
+
+def _map_chunks(function, kind: str, count: int, seed: int, chunk_size: int, workers: int):
+    if kind not in GENERATORS:
+        raise ValueError(f"Unknown kind {kind!r}, expected one of {KINDS}")
+    chunks = [
+        (kind, seed, chunk_index, start + 1, min(chunk_size, count - start))
+        for chunk_index, start in enumerate(range(0, count, chunk_size))
+    ]
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            yield function(*chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        next_chunk = 0
+        while pending or next_chunk < len(chunks):
+            while next_chunk < len(chunks) and len(pending) < 2 * workers:
+                pending.append(executor.submit(function, *chunks[next_chunk]))
+                next_chunk += 1
+            yield pending.popleft().result()
+
+def iter_chunks(kind: str, count: int, seed: int = 0, chunk_size: int = GENERATOR_CHUNK_SIZE, workers: int = 1):
+    """
+    Yields the rows as DataFrames of at most `chunk_size` rows, in id order.
+
+    With several workers, chunks are generated in a process pool. At most
+    two chunks per worker are pending at any time, so a slow consumer (a
+    disk writer) does not make finished chunks pile up in memory.
+    """
+    return _map_chunks(_generate_chunk, kind, count, seed, chunk_size, workers)
+
+def _output_format(path: str, file_format=None) -> str:
+    file_format = file_format or ('parquet' if path.endswith('.parquet') else 'csv')
+    if file_format not in ('csv', 'parquet'):
+        raise ValueError(f"Unknown format {file_format!r}, expected 'csv' or 'parquet'")
+    return file_format
+
+def write_dataset(kind: str, count: int, path: str, file_format=None, seed: int = 0,
+                  chunk_size: int = GENERATOR_CHUNK_SIZE, workers: int = GENERATOR_WORKERS) -> int:
+    """
+    Generates `count` rows of `kind` ("candidates" or "jobs") and writes them
+    to `path` chunk by chunk, as CSV or Parquet (from the extension unless
+    `file_format` is given). Returns the number of rows written.
+    """
+    file_format = _output_format(path, file_format)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    if file_format == 'csv':
+        with open(path, 'wb') as f:
+            for data in _map_chunks(_generate_csv_chunk, kind, count, seed, chunk_size, workers):
+                f.write(data)
+        return count
+
+    written = 0
+
+    # pyarrow is only needed for Parquet output
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for chunk in iter_chunks(kind, count, seed, chunk_size, workers):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            written += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
+
+def generate_candidates_csv(num_candidates=10, path=CANDIDATES_CSV_PATH, seed=None, workers=1):
+    """
+    Writes `num_candidates` candidates to the CSV read by the ETL. Without a
+    seed, every call gives new candidates.
+    """
+    if seed is None:
+        seed = int(np.random.SeedSequence().entropy % 2**32)
+    return write_dataset('candidates', num_candidates, path, 'csv', seed=seed, workers=workers)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic candidates or job offers.")
+    parser.add_argument("--kind", choices=KINDS, default="candidates")
+    parser.add_argument("--count", type=int, default=10, help="Number of rows to generate")
+    parser.add_argument("--output", default=CANDIDATES_CSV_PATH, help="Output file (.csv or .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Output format (default: from the file extension)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed; the same seed and chunk size give the same file")
+    parser.add_argument("--chunk-size", type=int, default=GENERATOR_CHUNK_SIZE, help="Rows generated per chunk")
+    parser.add_argument("--workers", type=int, default=GENERATOR_WORKERS, help="Number of worker processes")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    written = write_dataset(args.kind, args.count, args.output, args.format, args.seed, args.chunk_size, args.workers)
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {written} {args.kind} to {args.output} in {elapsed:.1f} s ({written / max(elapsed, 1e-9):,.0f} rows/s)")
 
 if __name__ == '__main__':
-    generate_candidates_csv()
+    main()
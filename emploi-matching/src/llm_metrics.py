@@ -0,0 +1,115 @@
+from prometheus_client import Counter, Histogram
+
+# Ollama reports its timings in nanoseconds
+NANOSECONDS = 1e9
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 60, 80, 120, 200)
+LABELS = ["function", "model"]
+
+# Prometheus Metrics
+llm_request_duration_histogram = Histogram(
+    "llm_request_duration_seconds",
+    "Wall-clock duration of Ollama /api/generate calls, as seen by the API",
+    LABELS,
+    buckets=LATENCY_BUCKETS
+)
+llm_total_duration_histogram = Histogram(
+    "llm_total_duration_seconds",
+    "Generation time reported by Ollama (total_duration)",
+    LABELS,
+    buckets=LATENCY_BUCKETS
+)
+llm_load_duration_histogram = Histogram(
+    "llm_load_duration_seconds",
+    "Model load time reported by Ollama (load_duration)",
+    LABELS,
+    buckets=LATENCY_BUCKETS
+)
+llm_prompt_eval_duration_histogram = Histogram(
+    "llm_prompt_eval_duration_seconds",
+    "Prompt evaluation time reported by Ollama (prompt_eval_duration)",
+    LABELS,
+    buckets=LATENCY_BUCKETS
+)
+llm_eval_duration_histogram = Histogram(
+    "llm_eval_duration_seconds",
+    "Token generation time reported by Ollama (eval_duration)",
+    LABELS,
+    buckets=LATENCY_BUCKETS
+)
+llm_prompt_tokens_histogram = Histogram(
+    "llm_prompt_tokens",
+    "Number of prompt tokens per generation (prompt_eval_count)",
+    LABELS,
+    buckets=TOKEN_BUCKETS
+)
+llm_generated_tokens_histogram = Histogram(
+    "llm_generated_tokens",
+    "Number of generated tokens per generation (eval_count)",
+    LABELS,
+    buckets=TOKEN_BUCKETS
+)
+llm_tokens_per_second_histogram = Histogram(
+    "llm_tokens_per_second",
+    "Generation speed (eval_count / eval_duration)",
+    LABELS,
+    buckets=TOKENS_PER_SECOND_BUCKETS
+)
+llm_requests_counter = Counter(
+    "llm_requests_total",
+    "Total number of generation requests, by outcome (ok, error, cached)",
+    LABELS + ["outcome"]
+)
+llm_cache_hits_counter = Counter(
+    "llm_cache_hits_total",
+    "Total number of generations answered from the memoized responses",
+    LABELS
+)
+llm_parse_failures_counter = Counter(
+    "llm_parse_failures_total",
+    "Total number of generations whose text could not be parsed into the expected result",
+    LABELS
+)
+
+def _observe_seconds(histogram, labels, result: dict, field: str):
+    value = result.get(field)
+    if isinstance(value, (int, float)):
+        histogram.labels(**labels).observe(value / NANOSECONDS)
+
+def observe_generation(function: str, model: str, result: dict, elapsed: float):
+    """
+    Records the wall-clock latency of a successful generation and the
+    statistics Ollama returns with it. Missing fields are skipped.
+    """
+    labels = {"function": function, "model": model}
+    llm_requests_counter.labels(outcome="ok", **labels).inc()
+    llm_request_duration_histogram.labels(**labels).observe(elapsed)
+
+    _observe_seconds(llm_total_duration_histogram, labels, result, "total_duration")
+    _observe_seconds(llm_load_duration_histogram, labels, result, "load_duration")
+    _observe_seconds(llm_prompt_eval_duration_histogram, labels, result, "prompt_eval_duration")
+    _observe_seconds(llm_eval_duration_histogram, labels, result, "eval_duration")
+
+    prompt_tokens = result.get("prompt_eval_count")
+    if isinstance(prompt_tokens, int):
+        llm_prompt_tokens_histogram.labels(**labels).observe(prompt_tokens)
+    generated_tokens = result.get("eval_count")
+    if isinstance(generated_tokens, int):
+        llm_generated_tokens_histogram.labels(**labels).observe(generated_tokens)
+        eval_duration = result.get("eval_duration")
+        if isinstance(eval_duration, (int, float)) and eval_duration > 0:
+            llm_tokens_per_second_histogram.labels(**labels).observe(generated_tokens / (eval_duration / NANOSECONDS))
+
+def observe_error(function: str, model: str, elapsed: float):
+    labels = {"function": function, "model": model}
+    llm_requests_counter.labels(outcome="error", **labels).inc()
+    llm_request_duration_histogram.labels(**labels).observe(elapsed)
+
+def observe_cache_hit(function: str, model: str):
+    llm_requests_counter.labels(function=function, model=model, outcome="cached").inc()
+    llm_cache_hits_counter.labels(function=function, model=model).inc()
+
+def observe_parse_failure(function: str, model: str):
+    llm_parse_failures_counter.labels(function=function, model=model).inc()
@@ -0,0 +1,159 @@
+"""
+Structured, leveled logging for the API and the ETL.
+
+Modules get their logger with `get_logger(__name__)` and pass data as
+`extra` fields rather than formatting it into the message:
+
+    logger.debug("Ollama response", extra={"function": "matching", "response": result})
+
+Fields are only rendered when the record is emitted, and long values are
+cut to `LOG_MAX_FIELD_CHARS`, so prompts and raw Ollama responses cost
+nothing at the default INFO level. DEBUG records can be sampled with
+`LOG_SAMPLE_RATE`. Each line carries the id of the request it belongs to
+(`X-Request-ID`, generated when the client does not send one).
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text") # "text" or "json" (one object per line)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1")) # Share of DEBUG records kept
+LOG_MAX_FIELD_CHARS = int(os.getenv("LOG_MAX_FIELD_CHARS", "300"))
+
+ROOT_LOGGER = "emploi"
+REQUEST_ID_HEADER = b"x-request-id"
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Attributes of every LogRecord; anything else was passed through `extra`
+RESERVED_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+def truncate(value, limit: int = LOG_MAX_FIELD_CHARS):
+    """
+    Returns numbers, booleans and None unchanged, and anything else as text
+    of at most `limit` characters.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more chars]"
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a share of the DEBUG records. INFO and above are always kept.
+    """
+    def __init__(self, rate: float = LOG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+class StructuredFormatter(logging.Formatter):
+    def __init__(self, json_output: bool = False, max_field_chars: int = LOG_MAX_FIELD_CHARS):
+        super().__init__()
+        self.json_output = json_output
+        self.max_field_chars = max_field_chars
+
+    def format(self, record):
+        fields = {
+            key: truncate(value, self.max_field_chars)
+            for key, value in vars(record).items()
+            if key not in RESERVED_ATTRIBUTES and not key.startswith("_")
+        }
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created)) + f".{int(record.msecs):03d}"
+        message = truncate(record.getMessage(), self.max_field_chars)
+        request_id = getattr(record, "request_id", None)
+
+        if self.json_output:
+            entry = {"ts": timestamp, "level": record.levelname, "logger": record.name, "msg": message}
+            if request_id:
+                entry["request_id"] = request_id
+            entry.update(fields)
+            if record.exc_info:
+                entry["exception"] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        line = f"{timestamp} {record.levelname:<7} {record.name}"
+        if request_id:
+            line += f" [{request_id}]"
+        line += f" {message}"
+        if fields:
+            line += " " + " ".join(f"{key}={json.dumps(value, ensure_ascii=False, default=str)}" for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+def configure_logging(level: str = LOG_LEVEL, log_format: str = LOG_FORMAT, sample_rate: float = LOG_SAMPLE_RATE, stream=None):
+    """
+    Sets up the `emploi` logger hierarchy. Called on first use of `get_logger`;
+    calling it again replaces the handler.
+    """
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(StructuredFormatter(json_output=log_format == "json"))
+    handler.addFilter(SamplingFilter(sample_rate))
+    handler.addFilter(RequestIdFilter())
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Returns the logger of a module, `emploi.<module>`, whether the module was
+    imported from the `src` package or as a script.
+    """
+    if not logging.getLogger(ROOT_LOGGER).handlers:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name.rsplit('.', 1)[-1]}")
+
+class RequestIdMiddleware:
+    """
+    ASGI middleware giving every request an id, taken from the `X-Request-ID`
+    header or generated, that is added to its log lines and echoed back in
+    the response headers.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == REQUEST_ID_HEADER:
+                # Client-supplied ids end up in the logs: keep them short and printable
+                request_id = value.decode("latin-1")[:64]
+                if not request_id.isprintable():
+                    request_id = None
+                break
+        request_id = request_id or uuid.uuid4().hex[:16]
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(REQUEST_ID_HEADER, request_id.encode("latin-1"))]
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
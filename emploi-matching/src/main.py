@@ -1,20 +1,33 @@
 import os
-import pandas as pd
 from dotenv import load_dotenv
-from scraping import extract_from_web
-from matching import match_job_to_candidate
-from sqlalchemy import create_engine, Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.ext.declarative import declarative_base
-import pymongo
-from generate_candidates import generate_candidates_csv
+
+try:
+    from .scraping import extract_from_web
+    from .matching import match_job_to_candidate
+    from .database import DATABASE_URL, create_db_engine
+    from .logging_config import get_logger
+    from .columnar_store import COLUMNAR_DIR, export_snapshot
+except ImportError:
+    from scraping import extract_from_web
+    from matching import match_job_to_candidate
+    from database import DATABASE_URL, create_db_engine
+    from logging_config import get_logger
+    from columnar_store import COLUMNAR_DIR, export_snapshot
+
+logger = get_logger(__name__)
 
 load_dotenv()
 
 MONGO_URI = "mongodb://localhost:27017/" 
-client = pymongo.MongoClient(MONGO_URI)
-db = client["emploi_matching"]  
-jobs_collection = db["adzuna_jobs"]
+
+def get_jobs_collection():
+    # Connect to MongoDB when the ETL runs rather than at import
+    import pymongo
+    client = pymongo.MongoClient(MONGO_URI)
+    db = client["emploi_matching"]  
+    return db["adzuna_jobs"]
 
 # Database setup
 Base = declarative_base()
@@ -30,7 +43,7 @@ class Job(Base):
 class Candidate(Base):
     __tablename__ = 'candidates'
     id = Column(Integer, primary_key=True)
-    nom = Column(String)
+    nom = Column(String, index=True)
     email = Column(String)
     compétences = Column(String)
     expérience = Column(Integer)
@@ -42,11 +55,36 @@ class Match(Base):
     id = Column(Integer, primary_key=True)
     job_id = Column(Integer, ForeignKey('jobs.id'))
     candidate_id = Column(Integer, ForeignKey('candidates.id'))
-    score = Column(Integer)
+    score = Column(Integer, index=True)
+    # Same indexes as api.MatchDB
+    __table_args__ = (
+        Index("ix_matches_candidate_id_score", "candidate_id", score.desc()),
+        Index("ix_matches_job_id_score", "job_id", score.desc()),
+    )
+
+class CatalogVersion(Base):
+    __tablename__ = 'catalog_version'
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, default=0) # Read by the API to reload its job catalog snapshot
+
+def bump_catalog_version():
+    # Tell the API that the jobs table was reloaded
+    catalog_version = session.get(CatalogVersion, 1)
+    if catalog_version is None:
+        session.add(CatalogVersion(id=1, version=1))
+    else:
+        catalog_version.version = (catalog_version.version or 0) + 1
+    session.commit()
+
+engine = create_db_engine(DATABASE_URL)
+
+def init_database():
+    Base.metadata.create_all(engine)
+    # create_all skips indexes on tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///emploi.db")
-engine = create_engine(DATABASE_URL)
-Base.metadata.create_all(engine)
 Session = sessionmaker(bind=engine)
 session = Session()
 
@@ -55,65 +93,36 @@ def get_adzuna_jobs_data():
     adzuna_jobs = get_adzuna_jobs(what='developer', where='Paris')
     return adzuna_jobs
 
-def main():
-    import os
-    print(os.getcwd())
-
-    # Generate new candidate data
-    generate_candidates_csv()
-
-    # Clear and insert data into MongoDB
-    jobs_collection.delete_many({})
-    adzuna_jobs = get_adzuna_jobs_data()
-    jobs_collection.insert_many(adzuna_jobs)
-
-    # Scrape job data from web
-    scraped_data = extract_from_web()
-    print(f"Scraped data: {scraped_data}")
-
-    # Load candidate data from CSV
-    csv_path = 'D:\AISmartJOB\emploi-matching\data\candidats.csv'
-    print(f"Attempting to read candidates from CSV: {csv_path}")
-    candidates_df = pd.read_csv(csv_path)
-    candidates = candidates_df.to_dict('records')
-    print(f"Successfully read {len(candidates)} candidates from CSV.")
-
-    # Clear and insert data into SQLite jobs table
-    # Combine data from web scraping and adzuna api
-    combined_jobs = scraped_data + adzuna_jobs
-
-    Job.__table__.drop(engine)
-    Base.metadata.create_all(engine)
-
-    # Create Job objects and add to session
-    # Normalize job data before inserting into SQLite and matching
-    normalized_jobs = []
-    for job_data in combined_jobs:
-        location = ''
-        company = ''
-        if 'location' in job_data:
-            if isinstance(job_data['location'], dict) and 'display_name' in job_data['location']:
-                location = job_data['location']['display_name']
-            elif isinstance(job_data['location'], str):
-                location = job_data['location']
-        
-        if 'company' in job_data:
-            if isinstance(job_data['company'], dict) and 'display_name' in job_data['company']:
-                company = job_data['company']['display_name']
-            elif isinstance(job_data['company'], str):
-                company = job_data['company']
-        
-        description = job_data.get('description', '')
-        
-        normalized_job = {
-            "title": job_data.get('title', ''),
-            "company": company,
-            "location": location,
-            "description": description,
-            "category": job_data.get('category', '') # Keep category for matching if needed
-        }
-        normalized_jobs.append(normalized_job)
-
+def normalize_job(job_data):
+    """
+    Flattens a job from Adzuna or from the scraper into the fields used for
+    the jobs table and for matching.
+    """
+    location = ''
+    company = ''
+    if 'location' in job_data:
+        if isinstance(job_data['location'], dict) and 'display_name' in job_data['location']:
+            location = job_data['location']['display_name']
+        elif isinstance(job_data['location'], str):
+            location = job_data['location']
+
+    if 'company' in job_data:
+        if isinstance(job_data['company'], dict) and 'display_name' in job_data['company']:
+            company = job_data['company']['display_name']
+        elif isinstance(job_data['company'], str):
+            company = job_data['company']
+
+    description = job_data.get('description', '')
+
+    return {
+        "title": job_data.get('title', ''),
+        "company": company,
+        "location": location,
+        "description": description,
+        "category": job_data.get('category', '') # Keep category for matching if needed
+    }
+
+def load_jobs(normalized_jobs):
     # Clear and insert data into SQLite jobs table
     Job.__table__.drop(engine)
     Base.metadata.create_all(engine)
@@ -123,7 +132,9 @@ def main():
         new_job = Job(title=job['title'], company=job['company'], location=job['location'], description=job['description'])
         session.add(new_job)
     session.commit()
+    bump_catalog_version()
 
+def load_candidates_and_matches(candidates, normalized_jobs):
     # Clear existing matches
     session.query(Match).delete()
     session.commit()
@@ -148,14 +159,14 @@ def main():
         session.add(new_candidate)
         try:
             session.commit()
-            print(f"Inserted candidate: {new_candidate.nom} (ID: {new_candidate.id})")
+            logger.debug("Inserted candidate", extra={"candidate": new_candidate.nom, "candidate_id": new_candidate.id})
         except Exception as e:
             session.rollback()
-            print(f"Error inserting candidate {new_candidate.nom}: {e}")
+            logger.error("Error inserting candidate", extra={"candidate": new_candidate.nom, "error": str(e)})
 
         for job_data in normalized_jobs: # Use normalized_jobs here
             score = match_job_to_candidate(job_data, candidate_data)
-            print(f"Matching score for {candidate_data['nom']} and {job_data['title']}: {score}")
+            logger.debug("Matching score", extra={"candidate": candidate_data['nom'], "job": job_data['title'], "score": score})
 
             # Find the Job object in the database
             db_job = session.query(Job).filter_by(
@@ -169,11 +180,60 @@ def main():
                 session.add(new_match)
                 session.commit()
             else:
-                print(f"Warning: Job '{job_data['title']}' not found in DB for matching. Match not saved.")
-    
+                logger.warning("Job not found in DB for matching, match not saved", extra={"job": job_data['title']})
+
+def main():
+    # Heavy dependencies are only needed when the ETL actually runs
+    import pandas as pd
+    try:
+        from .generate_candidates import generate_candidates_csv
+    except ImportError:
+        from generate_candidates import generate_candidates_csv
+    logger.info("ETL started", extra={"cwd": os.getcwd()})
+    init_database()
+
+    # Generate new candidate data
+    generate_candidates_csv()
+
+    # Clear and insert data into MongoDB
+    jobs_collection = get_jobs_collection()
+    jobs_collection.delete_many({})
+    adzuna_jobs = get_adzuna_jobs_data()
+    jobs_collection.insert_many(adzuna_jobs)
+
+    # Scrape job data from web
+    scraped_data = extract_from_web()
+    logger.info("Scraped jobs from the web", extra={"jobs": len(scraped_data)})
+    logger.debug("Scraped data", extra={"scraped_data": scraped_data})
+
+    # Load candidate data from CSV
+    csv_path = 'D:\AISmartJOB\emploi-matching\data\candidats.csv'
+    logger.info("Reading candidates from CSV", extra={"path": csv_path})
+    candidates_df = pd.read_csv(csv_path)
+    candidates = candidates_df.to_dict('records')
+    logger.info("Read candidates from CSV", extra={"candidates": len(candidates)})
+
+    # Clear and insert data into SQLite jobs table
+    # Combine data from web scraping and adzuna api
+    combined_jobs = scraped_data + adzuna_jobs
+
+    Job.__table__.drop(engine)
+    Base.metadata.create_all(engine)
+
+    # Normalize job data before inserting into SQLite and matching
+    normalized_jobs = [normalize_job(job_data) for job_data in combined_jobs]
+
+    load_jobs(normalized_jobs)
+    load_candidates_and_matches(candidates, normalized_jobs)
+
     # Verify candidates in DB after insertion
     num_candidates_in_db = session.query(Candidate).count()
-    print(f"Total candidates in database after insertion: {num_candidates_in_db}")
+    logger.info("ETL finished", extra={"candidates_in_database": num_candidates_in_db, "jobs": len(normalized_jobs)})
+
+    # Columnar copy of the tables and scores, for the API rankings and offline analysis
+    if COLUMNAR_DIR:
+        manifest = export_snapshot(engine, COLUMNAR_DIR)
+        logger.info("Columnar snapshot written", extra={"directory": COLUMNAR_DIR, **manifest})
 
 if __name__ == '__main__':
     main()
@@ -1,19 +1,21 @@
-import requests
+import httpx
 import json
+import re
 
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
+try:
+    from .ollama_client import OLLAMA_MODEL, generate, generate_async, get_generation_options
+    from .llm_metrics import observe_parse_failure
+    from .logging_config import get_logger
+except ImportError:
+    from ollama_client import OLLAMA_MODEL, generate, generate_async, get_generation_options
+    from llm_metrics import observe_parse_failure
+    from logging_config import get_logger
 
-def match_job_to_candidate(job, candidate):
-    """
-    Calculates a matching score between a job and a candidate using Mistral via Ollama.
-    
-    Args:
-        job (dict): A dictionary containing job details (e.g., 'title', 'description', 'location').
-        candidate (dict): A dictionary containing candidate details (e.g., 'nom', 'compétences', 'expérience', 'localisation').
-                          
-    Returns:
-        float: A matching score between 0 and 100, or 0 if an error occurs.
-    """
+logger = get_logger(__name__)
+
+SCORE_PATTERN = re.compile(r'(\d+(\.\d+)?)')
+
+def _build_matching_request(job, candidate):
     job_title = job.get('title', 'N/A')
     job_description = job.get('description', 'N/A')
     job_location = job.get('location', 'N/A')
@@ -42,44 +44,154 @@ def match_job_to_candidate(job, candidate):
         f"quel est le score de correspondance entre ce candidat et ce poste? "
         f"Veuillez ne répondre qu'avec le score numérique."
     )
-    print(f"Prompt sent to Mistral for matching:\n{prompt[:500]}...")
+    logger.debug("Prompt built", extra={"function": "matching", "prompt_chars": len(prompt), "prompt": prompt})
 
-    headers = {'Content-Type': 'application/json'}
+    _, options = get_generation_options("matching")
     data = {
-        "model": "mistral",
+        "model": OLLAMA_MODEL,
         "prompt": prompt,
-        "stream": False
+        "stream": False,
+        "options": options,
     }
+    return data
 
-    try:
-        response = requests.post(OLLAMA_API_URL, headers=headers, data=json.dumps(data))
-        response.raise_for_status()
-        
-        result = response.json()
-        generated_text = result.get('response', '').strip()
-        print(f"Generated text from Mistral (matching): {generated_text}")
-        
-        # extract a numerical score using regex
-        import re
-        score_match = re.search(r'(\d+(\.\d+)?)', generated_text)
-        if score_match:
-            try:
-                score = float(score_match.group(1))
-                return max(0.0, min(100.0, score)) # Ensure score is within 0-100
-            except ValueError:
-                print(f"Warning: Could not convert extracted number '{score_match.group(1)}' to float. Returning 0.")
-                return 0.0
-        else:
-            print(f"Warning: Could not find a numerical score in Mistral response: '{generated_text}'. Returning 0.")
+def _parse_matching_score(result):
+    generated_text = result.get('response', '').strip()
+    logger.debug("Ollama response", extra={"function": "matching", "response": generated_text})
+    
+    # extract a numerical score using regex
+    score_match = SCORE_PATTERN.search(generated_text)
+    if score_match:
+        try:
+            score = float(score_match.group(1))
+            return max(0.0, min(100.0, score)) # Ensure score is within 0-100
+        except ValueError:
+            logger.warning("Could not convert the extracted score to a number, returning 0", extra={"score": score_match.group(1)})
             return 0.0
+    else:
+        logger.warning("No numerical score in the matching response, returning 0", extra={"response": generated_text})
+        return 0.0
+
+def match_job_to_candidate(job, candidate):
+    """
+    Calculates a matching score between a job and a candidate using Mistral via Ollama.
+    
+    Args:
+        job (dict): A dictionary containing job details (e.g., 'title', 'description', 'location').
+        candidate (dict): A dictionary containing candidate details (e.g., 'nom', 'compétences', 'expérience', 'localisation').
+                          
+    Returns:
+        float: A matching score between 0 and 100, or 0 if an error occurs.
+    """
+    data = _build_matching_request(job, candidate)
 
-    except requests.exceptions.RequestException as e:
-        print(f"❌ Error communicating with Ollama API for matching: {e}")
+    try:
+        result = generate(data, function="matching")
+        return _parse_matching_score(result)
+
+    except httpx.HTTPError as e:
+        logger.error("Error communicating with Ollama API", extra={"function": "matching", "error": str(e)})
+        return 0.0
+    except json.JSONDecodeError:
+        logger.error("Error decoding JSON response from Ollama API", extra={"function": "matching"})
+        return 0.0
+
+async def match_job_to_candidate_async(job, candidate):
+    """
+    Async version of `match_job_to_candidate` built on the shared Ollama client,
+    so many pairs can be scored concurrently without one thread per call.
+    """
+    data = _build_matching_request(job, candidate)
+
+    try:
+        result = await generate_async(data, function="matching")
+        if not SCORE_PATTERN.search(result.get('response', '')):
+            observe_parse_failure("matching", data["model"])
+        return _parse_matching_score(result)
+
+    except httpx.HTTPError as e:
+        logger.error("Error communicating with Ollama API", extra={"function": "matching", "error": str(e)})
         return 0.0
     except json.JSONDecodeError:
-        print(f"❌ Error decoding JSON response from Ollama API (matching). Response text: {response.text}")
+        logger.error("Error decoding JSON response from Ollama API", extra={"function": "matching"})
         return 0.0
 
+# --- Local scoring, used when the LLM is too slow or unavailable ---
+
+KNOWN_SKILLS = [
+    'Python', 'SQL', 'Java', 'Spring', 'React', 'Angular', 'Node.js', 'C++', 'JavaScript', 'TypeScript',
+    'AWS', 'Azure', 'Docker', 'Kubernetes', 'Git', 'Linux', 'Machine Learning', 'Deep Learning',
+    'Data Analysis', 'Data Visualization', 'Cloud Computing', 'Cybersecurity', 'Project Management',
+    'Communication', 'Teamwork', 'Problem Solving', 'FastAPI', 'Django', 'Flask', 'TensorFlow',
+    'PyTorch', 'Scikit-learn', 'Pandas', 'R', 'Excel', 'Agile', 'Scrum', 'DevOps',
+]
+
+_STOPWORDS = {
+    "a", "an", "and", "de", "des", "du", "en", "et", "for", "in", "la", "le", "les", "of", "on",
+    "or", "the", "to", "un", "une", "with", "au", "aux", "par", "pour", "sur", "dans",
+}
+_TOKEN_PATTERN = re.compile(r"[\w+#]+(?:\.[\w+#]+)*")
+
+def _tokenize(text):
+    return {
+        token for token in _TOKEN_PATTERN.findall((text or "").lower())
+        if len(token) > 1 and token not in _STOPWORDS
+    }
+
+def keyword_overlap_score(job, keywords):
+    """
+    Scores a job against a set of lowercase keywords. A keyword found in the
+    title counts twice as much as one found only in the description.
+    """
+    title_tokens = _tokenize(job.get('title', ''))
+    description_tokens = _tokenize(job.get('description', ''))
+    return sum(2 if keyword in title_tokens else 1 for keyword in keywords
+               if keyword in title_tokens or keyword in description_tokens)
+
+def rank_jobs_by_keyword_overlap(text, all_jobs, limit=3):
+    """
+    Ranks jobs by keyword overlap with a free text (skills, CV...).
+
+    Returns:
+        list: Up to `limit` job dictionaries with a positive score, best first.
+    """
+    keywords = _tokenize(text)
+    scored = [(keyword_overlap_score(job, keywords), index) for index, job in enumerate(all_jobs)]
+    scored = sorted((item for item in scored if item[0] > 0), key=lambda item: (-item[0], item[1]))
+    return [all_jobs[index] for _, index in scored[:limit]]
+
+def local_recommendations(candidate_info, all_jobs):
+    text = f"{candidate_info.get('compétences', '')} {candidate_info.get('secteur', '')}"
+    return rank_jobs_by_keyword_overlap(text, all_jobs)
+
+def local_recommendations_from_cv(cv_text, all_jobs):
+    recommended_jobs = rank_jobs_by_keyword_overlap(cv_text, all_jobs)
+    if recommended_jobs:
+        titles = ", ".join(job.get('title', '') for job in recommended_jobs)
+        career_recommendation_text = (
+            f"Le service d'analyse par IA est momentanément indisponible. "
+            f"D'après les mots-clés de votre CV, les offres les plus proches de votre profil sont : {titles}."
+        )
+    else:
+        career_recommendation_text = (
+            "Le service d'analyse par IA est momentanément indisponible. "
+            "Aucune offre ne correspond aux mots-clés de votre CV pour le moment."
+        )
+    return recommended_jobs, career_recommendation_text
+
+def local_skills_from_cv(cv_text, limit=10):
+    """
+    Finds known skills in the CV text. The score grows with the number of mentions.
+    """
+    text = (cv_text or "").lower()
+    extracted_skills = []
+    for skill in KNOWN_SKILLS:
+        occurrences = len(re.findall(r'(?<![\w+#])' + re.escape(skill.lower()) + r'(?![\w+#])', text))
+        if occurrences:
+            extracted_skills.append({"skill": skill, "score": min(100, 40 + 20 * occurrences)})
+    extracted_skills.sort(key=lambda item: -item["score"])
+    return extracted_skills[:limit]
+
 if __name__ == '__main__':
     # Example Usage (for testing purposes)
     job_example = {
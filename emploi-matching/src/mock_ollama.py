@@ -0,0 +1,207 @@
+"""
+Stand-in Ollama server for tests, benchmarks and load tests.
+
+It implements `/api/generate` (streaming and non-streaming) and
+`/api/embeddings` with scripted responses and configurable latency, jitter,
+error rate and token rate, so the AI endpoints can be exercised end to end
+without a GPU. Point the API at it with:
+
+    python -m src.mock_ollama --port 11435 --latency-ms 200 --tokens-per-second 40
+    OLLAMA_API_URL=http://localhost:11435/api/generate uvicorn src.api:app
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+class ScriptedResponse(BaseModel):
+    pattern: str # Regular expression searched in the prompt
+    response: str
+
+class MockOllamaConfig(BaseModel):
+    latency_ms: float = 0 # Fixed delay before the first token (prompt evaluation)
+    jitter_ms: float = 0 # Uniform random delay added to the latency
+    error_rate: float = 0 # Probability of answering with a 500 error
+    tokens_per_second: float = 0 # Generation speed; 0 means instantaneous
+    load_ms: float = 0 # Reported model load time
+    embedding_size: int = 384
+    seed: Optional[int] = None
+    script: List[ScriptedResponse] = []
+
+class GenerateRequest(BaseModel):
+    model: str = "mistral"
+    prompt: str = ""
+    stream: bool = True # Ollama streams by default
+    options: dict = {}
+
+class EmbeddingsRequest(BaseModel):
+    model: str = "mistral"
+    prompt: str = ""
+
+def default_response(prompt: str) -> str:
+    """
+    Builds a plausible answer for the prompts sent by `ai_recommender` and `matching`.
+    """
+    titles = re.findall(r"^Job Title: (.+)$", prompt, re.MULTILINE)[:3]
+    if "'skill'" in prompt:
+        return json.dumps([
+            {"skill": "Python", "score": 90},
+            {"skill": "SQL", "score": 75},
+            {"skill": "Communication", "score": 60},
+        ])
+    if "score de correspondance" in prompt:
+        return "75"
+    numbered_titles = "\n".join(f"{index}. {title}" for index, title in enumerate(titles, start=1))
+    if "Recommandation de Carrière" in prompt:
+        return (
+            f"Jobs Recommandés:\n{numbered_titles}\n\n"
+            f"Recommandation de Carrière:\n"
+            f"Votre profil présente des compétences solides. Continuez à développer vos compétences techniques."
+        )
+    return numbered_titles
+
+class MockOllama:
+    def __init__(self, config: MockOllamaConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.requests_served = 0
+
+    def script_response(self, prompt: str) -> str:
+        for item in self.config.script:
+            if re.search(item.pattern, prompt):
+                return item.response
+        return default_response(prompt)
+
+    async def prompt_delay(self):
+        delay_ms = self.config.latency_ms + self.random.uniform(0, self.config.jitter_ms)
+        if delay_ms > 0:
+            await asyncio.sleep(delay_ms / 1000)
+
+    def maybe_fail(self):
+        if self.config.error_rate and self.random.random() < self.config.error_rate:
+            raise HTTPException(status_code=500, detail="mock ollama: injected error")
+
+    def token_delay(self):
+        if self.config.tokens_per_second > 0:
+            return 1 / self.config.tokens_per_second
+        return 0
+
+    def stats(self, prompt: str, tokens: List[str], prompt_eval_s: float, eval_s: float) -> dict:
+        load_ns = int(self.config.load_ms * 1e6)
+        prompt_eval_ns = int(prompt_eval_s * 1e9)
+        eval_ns = int(eval_s * 1e9)
+        return {
+            "total_duration": load_ns + prompt_eval_ns + eval_ns,
+            "load_duration": load_ns,
+            "prompt_eval_count": len(prompt.split()),
+            "prompt_eval_duration": prompt_eval_ns,
+            "eval_count": len(tokens),
+            "eval_duration": eval_ns,
+        }
+
+def tokenize(text: str) -> List[str]:
+    # Keep whitespace attached so that joining the tokens gives back the text
+    return re.findall(r"\S+\s*|\s+", text)
+
+def create_app(config: MockOllamaConfig = None) -> FastAPI:
+    app = FastAPI(title="Mock Ollama")
+    mock = MockOllama(config or MockOllamaConfig())
+    app.state.mock = mock
+
+    @app.post("/api/generate")
+    async def generate(request: GenerateRequest):
+        mock.requests_served += 1
+        started = time.perf_counter()
+        await mock.prompt_delay()
+        mock.maybe_fail()
+        prompt_eval_s = time.perf_counter() - started
+        text = mock.script_response(request.prompt)
+        tokens = tokenize(text)
+        created_at = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+        if not request.stream:
+            eval_s = len(tokens) * mock.token_delay()
+            if eval_s:
+                await asyncio.sleep(eval_s)
+            return {
+                "model": request.model,
+                "created_at": created_at,
+                "response": text,
+                "done": True,
+                **mock.stats(request.prompt, tokens, prompt_eval_s, eval_s),
+            }
+
+        async def stream():
+            eval_started = time.perf_counter()
+            for token in tokens:
+                if mock.token_delay():
+                    await asyncio.sleep(mock.token_delay())
+                yield json.dumps({"model": request.model, "created_at": created_at, "response": token, "done": False}) + "\n"
+            final = {"model": request.model, "created_at": created_at, "response": "", "done": True}
+            final.update(mock.stats(request.prompt, tokens, prompt_eval_s, time.perf_counter() - eval_started))
+            yield json.dumps(final) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+    @app.post("/api/embeddings")
+    async def embeddings(request: EmbeddingsRequest):
+        mock.requests_served += 1
+        await mock.prompt_delay()
+        mock.maybe_fail()
+        # Deterministic pseudo-embedding derived from the prompt
+        generator = random.Random(hashlib.sha256(request.prompt.encode("utf-8")).digest())
+        return {"embedding": [generator.uniform(-1, 1) for _ in range(mock.config.embedding_size)]}
+
+    @app.get("/mock/config", response_model=MockOllamaConfig)
+    async def read_config():
+        return mock.config
+
+    @app.put("/mock/config", response_model=MockOllamaConfig)
+    async def update_config(config: MockOllamaConfig):
+        mock.config = config
+        mock.random = random.Random(config.seed)
+        return mock.config
+
+    return app
+
+def config_from_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a mock Ollama server.")
+    parser.add_argument("--latency-ms", type=float, default=float(os.getenv("MOCK_OLLAMA_LATENCY_MS", "0")))
+    parser.add_argument("--jitter-ms", type=float, default=float(os.getenv("MOCK_OLLAMA_JITTER_MS", "0")))
+    parser.add_argument("--error-rate", type=float, default=float(os.getenv("MOCK_OLLAMA_ERROR_RATE", "0")))
+    parser.add_argument("--tokens-per-second", type=float, default=float(os.getenv("MOCK_OLLAMA_TOKENS_PER_SECOND", "0")))
+    parser.add_argument("--load-ms", type=float, default=float(os.getenv("MOCK_OLLAMA_LOAD_MS", "0")))
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--script", help="JSON file with a list of {\"pattern\": ..., \"response\": ...} objects.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    args = parser.parse_args(argv)
+
+    script = []
+    if args.script:
+        with open(args.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    config = MockOllamaConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        tokens_per_second=args.tokens_per_second,
+        load_ms=args.load_ms,
+        seed=args.seed,
+        script=script,
+    )
+    return config, args.host, args.port
+
+if __name__ == "__main__":
+    import uvicorn
+
+    config, host, port = config_from_args()
+    uvicorn.run(create_app(config), host=host, port=port)
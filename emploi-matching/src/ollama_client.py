@@ -0,0 +1,198 @@
+import httpx
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+
+try:
+    from .circuit_breaker import CircuitBreaker
+    from .llm_metrics import observe_cache_hit, observe_error, observe_generation
+except ImportError:
+    from circuit_breaker import CircuitBreaker
+    from llm_metrics import observe_cache_hit, observe_error, observe_generation
+
+OLLAMA_API_URL = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "mistral")
+OLLAMA_TIMEOUT = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "64"))
+OLLAMA_SEED = int(os.getenv("OLLAMA_SEED", "42"))
+OLLAMA_MEMO_SIZE = int(os.getenv("OLLAMA_MEMO_SIZE", "256"))
+
+# Sampling parameters sent under "options" in the /api/generate payload
+GENERATION_PROFILES = {
+    "creative": {
+        "temperature": 0.7,
+        "top_k": 40,
+        "top_p": 0.9,
+        "repeat_penalty": 1.1,
+        "num_ctx": 4096,
+    },
+    "deterministic": {
+        "temperature": 0,
+        "seed": OLLAMA_SEED,
+        "top_k": 40,
+        "top_p": 0.9,
+        "repeat_penalty": 1.1,
+        "num_ctx": 4096,
+    },
+}
+
+# Structured outputs (title lists, JSON, scores) default to reproducible generation;
+# the free-text career advice keeps some variety.
+DEFAULT_PROFILES = {
+    "recommendations": "deterministic",
+    "recommend_from_cv": "creative",
+    "extract_skills": "deterministic",
+    "matching": "deterministic",
+}
+
+_async_client = None
+_memo = OrderedDict()
+
+# Opens after repeated Ollama failures so callers can answer from a local fallback
+ollama_circuit_breaker = CircuitBreaker(
+    "ollama",
+    failure_threshold=int(os.getenv("OLLAMA_CIRCUIT_FAILURES", "5")),
+    reset_timeout=float(os.getenv("OLLAMA_CIRCUIT_RESET", "30")),
+)
+
+def get_generation_options(endpoint: str):
+    """
+    Resolves the generation profile for an endpoint.
+
+    The profile is read from `LLM_<ENDPOINT>_PROFILE`, then `LLM_PROFILE`,
+    then the endpoint default.
+
+    Returns:
+        tuple: The profile name and a copy of its Ollama options.
+    """
+    profile = (
+        os.getenv(f"LLM_{endpoint.upper()}_PROFILE")
+        or os.getenv("LLM_PROFILE")
+        or DEFAULT_PROFILES.get(endpoint, "creative")
+    )
+    if profile not in GENERATION_PROFILES:
+        raise ValueError(f"Unknown generation profile '{profile}' for endpoint '{endpoint}'.")
+    return profile, dict(GENERATION_PROFILES[profile])
+
+def is_deterministic(options: dict) -> bool:
+    return options.get("temperature") == 0 and "seed" in options
+
+def _memo_key(data: dict) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the process-wide async HTTP client used to talk to Ollama.
+
+    The client keeps a pool of keep-alive connections so concurrent generations
+    reuse sockets instead of opening a new connection per request.
+    """
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+            ),
+        )
+    return _async_client
+
+async def close_async_client():
+    """
+    Closes the shared async client. Called from the API shutdown hook.
+    """
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+def _memo_lookup(data: dict, function: str):
+    """
+    Returns the memo key of a deterministic request (None otherwise) and the
+    memoized response, if any.
+    """
+    if OLLAMA_MEMO_SIZE <= 0 or not is_deterministic(data.get("options", {})):
+        return None, None
+    key = _memo_key(data)
+    cached = _memo.get(key)
+    if cached is None:
+        return key, None
+    _memo.move_to_end(key)
+    observe_cache_hit(function, data.get("model", OLLAMA_MODEL))
+    return key, {**cached, "cached": True}
+
+def _record_result(data: dict, function: str, key, result: dict, elapsed: float) -> dict:
+    ollama_circuit_breaker.record_success()
+    observe_generation(function, data.get("model", OLLAMA_MODEL), result, elapsed)
+    result["options"] = data.get("options", {})
+    result["cached"] = False
+
+    if key is not None:
+        _memo[key] = result
+        if len(_memo) > OLLAMA_MEMO_SIZE:
+            _memo.popitem(last=False)
+    return result
+
+def _record_failure(data: dict, function: str, elapsed: float):
+    ollama_circuit_breaker.record_failure()
+    observe_error(function, data.get("model", OLLAMA_MODEL), elapsed)
+
+async def generate_async(data: dict, function: str = "generate") -> dict:
+    """
+    Sends a generation request to Ollama without blocking the event loop.
+
+    Responses to deterministic requests (temperature 0 and a fixed seed) are
+    memoized in a bounded LRU keyed by the full payload, so a repeated request
+    is answered without calling Ollama again. Latency, token counts and cache
+    hits are exported to Prometheus, labelled by `function` and model.
+
+    Args:
+        data (dict): The JSON payload for `/api/generate`.
+        function (str): The calling function, used as a metrics label.
+
+    Returns:
+        dict: The decoded JSON response from Ollama, with the effective
+              `options` and a `cached` flag added.
+
+    Raises:
+        httpx.HTTPError: If the request fails or Ollama answers with a 4xx/5xx status.
+        json.JSONDecodeError: If the response body is not valid JSON.
+    """
+    key, cached = _memo_lookup(data, function)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    try:
+        response = await get_async_client().post(OLLAMA_API_URL, json=data)
+        response.raise_for_status()
+        result = response.json()
+    except (httpx.HTTPError, json.JSONDecodeError):
+        _record_failure(data, function, time.perf_counter() - started)
+        raise
+    return _record_result(data, function, key, result, time.perf_counter() - started)
+
+def generate(data: dict, function: str = "generate") -> dict:
+    """
+    Blocking counterpart of `generate_async`, for scripts and the synchronous
+    entry points: same memo, circuit breaker, metrics and reported options.
+    """
+    key, cached = _memo_lookup(data, function)
+    if cached is not None:
+        return cached
+
+    started = time.perf_counter()
+    try:
+        response = httpx.post(OLLAMA_API_URL, json=data, timeout=httpx.Timeout(OLLAMA_TIMEOUT, connect=10.0))
+        response.raise_for_status()
+        result = response.json()
+    except (httpx.HTTPError, json.JSONDecodeError):
+        _record_failure(data, function, time.perf_counter() - started)
+        raise
+    return _record_result(data, function, key, result, time.perf_counter() - started)
+
+def clear_memo():
+    _memo.clear()
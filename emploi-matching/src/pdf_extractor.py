@@ -1,18 +1,30 @@
-import PyPDF2
 import io
 from fastapi import HTTPException
 
+try:
+    from .tracing import span
+    from .logging_config import get_logger
+except ImportError:
+    from tracing import span
+    from logging_config import get_logger
+
+logger = get_logger(__name__)
+
 def extract_text_from_pdf(pdf_file: bytes) -> str:
     """
     Extracts text from a PDF file provided as bytes.
     """
+    # PyPDF2 is only needed once a CV is uploaded: import it on first use
+    import PyPDF2
+
     text = ""
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_file))
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text += page.extract_text() or ""
+        with span("pdf_extract"):
+            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_file))
+            for page_num in range(len(pdf_reader.pages)):
+                page = pdf_reader.pages[page_num]
+                text += page.extract_text() or ""
     except Exception as e:
-        print(f"Error extracting text from PDF: {e}")
+        logger.error("Error extracting text from PDF", extra={"error": str(e)})
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {e}")
     return text
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+On-demand profiling of a single request.
+
+An administrator adds the `X-Profile: 1` header (or `?profile=1`) to a
+request; `get_current_user` then starts a sampling profiler for it. The
+profiler samples the Python stacks of every busy thread (the event loop and
+the threadpool running PDF extraction or synchronous endpoints) until the
+request finishes. The samples are saved in `PROFILE_DIR` as a call tree
+(`<id>.txt`) and as collapsed stacks (`<id>.collapsed`), the input format of
+flamegraph.pl and https://www.speedscope.app. Only the latest
+`PROFILE_MAX_FILES` profiles are kept. The response carries the profile id
+in the `X-Profile-Id` header.
+
+Requests without the flag go through the middleware untouched.
+"""
+import asyncio
+import collections
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+try:
+    from .logging_config import get_logger
+except ImportError:
+    from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "20"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.002"))
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = re.compile(rb"(?:^|&)profile=(?:1|true)(?:&|$)")
+PROFILE_ID = re.compile(r"^[0-9]{8}-[0-9]{6}-[0-9a-f]{8}$")
+SCOPE_KEY = "request_profiler"
+
+# Leaf frames of threads that are waiting for work rather than doing it
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+}
+
+def profiling_requested(scope) -> bool:
+    """
+    Checks the raw ASGI scope for the profiling flag, without parsing the request.
+    """
+    if PROFILE_QUERY.search(scope.get("query_string", b"")):
+        return True
+    return any(name == PROFILE_HEADER and value in (b"1", b"true") for name, value in scope.get("headers", ()))
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """
+    Samples the stacks of all threads at a fixed interval from a background thread.
+    """
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, str(ident)))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """
+        One line per distinct stack, root first: `thread;outer;inner count`.
+        """
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.most_common())
+
+    def call_tree(self, min_percent: float = 0.5) -> str:
+        """
+        Top-down call tree with the share of samples spent in each function
+        and its callees. Branches below `min_percent` are left out.
+        """
+        root = {"count": 0, "children": {}}
+        for stack, count in self.stacks.items():
+            root["count"] += count
+            node = root
+            for label in stack:
+                node = node["children"].setdefault(label, {"count": 0, "children": {}})
+                node["count"] += count
+
+        lines = [f"{self.samples} samples over {self.duration * 1000:.0f} ms (every {self.interval * 1000:g} ms)", ""]
+        total = root["count"] or 1
+
+        def render(node, depth):
+            for label, child in sorted(node["children"].items(), key=lambda item: -item[1]["count"]):
+                percent = child["count"] * 100 / total
+                if percent < min_percent:
+                    continue
+                lines.append(f"{percent:6.1f}% {child['count']:6d}  {'  ' * depth}{label}")
+                render(child, depth + 1)
+
+        render(root, 0)
+        return "\n".join(lines) + "\n"
+
+class ProfileStore:
+    """
+    Keeps the latest profiles on disk, oldest first out.
+    """
+    FORMATS = {"tree": ".txt", "collapsed": ".collapsed"}
+
+    def __init__(self, directory: str = PROFILE_DIR, max_files: int = PROFILE_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self._lock = threading.Lock()
+
+    def save(self, profiler: SamplingProfiler, path: str):
+        header = f"# {path}\n"
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, profiler.id + ".txt"), "w", encoding="utf-8") as f:
+                f.write(header + profiler.call_tree())
+            with open(os.path.join(self.directory, profiler.id + ".collapsed"), "w", encoding="utf-8") as f:
+                f.write(profiler.collapsed())
+            for profile_id in self.list()[self.max_files:]:
+                for extension in self.FORMATS.values():
+                    try:
+                        os.remove(os.path.join(self.directory, profile_id + extension))
+                    except FileNotFoundError:
+                        pass
+
+    def list(self):
+        """
+        Returns the ids of the saved profiles, newest first.
+        """
+        try:
+            entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".txt") and PROFILE_ID.match(entry.name[:-len(".txt")])]
+        except FileNotFoundError:
+            return []
+        entries.sort(key=lambda entry: (entry.stat().st_mtime_ns, entry.name), reverse=True)
+        return [entry.name[:-len(".txt")] for entry in entries]
+
+    def path(self, profile_id: str, profile_format: str = "tree"):
+        """
+        Returns the file of a saved profile, or None. Ids are validated, so
+        they cannot point outside the profile directory.
+        """
+        if not PROFILE_ID.match(profile_id) or profile_format not in self.FORMATS:
+            return None
+        path = os.path.join(self.directory, profile_id + self.FORMATS[profile_format])
+        return path if os.path.exists(path) else None
+
+def start_profiling(scope):
+    """
+    Starts profiling the request if the flag is set and it is not profiled yet.
+    Called once the user is known to be an administrator.
+    """
+    if SCOPE_KEY in scope and scope[SCOPE_KEY] is None:
+        scope[SCOPE_KEY] = SamplingProfiler().start()
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that finishes the profiles started by `start_profiling`.
+    Requests without the profiling flag are passed straight to the app.
+    """
+    def __init__(self, app, store: ProfileStore):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # Marks the request as eligible; the profiler itself is started after authentication
+        scope[SCOPE_KEY] = None
+
+        async def send_with_profile_id(message):
+            profiler = scope.get(SCOPE_KEY)
+            if message["type"] == "http.response.start" and profiler is not None:
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", profiler.id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler = scope.get(SCOPE_KEY)
+            if profiler is not None:
+                # Stopped once the whole body is sent, so streamed responses are included
+                await asyncio.to_thread(self._finish, profiler, scope.get("path", ""))
+
+    def _finish(self, profiler: SamplingProfiler, path: str):
+        profiler.stop()
+        try:
+            self.store.save(profiler, path)
+        except OSError as e:
+            logger.error("Error saving profile", extra={"profile_id": profiler.id, "error": str(e)})
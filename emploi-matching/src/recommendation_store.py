@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import json
+import os
+import socket
+import uuid
+import httpx
+from datetime import datetime, timedelta, timezone
+from prometheus_client import Counter
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+try:
+    from .admission import get_admission_controller
+    from .ai_recommender import get_ai_recommendations_async, RECOMMENDATION_PROMPT_VERSION
+    from .ollama_client import get_generation_options, ollama_circuit_breaker, OLLAMA_MODEL
+    from .logging_config import get_logger
+except ImportError:
+    from admission import get_admission_controller
+    from ai_recommender import get_ai_recommendations_async, RECOMMENDATION_PROMPT_VERSION
+    from ollama_client import get_generation_options, ollama_circuit_breaker, OLLAMA_MODEL
+    from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+RECOMMENDATION_REFRESH_INTERVAL = float(os.getenv("RECOMMENDATION_REFRESH_INTERVAL", "300"))
+RECOMMENDATION_REFRESH_BATCH = int(os.getenv("RECOMMENDATION_REFRESH_BATCH", "50"))
+# Seconds without renewal after which another process may take over the refresh
+RECOMMENDATION_REFRESH_LEASE = float(os.getenv("RECOMMENDATION_REFRESH_LEASE", str(2 * RECOMMENDATION_REFRESH_INTERVAL + 60)))
+
+# Admission queue key of the worker, so it shares the LLM slots fairly with users
+REFRESH_USER_KEY = "recommendation-refresh"
+
+recommendations_served_counter = Counter(
+    "recommendations_served_total",
+    "Total number of candidate recommendations served, by source",
+    ["source"]
+)
+recommendation_refresh_counter = Counter(
+    "recommendation_refresh_total",
+    "Total number of candidates processed by the recommendation refresh worker",
+    ["outcome"]
+)
+
+def candidate_info_from_row(candidate) -> dict:
+    return {
+        "nom": candidate.nom,
+        "compétences": candidate.compétences,
+        "expérience": candidate.expérience,
+        "localisation": candidate.localisation,
+        "secteur": candidate.secteur
+    }
+
+def recommendation_fingerprint(candidate_info: dict, catalog_version: str, profile: str) -> str:
+    """
+    Identifies everything a stored recommendation depends on: the candidate
+    data, the job catalog version, the model, the prompt version and the
+    generation profile. A stored row is served only if its fingerprint matches.
+    """
+    source = json.dumps(
+        [candidate_info, catalog_version, OLLAMA_MODEL, RECOMMENDATION_PROMPT_VERSION, profile],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+class RecommendationStore:
+    """
+    Reads and writes the materialized `recommendations` table.
+
+    Each row holds the ranked job ids for one candidate and the fingerprint
+    they were computed from.
+    """
+    def __init__(self, candidate_model, recommendation_model, job_catalog):
+        self.candidate_model = candidate_model
+        self.recommendation_model = recommendation_model
+        self.job_catalog = job_catalog
+
+    def lookup(self, db: Session, candidate_id: int, fingerprint: str, catalog):
+        """
+        Returns the stored jobs for a candidate, or None if there is no row or
+        it was computed from other inputs.
+        """
+        row = db.get(self.recommendation_model, candidate_id)
+        if row is None or row.fingerprint != fingerprint:
+            return None
+        jobs_by_id = {job["id"]: job for job in catalog.jobs}
+        return [jobs_by_id[job_id] for job_id in json.loads(row.job_ids) if job_id in jobs_by_id]
+
+    def save(self, db: Session, candidate_id: int, fingerprint: str, jobs):
+        row = db.get(self.recommendation_model, candidate_id)
+        if row is None:
+            row = self.recommendation_model(candidate_id=candidate_id)
+            db.add(row)
+        row.job_ids = json.dumps([job["id"] for job in jobs])
+        row.fingerprint = fingerprint
+        row.computed_at = datetime.now(timezone.utc)
+        db.commit()
+
+    def find_stale(self, db: Session, profile: str, limit: int):
+        """
+        Returns up to `limit` (candidate id, candidate info, fingerprint) tuples
+        whose stored recommendations are missing or out of date, plus the
+        catalog snapshot they must be computed against.
+        """
+        catalog = self.job_catalog.get(db)
+        stored = dict(db.query(self.recommendation_model.candidate_id, self.recommendation_model.fingerprint))
+        stale = []
+        for candidate in db.query(self.candidate_model).order_by(self.candidate_model.id).yield_per(500):
+            candidate_info = candidate_info_from_row(candidate)
+            fingerprint = recommendation_fingerprint(candidate_info, catalog.version, profile)
+            if stored.get(candidate.id) != fingerprint:
+                stale.append((candidate.id, candidate_info, fingerprint))
+                if len(stale) >= limit:
+                    break
+        return stale, catalog
+
+class RecommendationRefresher:
+    """
+    Background task that keeps the `recommendations` table up to date.
+
+    Every `interval` seconds it recomputes, with the LLM, the recommendations
+    of candidates whose data, the catalog version, the model, the prompt or
+    the profile changed since they were stored. Generations go through the
+    "recommendations" admission controller under their own user key, so
+    interactive requests keep their share of the LLM.
+
+    With a `lease_model`, processes sharing the database (e.g. several uvicorn
+    workers) compete for a single-row lease and only its holder refreshes. The
+    holder renews it before each generation; if it stops, another process
+    takes over once the lease is `lease_timeout` seconds old.
+    """
+    def __init__(self, store: RecommendationStore, session_factory, interval: float = RECOMMENDATION_REFRESH_INTERVAL,
+                 batch_size: int = RECOMMENDATION_REFRESH_BATCH, lease_model=None, lease_timeout: float = RECOMMENDATION_REFRESH_LEASE):
+        self.store = store
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lease_model = lease_model
+        self.lease_timeout = lease_timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task = None
+
+    def _with_session(self, func, *args):
+        db = self.session_factory()
+        try:
+            return func(db, *args)
+        finally:
+            db.close()
+
+    def _acquire_lease(self, db: Session) -> bool:
+        """
+        Takes or renews the refresh lease with a conditional UPDATE.
+
+        Returns:
+            bool: True if this refresher holds the lease.
+        """
+        model = self.lease_model
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        values = {"owner": self.owner, "expires_at": now + timedelta(seconds=self.lease_timeout)}
+        claimed = db.execute(
+            update(model)
+            .where(model.id == 1, or_(model.owner == self.owner, model.expires_at < now))
+            .values(**values)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return True
+        if db.get(model, 1) is not None:
+            return False
+        # First refresher ever: create the lease row, unless another process just did
+        db.add(model(id=1, **values))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        return True
+
+    async def _hold_lease(self) -> bool:
+        if self.lease_model is None:
+            return True
+        return await asyncio.to_thread(self._with_session, self._acquire_lease)
+
+    async def refresh_once(self) -> int:
+        """
+        Recomputes one batch of stale recommendations.
+
+        Returns:
+            int: The number of candidates whose recommendations were stored.
+        """
+        if not await self._hold_lease():
+            # Another process is refreshing
+            return 0
+        profile, _ = get_generation_options("recommendations")
+        stale, catalog = await asyncio.to_thread(self._with_session, self.store.find_stale, profile, self.batch_size)
+        if not catalog.jobs:
+            return 0
+
+        stored = 0
+        for candidate_id, candidate_info, fingerprint in stale:
+            if not ollama_circuit_breaker.allow_request():
+                recommendation_refresh_counter.labels(outcome="circuit_open").inc()
+                break
+            if not await self._hold_lease():
+                break
+            try:
+                async with get_admission_controller("recommendations").slot(REFRESH_USER_KEY):
+                    jobs = await get_ai_recommendations_async(candidate_info, catalog.jobs)
+            except httpx.HTTPError as e:
+                # Ollama failed: retry on the next pass (the circuit breaker stops the batch if it keeps failing)
+                logger.warning("Recommendation refresh failed for a candidate", extra={"candidate_id": candidate_id, "error": str(e)})
+                recommendation_refresh_counter.labels(outcome="error").inc()
+                continue
+            if not jobs:
+                # The answer named no known job: retry on the next pass
+                recommendation_refresh_counter.labels(outcome="empty").inc()
+                continue
+            await asyncio.to_thread(self._with_session, self.store.save, candidate_id, fingerprint, jobs)
+            recommendation_refresh_counter.labels(outcome="stored").inc()
+            stored += 1
+        return stored
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                stored = await self.refresh_once()
+                if stored:
+                    logger.info("Recommendation refresh stored recommendations", extra={"candidates": stored})
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Recommendation refresh failed")
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -2,6 +2,13 @@ import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
+try:
+    from .logging_config import get_logger
+except ImportError:
+    from logging_config import get_logger
+
+logger = get_logger(__name__)
+
 def assign_category_from_text(title, description=""):
     """
     Assigns a category to a job based on keywords found in its title and description.
@@ -55,7 +62,7 @@ def get_job_description_from_url(job_url):
             return description_element.get_text(separator="\n", strip=True)
         return ""
     except requests.exceptions.RequestException as e:
-        print(f"❌ Error scraping job description from {job_url}: {e}")
+        logger.warning("Error scraping job description", extra={"url": job_url, "error": str(e)})
         return ""
 
 def extract_from_web():
@@ -95,12 +102,11 @@ def extract_from_web():
                 "category": category
             })
 
-        # Example print to verify
-        print("✅ Example scraped job:", scraped_data[0] if scraped_data else "No jobs scraped")
+        logger.debug("Example scraped job", extra={"job": scraped_data[0] if scraped_data else None})
         return scraped_data
 
     except requests.exceptions.RequestException as e:
-        print(f"❌ Error scraping web data: {e}")
+        logger.error("Error scraping web data", extra={"error": str(e)})
         return []
 
 if __name__ == "__main__":
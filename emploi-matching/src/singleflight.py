@@ -0,0 +1,47 @@
+import asyncio
+from prometheus_client import Counter
+
+coalesced_requests_counter = Counter(
+    "llm_coalesced_requests_total",
+    "Total number of requests that joined an identical in-flight LLM call",
+    ["endpoint"]
+)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share the same key into a single execution.
+
+    The first caller for a key starts the work; callers arriving while it is
+    still running await the same task and receive the same result (or
+    exception). The key is forgotten as soon as the task finishes, so later
+    calls start a fresh execution.
+    """
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self._inflight = {}
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def do(self, key, func):
+        """
+        Args:
+            key: A hashable key identifying identical calls.
+            func: A zero-argument coroutine function performing the work.
+
+        Returns:
+            The result of `func()`, shared between all callers with the same key.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            coalesced_requests_counter.labels(endpoint=self.endpoint).inc()
+        # Shield the shared task so a disconnecting caller does not cancel it for the others
+        return await asyncio.shield(task)
+
+    def __len__(self):
+        return len(self._inflight)
@@ -0,0 +1,182 @@
+"""
+Lightweight per-request tracing.
+
+The API middleware opens a trace for each request; code on the request path
+wraps its stages in `span("name")`. When the request ends, the stage
+durations are sent back in the `Server-Timing` header, recorded in the
+`request_stage_duration_seconds` histogram and, only if `TRACE_EXPORT_FILE`
+is set, appended to that file in the Chrome trace event format (open it in
+https://ui.perfetto.dev or chrome://tracing) by a background thread.
+
+Outside of a traced request (scripts, background workers) `span` does nothing.
+"""
+import contextvars
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from prometheus_client import Histogram
+
+try:
+    from .logging_config import get_logger
+except ImportError:
+    from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE") # Unset: no file export
+TRACE_EXPORT_QUEUE_SIZE = int(os.getenv("TRACE_EXPORT_QUEUE_SIZE", "1000"))
+
+stage_duration_histogram = Histogram(
+    "request_stage_duration_seconds",
+    "Time spent in each stage of a request",
+    ["endpoint", "stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_trace_ids = itertools.count(1)
+
+class Trace:
+    def __init__(self, name: str):
+        self.id = next(_trace_ids)
+        self.name = name
+        self.started = time.perf_counter()
+        self.started_wall = time.time()
+        # (stage, offset from the start of the trace, duration), in seconds
+        self.spans = []
+
+    def add(self, stage: str, start: float, duration: float):
+        # list.append is atomic, so spans can be recorded from worker threads
+        self.spans.append((stage, start - self.started, duration))
+
+    def stage_durations(self) -> dict:
+        """
+        Returns the total time per stage, in the order the stages started.
+        """
+        durations = {}
+        for stage, _, duration in self.spans:
+            durations[stage] = durations.get(stage, 0.0) + duration
+        return durations
+
+    def server_timing(self, total: float) -> str:
+        metrics = [f"{stage};dur={duration * 1000:.1f}" for stage, duration in self.stage_durations().items()]
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+@contextmanager
+def span(stage: str):
+    """
+    Times the enclosed block as a stage of the current request, if any.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, start, time.perf_counter() - start)
+
+def start_trace(name: str):
+    trace = Trace(name)
+    return trace, _current_trace.set(trace)
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+class ChromeTraceExporter:
+    """
+    Appends traces to a file in the Chrome trace event "JSON array" format.
+    The closing bracket is optional in that format, so events can be appended
+    as requests complete.
+
+    `submit` is called on the request path: it only puts the trace in a
+    bounded queue (dropping it when the queue is full) and a background
+    thread does the file I/O.
+    """
+    def __init__(self, path: str, max_queue: int = TRACE_EXPORT_QUEUE_SIZE):
+        self.path = path
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def events(self, trace: Trace, endpoint: str, total: float):
+        start_us = trace.started_wall * 1e6
+        # One row per request in the viewer: the trace id is used as thread id
+        common = {"ph": "X", "pid": os.getpid(), "tid": trace.id}
+        yield {**common, "name": endpoint, "cat": "request", "ts": start_us, "dur": total * 1e6, "args": {"path": trace.name}}
+        for stage, offset, duration in trace.spans:
+            yield {**common, "name": stage, "cat": "stage", "ts": start_us + offset * 1e6, "dur": duration * 1e6}
+
+    def export(self, trace: Trace, endpoint: str, total: float):
+        """
+        Appends one trace to the file. Blocking: only called from the writer thread.
+        """
+        lines = "".join(json.dumps(event) + ",\n" for event in self.events(trace, endpoint, total))
+        with open(self.path, "a", encoding="utf-8") as f:
+            if f.tell() == 0:
+                f.write("[\n")
+            f.write(lines)
+
+    def submit(self, trace: Trace, endpoint: str, total: float) -> bool:
+        """
+        Queues a trace for export. Never blocks.
+
+        Returns:
+            bool: False if the queue was full and the trace was dropped.
+        """
+        try:
+            self._queue.put_nowait((trace, endpoint, total))
+        except queue.Full:
+            return False
+        self._ensure_started()
+        return True
+
+    def _ensure_started(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.export(*item)
+            except OSError as e:
+                logger.error("Error writing trace", extra={"path": self.path, "error": str(e)})
+            finally:
+                self._queue.task_done()
+
+    def close(self, timeout: float = 5):
+        """
+        Writes what is still queued and stops the thread. Called on shutdown.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+trace_exporter = ChromeTraceExporter(TRACE_EXPORT_FILE) if TRACE_EXPORT_FILE else None
+
+def finish_trace(trace: Trace, endpoint: str, total: float):
+    """
+    Records the stage durations of a finished request and exports the trace.
+    """
+    for stage, duration in trace.stage_durations().items():
+        stage_duration_histogram.labels(endpoint=endpoint, stage=stage).observe(duration)
+    if trace_exporter is not None and trace.spans:
+        trace_exporter.submit(trace, endpoint, total)
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+
+from src.admission import AdmissionController, AdmissionRejected
+
+def make_controller(**overrides):
+    settings = dict(max_concurrency=1, max_queue=4, max_queue_per_user=2, queue_timeout=1.0, retry_after=7)
+    settings.update(overrides)
+    return AdmissionController("test", **settings)
+
+def test_queue_full_fails_fast_with_retry_after():
+    async def scenario():
+        controller = make_controller(max_queue=1)
+        await controller.acquire("alice")
+        waiter = asyncio.create_task(controller.acquire("bob"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("carol")
+
+        controller.release()
+        await waiter
+        controller.release()
+        return excinfo.value, controller
+
+    error, controller = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert error.headers["Retry-After"] == "7"
+    assert controller.active == 0 and controller.waiting == 0
+
+def test_per_user_queue_limit_returns_429():
+    async def scenario():
+        controller = make_controller(max_queue_per_user=1)
+        await controller.acquire("alice")
+        waiter = asyncio.create_task(controller.acquire("alice"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await controller.acquire("alice")
+
+        controller.release()
+        await waiter
+        controller.release()
+        return excinfo.value
+
+    assert asyncio.run(scenario()).status_code == 429
+
+def test_waiters_are_served_round_robin_per_user():
+    async def scenario():
+        controller = make_controller(max_queue_per_user=3)
+        order = []
+
+        async def call(user):
+            async with controller.slot(user):
+                order.append(user)
+                await asyncio.sleep(0)
+
+        await controller.acquire("holder")
+        tasks = [asyncio.create_task(call(user)) for user in ["alice", "alice", "alice", "bob"]]
+        await asyncio.sleep(0)
+        controller.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["alice", "bob", "alice", "alice"]
+
+def test_queue_timeout_rejects_and_frees_the_queue():
+    async def scenario():
+        controller = make_controller(queue_timeout=0.01)
+        await controller.acquire("alice")
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("bob")
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.waiting == 0
+    assert controller.active == 1
@@ -0,0 +1,64 @@
+import asyncio
+import json
+import httpx
+import pytest
+from unittest.mock import patch
+
+from src.ai_recommender import get_ai_recommendations_async, get_ai_recommendations_from_cv_async
+from src.matching import match_job_to_candidate_async
+
+ALL_JOBS = [
+    {"id": 1, "title": "Dev", "company": "CompA", "location": "LocA", "description": "DescA"},
+    {"id": 2, "title": "QA", "company": "CompB", "location": "LocB", "description": "DescB"},
+]
+
+def test_get_ai_recommendations_async_parses_titles():
+    with patch("src.ai_recommender.generate_async") as mock_generate:
+        mock_generate.return_value = {"response": "1. QA\n2. Dev\n3. Unknown"}
+        recommendations = asyncio.run(get_ai_recommendations_async({"nom": "CandA", "compétences": "Python"}, ALL_JOBS))
+
+    assert [job["id"] for job in recommendations] == [2, 1]
+    assert mock_generate.call_args.args[0]["model"] == "mistral"
+
+def test_get_ai_recommendations_from_cv_async_raises_ollama_error():
+    # Left to call_with_fallback, which answers from the local scorer
+    with patch("src.ai_recommender.generate_async") as mock_generate:
+        mock_generate.side_effect = httpx.ConnectError("connection refused")
+        with pytest.raises(httpx.ConnectError):
+            asyncio.run(get_ai_recommendations_from_cv_async("Sample CV text", ALL_JOBS))
+
+def test_match_job_to_candidate_async_clamps_score():
+    with patch("src.matching.generate_async") as mock_generate:
+        mock_generate.return_value = {"response": "Score: 120"}
+        score = asyncio.run(match_job_to_candidate_async(ALL_JOBS[0], {"nom": "CandA"}))
+
+    assert score == 100.0
+
+def test_deterministic_profile_sends_options_and_memoizes(monkeypatch):
+    from src import ollama_client
+
+    requests_seen = []
+
+    def handler(request):
+        requests_seen.append(json.loads(request.content))
+        return httpx.Response(200, json={"response": "1. Dev"})
+
+    async def scenario():
+        ollama_client._async_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            first = await get_ai_recommendations_async({"nom": "CandA"}, ALL_JOBS)
+            second = await get_ai_recommendations_async({"nom": "CandA"}, ALL_JOBS)
+        finally:
+            await ollama_client.close_async_client()
+            ollama_client.clear_memo()
+        return first, second
+
+    monkeypatch.setenv("LLM_RECOMMENDATIONS_PROFILE", "deterministic")
+    first, second = asyncio.run(scenario())
+
+    assert first == second == [ALL_JOBS[0]]
+    assert len(requests_seen) == 1
+    options = requests_seen[0]["options"]
+    assert options["temperature"] == 0
+    assert options["seed"] == ollama_client.OLLAMA_SEED
+    assert "temperature" not in requests_seen[0]
@@ -1,49 +1,62 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import MagicMock, patch
+from prometheus_client import REGISTRY
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import create_engine
-from sqlalchemy.pool import StaticPool
 from sqlalchemy.ext.declarative import declarative_base 
 
 # Import the FastAPI app and database models from api.py
 from src.api import app, get_db, UserDB, JobDB, CandidateDB, MatchDB, get_password_hash, verify_password, get_user, get_current_user
-from src.api import Job, Candidate, Match, SkillScore, SkillsExtractionResponse, UserCreate, User, CVRecommendationResponse
+from src.api import Job, Candidate, Match, JobMatch, CandidateMatch, SkillScore, SkillsExtractionResponse, UserCreate, User, CVRecommendationResponse
 from src.api import Base # Import Base for metadata operations
-
-# Mock the database engine and session for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-)
+from src.api import credential_cache, job_catalog, CatalogVersionDB, RecommendationDB, recommendation_store, recommendation_refresher, RecommendationRefreshLeaseDB, cv_job_queue, profile_store, CVJobDB
+from src.admission import AdmissionController, _controllers as _admission_controllers
+from src.database import create_db_engine
+from src.recommendation_store import RecommendationRefresher
+from src.columnar_store import ColumnarStore, export_snapshot
+from src.cv_jobs import CVJobQueue
+from benchmarks.synthetic import seed_database
+
+# Test database in a temporary file: the lifespan's background workers run in
+# other threads, so each session needs its own connection (WAL, as in production)
+_test_db_dir = tempfile.TemporaryDirectory()
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{os.path.join(_test_db_dir.name, 'test.db')}"
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 
 # Use a mock session for dependency override
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @pytest.fixture(name="db_session")
 def db_session_fixture():
-    Base.metadata.create_all(bind=engine)
+    # Create an admin user for tests that require it, as the load test does
+    seed_database(engine, users=[("admin", "adminpassword")])
     db = TestingSessionLocal()
     try:
-        # Create an admin user for tests that require it
-        admin_password_hash = get_password_hash("adminpassword")
-        admin_user = UserDB(username="admin", hashed_password=admin_password_hash)
-        db.add(admin_user)
-        db.commit()
-        db.refresh(admin_user)
         yield db
     finally:
         db.close()
         Base.metadata.drop_all(bind=engine)
 
 @pytest.fixture(name="client")
-def client_fixture(db_session: Session):
+def client_fixture(db_session: Session, monkeypatch):
     def override_get_db():
         yield db_session
     
     app.dependency_overrides[get_db] = override_get_db
+    # The lifespan and the background workers use the test database too, never emploi.db
+    monkeypatch.setattr("src.api.engine", engine)
+    monkeypatch.setattr(recommendation_refresher, "session_factory", TestingSessionLocal)
+    monkeypatch.setattr(cv_job_queue, "session_factory", TestingSessionLocal)
+    # Each test starts from its own database, so drop the cached job snapshot
+    job_catalog.invalidate()
     
     with TestClient(app) as c:
         yield c
@@ -62,9 +75,9 @@ def admin_user_mock():
 # Mock AI recommender and PDF extractor functions
 @pytest.fixture
 def mock_ai_recommender():
-    with patch("src.api.get_ai_recommendations") as mock_get_ai_recs, \
-         patch("src.api.get_ai_recommendations_from_cv") as mock_get_ai_recs_cv, \
-         patch("src.api.extract_skills_with_scores_from_cv") as mock_extract_skills:
+    with patch("src.api.get_ai_recommendations_async") as mock_get_ai_recs, \
+         patch("src.api.get_ai_recommendations_from_cv_async") as mock_get_ai_recs_cv, \
+         patch("src.api.extract_skills_with_scores_from_cv_async") as mock_extract_skills:
         yield mock_get_ai_recs, mock_get_ai_recs_cv, mock_extract_skills
 
 @pytest.fixture
@@ -131,6 +144,11 @@ def test_read_jobs(client: TestClient, db_session: Session, mock_current_user: U
     assert len(jobs) == 2
     assert jobs[0]["title"] == "Dev"
     assert jobs[1]["title"] == "QA"
+    assert len(response.headers["X-Request-ID"]) == 16
+
+    # A request id sent by the client is kept
+    response = client.get("/jobs/", headers={"X-Request-ID": "client-id-1"})
+    assert response.headers["X-Request-ID"] == "client-id-1"
 
     # # Clear the override after the test
     # app.dependency_overrides.clear()
@@ -250,6 +268,194 @@ def test_get_recommendations_for_candidate(client: TestClient, db_session: Sessi
     # Clear the override after the test
     app.dependency_overrides.clear()
 
+def test_get_recommendations_for_candidate_served_from_table(client: TestClient, db_session: Session, mock_current_user: UserDB, mock_ai_recommender):
+    mock_get_ai_recs, _, _ = mock_ai_recommender
+
+    candidate1 = CandidateDB(id=1, nom="CandA", email="a@b.com", compétences="Python", expérience=3, localisation="Paris", secteur="IT")
+    job1 = JobDB(id=1, title="Dev", company="CompA", location="LocA", description="DescA")
+    job2 = JobDB(id=2, title="QA", company="CompB", location="LocB", description="DescB")
+    db_session.add_all([candidate1, job1, job2])
+    db_session.commit()
+    mock_get_ai_recs.return_value = [
+        {"id": 2, "title": "QA", "company": "CompB", "location": "LocB", "description": "DescB"}
+    ]
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    # The live answer is stored, then served from the table
+    response = client.get("/ai_smartjob/recommendations/CandA")
+    assert response.headers["X-Recommendation-Source"] == "live"
+    response = client.get("/ai_smartjob/recommendations/CandA")
+    assert response.headers["X-Recommendation-Source"] == "precomputed"
+    assert [job["title"] for job in response.json()] == ["QA"]
+    mock_get_ai_recs.assert_called_once()
+
+    response = client.get("/ai_smartjob/recommendations/CandA?fresh=true")
+    assert response.headers["X-Recommendation-Source"] == "live"
+    assert mock_get_ai_recs.call_count == 2
+
+    # A change to the candidate invalidates the stored row
+    db_session.get(CandidateDB, 1).compétences = "Python, SQL"
+    db_session.commit()
+    response = client.get("/ai_smartjob/recommendations/CandA")
+    assert response.headers["X-Recommendation-Source"] == "live"
+
+    app.dependency_overrides.clear()
+
+def test_recommendation_refresher_fills_stale_candidates(db_session: Session):
+    job_catalog.invalidate()
+    db_session.add_all([
+        CandidateDB(id=1, nom="CandA", email="a@b.com", compétences="Python", expérience=3, localisation="Paris", secteur="IT"),
+        CandidateDB(id=2, nom="CandB", email="b@b.com", compétences="SQL", expérience=5, localisation="Lyon", secteur="IT"),
+        JobDB(id=1, title="Dev", company="CompA", location="LocA", description="DescA"),
+    ])
+    db_session.commit()
+    refresher = RecommendationRefresher(recommendation_store, TestingSessionLocal, interval=0)
+
+    with patch("src.recommendation_store.get_ai_recommendations_async") as mock_get_ai_recs:
+        mock_get_ai_recs.side_effect = lambda candidate_info, all_jobs: all_jobs[:1]
+        assert asyncio.run(refresher.refresh_once()) == 2
+        # Nothing changed since: no new generation
+        assert asyncio.run(refresher.refresh_once()) == 0
+    assert mock_get_ai_recs.call_count == 2
+    assert json.loads(db_session.get(RecommendationDB, 2).job_ids) == [1]
+    job_catalog.invalidate()
+
+def test_only_the_lease_holder_refreshes_recommendations(db_session: Session):
+    job_catalog.invalidate()
+    db_session.add_all([
+        CandidateDB(id=1, nom="CandA", email="a@b.com", compétences="Python", expérience=3, localisation="Paris", secteur="IT"),
+        JobDB(id=1, title="Dev", company="CompA", location="LocA", description="DescA"),
+    ])
+    db_session.commit()
+    # Two API processes sharing the database
+    first = RecommendationRefresher(recommendation_store, TestingSessionLocal, interval=0, lease_model=RecommendationRefreshLeaseDB)
+    second = RecommendationRefresher(recommendation_store, TestingSessionLocal, interval=0, lease_model=RecommendationRefreshLeaseDB)
+
+    with patch("src.recommendation_store.get_ai_recommendations_async") as mock_get_ai_recs:
+        mock_get_ai_recs.side_effect = lambda candidate_info, all_jobs: all_jobs[:1]
+        assert asyncio.run(first.refresh_once()) == 1
+        db_session.add(CandidateDB(id=2, nom="CandB", email="b@b.com", compétences="SQL", expérience=5, localisation="Lyon", secteur="IT"))
+        db_session.commit()
+        assert asyncio.run(second.refresh_once()) == 0
+        assert mock_get_ai_recs.call_count == 1
+
+        # The holder stopped renewing: the lease expires and the other process takes over
+        db_session.get(RecommendationRefreshLeaseDB, 1).expires_at = datetime(2000, 1, 1)
+        db_session.commit()
+        assert asyncio.run(second.refresh_once()) == 1
+        assert asyncio.run(first.refresh_once()) == 0
+    job_catalog.invalidate()
+
+def test_get_recommendations_for_candidate_falls_back_when_over_budget(client: TestClient, db_session: Session, mock_current_user: UserDB, mock_ai_recommender):
+    mock_get_ai_recs, _, _ = mock_ai_recommender
+
+    candidate1 = CandidateDB(id=1, nom="CandA", email="a@b.com", compétences="Python, SQL", expérience=3, localisation="Paris", secteur="IT")
+    job1 = JobDB(id=1, title="Python Developer", company="CompA", location="LocA", description="Python and SQL")
+    job2 = JobDB(id=2, title="Designer", company="CompB", location="LocB", description="UI/UX")
+    db_session.add_all([candidate1, job1, job2])
+    db_session.commit()
+
+    # Simulate a Mistral generation slower than the latency budget
+    async def slow_recommendations(candidate_info, all_jobs):
+        await asyncio.sleep(1)
+        return []
+    mock_get_ai_recs.side_effect = slow_recommendations
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    response = client.get("/ai_smartjob/recommendations/CandA?budget_ms=20")
+    assert response.status_code == 200
+    assert response.headers["X-Degraded"] == "true"
+    assert response.headers["X-Degraded-Reason"] == "timeout"
+    recommendations = response.json()
+    assert [job["title"] for job in recommendations] == ["Python Developer"]
+
+    # Clear the override after the test
+    app.dependency_overrides.clear()
+
+def test_llm_overload_is_rejected_before_the_db_pool_runs_out(monkeypatch, tmp_path):
+    # A pool much smaller than the admission queue: waiting for an LLM slot must not hold a connection
+    small_engine = create_db_engine(f"sqlite:///{tmp_path / 'overload.db'}", pool_size=2, max_overflow=0, pool_timeout=1)
+    Base.metadata.create_all(bind=small_engine)
+    SmallSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=small_engine)
+    with SmallSessionLocal() as db:
+        db.add(UserDB(username="loaduser", hashed_password=get_password_hash("loadpassword")))
+        db.add(JobDB(id=1, title="Dev", company="CompA", location="LocA", description="DescA"))
+        db.add_all([
+            CandidateDB(id=i, nom=f"Cand{i}", email=f"{i}@b.com", compétences="Python", expérience=3, localisation="Paris", secteur="IT")
+            for i in range(1, 9)
+        ])
+        db.commit()
+
+    def override_get_db():
+        db = SmallSessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    monkeypatch.setitem(app.dependency_overrides, get_db, override_get_db)
+    monkeypatch.setitem(_admission_controllers, "recommendations", AdmissionController(
+        "recommendations", max_concurrency=1, max_queue=2, max_queue_per_user=2, queue_timeout=10, retry_after=1
+    ))
+
+    async def slow_recommendations(candidate_info, all_jobs):
+        await asyncio.sleep(1)
+        return all_jobs
+    monkeypatch.setattr("src.api.get_ai_recommendations_async", slow_recommendations)
+    job_catalog.invalidate()
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver", auth=("loaduser", "loadpassword")) as ac:
+            # Warm the credential cache so the burst does not wait on bcrypt
+            assert (await ac.get("/jobs/")).status_code == 200
+
+            async def read_jobs_during_burst():
+                await asyncio.sleep(0.3)
+                return await ac.get("/jobs/")
+            burst = [ac.get(f"/ai_smartjob/recommendations/Cand{i}?fresh=true") for i in range(1, 9)]
+            return await asyncio.gather(read_jobs_during_burst(), *burst)
+
+    try:
+        jobs_response, *responses = asyncio.run(scenario())
+    finally:
+        job_catalog.invalidate()
+        small_engine.dispose()
+
+    assert jobs_response.status_code == 200
+    statuses = sorted(response.status_code for response in responses)
+    assert statuses == [200] * 3 + [503] * 5
+
+def test_extract_skills_from_cv_endpoint_circuit_open(client: TestClient, mock_current_user: UserDB, mock_ai_recommender, mock_pdf_extractor):
+    _, _, mock_extract_skills = mock_ai_recommender
+    mock_extract_text = mock_pdf_extractor
+    mock_extract_text.return_value = "Python developer, Python and Docker"
+
+    dummy_pdf_content = b"%PDF-1.4 dummy"
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    with patch("src.fallback.ollama_circuit_breaker") as mock_breaker, patch("src.api.experiment_logger"):
+        mock_breaker.allow_request.return_value = False
+        response = client.post(
+            "/ai_smartjob/extract_skills_from_cv/",
+            files={"fichier_cv": ("cv.pdf", dummy_pdf_content, "application/pdf")}
+        )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["degraded"] is True
+    assert data["extracted_skills"][0] == {"skill": "Python", "score": 80}
+    assert response.headers["X-Degraded-Reason"] == "circuit_open"
+    mock_extract_skills.assert_not_called()
+
+    # Clear the override after the test
+    app.dependency_overrides.clear()
+
 # def test_get_recommendations_for_candidate_not_found(client: TestClient, mock_current_user: UserDB):
 #     # Override get_current_user for this test
 #     app.dependency_overrides[get_current_user] = lambda: mock_current_user
@@ -294,6 +500,9 @@ def test_recommend_jobs_from_cv(client: TestClient, db_session: Session, mock_cu
     assert data["career_recommendation_text"] == "Career advice text"
     mock_extract_text.assert_called_once_with(dummy_pdf_content)
     mock_get_ai_recs_cv.assert_called_once_with("Sample CV text", [{"id": 1, "title": "Dev", "company": "CompA", "location": "LocA", "description": "DescA"}])
+    # Per-stage timings of the request
+    stages = [metric.split(";")[0] for metric in response.headers["Server-Timing"].split(", ")]
+    assert stages == ["upload_read", "catalog_load", "total"]
 
     # Clear the override after the test
     app.dependency_overrides.clear()
@@ -461,3 +670,318 @@ def test_read_users_unauthenticated(client: TestClient):
     assert "detail" in response.json()
     assert response.json()["detail"] == "Not authenticated"
     # No app.dependency_overrides.clear() needed as no override was set
+
+def test_read_jobs_keyset_pagination(client: TestClient, db_session: Session, mock_current_user: UserDB):
+    db_session.add_all([JobDB(id=i, title=f"Job{i}", company="Comp", location="Loc", description="Desc") for i in range(1, 6)])
+    db_session.commit()
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    response = client.get("/jobs/?limit=2")
+    assert response.status_code == 200
+    assert [job["id"] for job in response.json()] == [1, 2]
+    assert response.headers["X-Total-Count"] == "5"
+    assert response.headers["X-Next-Cursor"] == "2"
+
+    response = client.get("/jobs/?limit=2&after_id=4&include_total=false")
+    assert [job["id"] for job in response.json()] == [5]
+    assert "X-Total-Count" not in response.headers
+    assert "X-Next-Cursor" not in response.headers
+
+    app.dependency_overrides.clear()
+
+def test_read_jobs_field_projection(client: TestClient, db_session: Session, mock_current_user: UserDB):
+    db_session.add(JobDB(id=1, title="Dev", company="CompA", location="LocA", description="A very long description"))
+    db_session.commit()
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    response = client.get("/jobs/?fields=title,company")
+    assert response.status_code == 200
+    assert response.json() == [{"id": 1, "title": "Dev", "company": "CompA"}]
+
+    response = client.get("/jobs/?fields=salary")
+    assert response.status_code == 400
+
+    app.dependency_overrides.clear()
+
+def test_read_jobs_etag_and_catalog_reload(client: TestClient, db_session: Session, mock_current_user: UserDB, monkeypatch):
+    db_session.add(JobDB(id=1, title="Dev", company="CompA", location="LocA", description="DescA"))
+    db_session.commit()
+    # Check the catalog signature on every request
+    monkeypatch.setattr(job_catalog, "check_interval", 0)
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    response = client.get("/jobs/")
+    etag = response.headers["ETag"]
+    response = client.get("/jobs/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    # Weak tags, tag lists and `*`, as sent by caches and proxies
+    for header in (f"W/{etag}", f'"other", {etag}', "*"):
+        assert client.get("/jobs/", headers={"If-None-Match": header}).status_code == 304
+
+    # Another page or projection is another representation
+    for url in ("/jobs/?after_id=1", "/jobs/?limit=1", "/jobs/?fields=title"):
+        response = client.get(url, headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["ETag"] != etag
+    second_page = client.get("/jobs/?after_id=1").headers["ETag"]
+    assert client.get("/jobs/?after_id=1", headers={"If-None-Match": second_page}).status_code == 304
+
+    # The ETL bumps the catalog version after rewriting a job
+    db_session.get(JobDB, 1).title = "Senior Dev"
+    db_session.add(CatalogVersionDB(id=1, version=1))
+    db_session.commit()
+
+    response = client.get("/jobs/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()[0]["title"] == "Senior Dev"
+
+    app.dependency_overrides.clear()
+
+def test_fast_json_endpoints_match_the_response_models(client: TestClient, db_session: Session, mock_current_user: UserDB, monkeypatch, tmp_path):
+    db_session.add_all([
+        JobDB(id=1, title="Dev", company="CompA", location="LocA", description="DescA"),
+        CandidateDB(id=1, nom="CandA", email="a@b.com", compétences="Python", expérience=3, localisation="Paris", secteur="IT"),
+        # Integer scores, declared `float` in the models
+        MatchDB(id=1, job_id=1, candidate_id=1, score=5),
+    ])
+    db_session.commit()
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    def assert_same_as_model(url, model):
+        body = client.get(url).json()
+        assert body
+        # Compared as JSON text: 5 == 5.0 in Python, but not on the wire
+        assert json.dumps(body) == json.dumps([model(**row).model_dump() for row in body])
+
+    for url, model in (("/jobs/", Job), ("/candidates/", Candidate), ("/matches/", Match),
+                       ("/candidates/1/top_matches", JobMatch), ("/jobs/1/top_candidates", CandidateMatch)):
+        assert_same_as_model(url, model)
+
+    # Same from the columnar snapshot
+    export_snapshot(engine, str(tmp_path))
+    monkeypatch.setattr("src.api.columnar_store", ColumnarStore(str(tmp_path)))
+    assert_same_as_model("/candidates/1/top_matches", JobMatch)
+    assert_same_as_model("/jobs/1/top_candidates", CandidateMatch)
+
+    app.dependency_overrides.clear()
+
+def test_export_matches_ndjson_and_candidates_csv(client: TestClient, db_session: Session, mock_current_user: UserDB):
+    job1 = JobDB(id=1, title="Dev", company="CompA", location="LocA", description="DescA")
+    candidate1 = CandidateDB(id=1, nom="CandA", email="a@b.com", compétences="Python, SQL", expérience=3, localisation="Paris", secteur="IT")
+    db_session.add_all([job1, candidate1, MatchDB(id=1, job_id=1, candidate_id=1, score=90), MatchDB(id=2, job_id=1, candidate_id=1, score=40)])
+    db_session.commit()
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    response = client.get("/export/matches?format=ndjson")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines == [{"id": 1, "job_id": 1, "candidate_id": 1, "score": 90}, {"id": 2, "job_id": 1, "candidate_id": 1, "score": 40}]
+
+    response = client.get("/export/candidates?format=csv")
+    assert response.status_code == 200
+    assert response.text.splitlines() == [
+        "id,nom,email,compétences,expérience,localisation,secteur",
+        '1,CandA,a@b.com,"Python, SQL",3,Paris,IT',
+    ]
+
+    assert client.get("/export/users").status_code == 404
+
+    app.dependency_overrides.clear()
+
+def test_get_current_user_caches_verified_credentials(client: TestClient, db_session: Session):
+    credential_cache.clear()
+
+    with patch("src.api.verify_password", wraps=verify_password) as mock_verify:
+        assert client.get("/jobs/", auth=("admin", "adminpassword")).status_code == 200
+        assert client.get("/jobs/", auth=("admin", "adminpassword")).status_code == 200
+        assert mock_verify.call_count == 1
+
+        # A wrong password is never served from the cache
+        assert client.get("/jobs/", auth=("admin", "wrongpassword")).status_code == 401
+
+        # Changing the password invalidates the cached entry
+        admin_user = db_session.query(UserDB).filter(UserDB.username == "admin").first()
+        admin_user.hashed_password = get_password_hash("newpassword")
+        db_session.commit()
+        assert client.get("/jobs/", auth=("admin", "adminpassword")).status_code == 401
+        assert client.get("/jobs/", auth=("admin", "newpassword")).status_code == 200
+
+    credential_cache.clear()
+
+def test_top_matches_for_candidate_and_job(client: TestClient, db_session: Session, mock_current_user: UserDB, monkeypatch, tmp_path):
+    db_session.add_all([JobDB(id=i, title=f"Job{i}", company="Comp", location="Loc", description="Desc") for i in range(1, 4)])
+    db_session.add_all([
+        CandidateDB(id=1, nom="CandA", email="a@b.com", compétences="Python", expérience=3, localisation="Paris", secteur="IT"),
+        CandidateDB(id=2, nom="CandB", email="b@b.com", compétences="SQL", expérience=5, localisation="Lyon", secteur="IT"),
+    ])
+    db_session.add_all([
+        MatchDB(id=1, job_id=1, candidate_id=1, score=40),
+        MatchDB(id=2, job_id=2, candidate_id=1, score=90),
+        MatchDB(id=3, job_id=3, candidate_id=1, score=70),
+        MatchDB(id=4, job_id=2, candidate_id=2, score=95),
+    ])
+    db_session.commit()
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    response = client.get("/candidates/1/top_matches?limit=2")
+    assert response.status_code == 200
+    assert [(job["id"], job["score"]) for job in response.json()] == [(2, 90), (3, 70)]
+
+    response = client.get("/jobs/2/top_candidates")
+    assert [(candidate["nom"], candidate["score"]) for candidate in response.json()] == [("CandB", 95), ("CandA", 90)]
+
+    assert client.get("/candidates/99/top_matches").status_code == 404
+
+    # Same rankings from the columnar snapshot of the ETL
+    export_snapshot(engine, str(tmp_path))
+    monkeypatch.setattr("src.api.columnar_store", ColumnarStore(str(tmp_path)))
+    response = client.get("/candidates/1/top_matches?limit=2")
+    assert response.headers["X-Match-Source"] == "columnar"
+    assert [(job["id"], job["title"], job["score"]) for job in response.json()] == [(2, "Job2", 90), (3, "Job3", 70)]
+    response = client.get("/jobs/2/top_candidates")
+    assert [(candidate["nom"], candidate["score"]) for candidate in response.json()] == [("CandB", 95), ("CandA", 90)]
+
+    # Candidates added since the export are ranked from the database
+    db_session.add(CandidateDB(id=3, nom="CandC", email="c@b.com", compétences="Java", expérience=1, localisation="Lille", secteur="IT"))
+    db_session.add(MatchDB(id=5, job_id=1, candidate_id=3, score=60))
+    db_session.commit()
+    response = client.get("/candidates/3/top_matches")
+    assert "X-Match-Source" not in response.headers
+    assert [(job["id"], job["score"]) for job in response.json()] == [(1, 60)]
+
+    app.dependency_overrides.clear()
+
+def wait_for_cv_job(client: TestClient, job_id: str):
+    for _ in range(100):
+        job = client.get(f"/ai_smartjob/jobs/{job_id}").json()
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"CV job {job_id} did not finish")
+
+def test_cv_job_submit_poll_and_result(client: TestClient, db_session: Session, mock_current_user: UserDB, mock_ai_recommender, mock_pdf_extractor, monkeypatch):
+    _, _, mock_extract_skills = mock_ai_recommender
+    mock_pdf_extractor.side_effect = lambda content: "" if content == b"%PDF-1.4 empty" else "Python developer"
+    mock_extract_skills.return_value = [{"skill": "Python", "score": 90}]
+
+    # Override get_current_user for this test
+    app.dependency_overrides[get_current_user] = lambda: mock_current_user
+
+    with patch("src.api.experiment_logger"):
+        response = client.post(
+            "/ai_smartjob/jobs/extract_skills_from_cv/",
+            files={"fichier_cv": ("cv.pdf", b"%PDF-1.4 dummy", "application/pdf")}
+        )
+        assert response.status_code == 202
+        job = wait_for_cv_job(client, response.json()["job_id"])
+        assert job["status"] == "done"
+        response = client.get(job["result_url"])
+        assert response.status_code == 200
+        assert response.json() == {"extracted_skills": [{"skill": "Python", "score": 90}], "degraded": False}
+
+        # A failure is reported with the status code of the synchronous endpoint
+        response = client.post(
+            "/ai_smartjob/jobs/extract_skills_from_cv/",
+            files={"fichier_cv": ("cv.pdf", b"%PDF-1.4 empty", "application/pdf")}
+        )
+        job = wait_for_cv_job(client, response.json()["job_id"])
+        assert job["status"] == "failed"
+        assert client.get(job["result_url"]).status_code == 400
+
+    # Jobs are only visible to their owner
+    app.dependency_overrides[get_current_user] = lambda: UserDB(id=3, username="other", hashed_password="x")
+    assert client.get(job["status_url"]).status_code == 404
+
+    app.dependency_overrides.clear()
+
+def test_cv_job_submit_does_not_block_the_event_loop(db_session: Session, mock_current_user: UserDB, monkeypatch):
+    write_started, release_write = threading.Event(), threading.Event()
+    submit = cv_job_queue.submit
+    def slow_submit(*args):
+        write_started.set()
+        release_write.wait(5)
+        return submit(*args)
+    monkeypatch.setattr(cv_job_queue, "submit", slow_submit)
+    monkeypatch.setitem(app.dependency_overrides, get_db, lambda: db_session)
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: mock_current_user)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as ac:
+            upload = asyncio.ensure_future(ac.post(
+                "/ai_smartjob/jobs/extract_skills_from_cv/",
+                files={"fichier_cv": ("cv.pdf", b"%PDF-1.4 dummy", "application/pdf")}
+            ))
+            try:
+                assert await asyncio.to_thread(write_started.wait, 5)
+                # Other requests are served while the upload is being written
+                root = await ac.get("/")
+                assert not upload.done()
+            finally:
+                release_write.set()
+            return root, await upload
+
+    root, upload = asyncio.run(scenario())
+    assert root.status_code == 200
+    assert upload.status_code == 202
+
+def test_cv_job_metrics_are_refreshed_while_the_queue_is_busy(db_session: Session):
+    async def slow_handler(db, cv_content, username):
+        await asyncio.sleep(0.1)
+        return {}
+    queue = CVJobQueue(CVJobDB, TestingSessionLocal, {"extract_skills": slow_handler}, workers=1, poll_interval=1, metrics_interval=0)
+    for _ in range(5):
+        queue.submit(db_session, "extract_skills", "testuser", b"%PDF-1.4")
+
+    async def sample_queue_length():
+        queue.start()
+        seen = []
+        try:
+            # The worker never goes idle until the queue is drained
+            while not seen or seen[-1] > 0:
+                await asyncio.sleep(0.02)
+                seen.append(REGISTRY.get_sample_value("cv_job_queue_length"))
+        finally:
+            await queue.stop()
+        return seen
+
+    seen = asyncio.run(asyncio.wait_for(sample_queue_length(), timeout=10))
+    assert {4, 3, 2, 1} <= set(seen)
+
+def test_admin_can_profile_a_request(client: TestClient, db_session: Session, monkeypatch, tmp_path):
+    monkeypatch.setattr(profile_store, "directory", str(tmp_path))
+    db_session.add(UserDB(username="testuser", hashed_password=get_password_hash("testpassword")))
+    db_session.commit()
+
+    # The flag is ignored for other users
+    response = client.get("/jobs/?profile=1", auth=("testuser", "testpassword"))
+    assert response.status_code == 200
+    assert "X-Profile-Id" not in response.headers
+    assert profile_store.list() == []
+
+    response = client.get("/jobs/", headers={"X-Profile": "1"}, auth=("admin", "adminpassword"))
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert profile_store.list() == [profile_id]
+
+    response = client.get(f"/profiles/{profile_id}", auth=("admin", "adminpassword"))
+    assert response.status_code == 200
+    assert response.text.startswith("# /jobs/\n")
+    response = client.get(f"/profiles/{profile_id}?format=collapsed", auth=("admin", "adminpassword"))
+    assert response.status_code == 200
+    assert client.get("/profiles/", auth=("testuser", "testpassword")).status_code == 403
+    assert client.get("/profiles/..%2Fapi", auth=("admin", "adminpassword")).status_code == 404
@@ -0,0 +1,79 @@
+import os
+import pytest
+from sqlalchemy import create_engine, event
+from src.api import Base, CandidateDB, JobDB, MatchDB
+from src.columnar_store import CURRENT_FILE, ColumnarStore, export_snapshot, load_snapshot
+
+pytest.importorskip("pyarrow")
+
+@pytest.fixture(name="engine")
+def engine_fixture(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'etl.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(JobDB.__table__.insert(), [
+            {"id": job_id, "title": f"Job{job_id}", "company": "Comp", "location": "Paris", "description": "Desc"}
+            for job_id in (1, 2, 3)
+        ])
+        connection.execute(CandidateDB.__table__.insert(), [
+            {"id": candidate_id, "nom": f"Cand{candidate_id}", "email": "c@example.org", "compétences": "Python",
+             "expérience": 2, "localisation": "Lyon", "secteur": "IT"}
+            for candidate_id in (10, 20, 30)
+        ])
+        connection.execute(MatchDB.__table__.insert(), [
+            {"job_id": 1, "candidate_id": 10, "score": 40},
+            {"job_id": 2, "candidate_id": 10, "score": 90},
+            {"job_id": 3, "candidate_id": 10, "score": 70},
+            {"job_id": 2, "candidate_id": 20, "score": 95},
+            {"job_id": 3, "candidate_id": 20, "score": None}, # Not scored
+            {"job_id": 99, "candidate_id": 20, "score": 80}, # Job no longer in the catalog
+        ])
+    return engine
+
+def test_export_and_rankings(engine, tmp_path):
+    directory = str(tmp_path / "columnar")
+    manifest = export_snapshot(engine, directory)
+    assert (manifest["jobs"], manifest["candidates"], manifest["pairs"]) == (3, 3, 4)
+
+    snapshot = load_snapshot(directory)
+    assert snapshot.version == manifest["version"]
+    assert [(job["id"], job["score"]) for job in snapshot.top_jobs(10, 2)] == [(2, 90), (3, 70)]
+    assert [(job["id"], job["score"]) for job in snapshot.top_jobs(20, 10)] == [(2, 95)]
+    assert snapshot.top_jobs(30, 10) == []
+    assert snapshot.top_jobs(40, 10) is None
+    assert [(candidate["nom"], candidate["score"]) for candidate in snapshot.top_candidates(2, 10)] == [("Cand20", 95), ("Cand10", 90)]
+
+    candidate_rows, job_rows, scores = snapshot.pairs()
+    assert sorted(zip(snapshot.candidate_ids[candidate_rows].tolist(), snapshot.job_ids[job_rows].tolist(), scores.tolist())) == [
+        (10, 1, 40.0), (10, 2, 90.0), (10, 3, 70.0), (20, 2, 95.0)
+    ]
+    assert snapshot.candidates.to_pandas()["nom"].tolist() == ["Cand10", "Cand20", "Cand30"]
+
+def test_export_streams_every_table(engine, tmp_path):
+    # Server-side cursors where the driver has them: no table is buffered whole
+    streamed = {}
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        table = statement.split(" FROM ")[1].split()[0]
+        streamed[table] = context.execution_options.get("stream_results", False)
+
+    export_snapshot(engine, str(tmp_path / "columnar"))
+    assert streamed == {"jobs": True, "candidates": True, "matches": True}
+
+def test_store_switches_to_a_new_export(engine, tmp_path):
+    directory = str(tmp_path / "columnar")
+    store = ColumnarStore(directory, check_interval=0)
+    assert store.get() is None
+
+    first = export_snapshot(engine, directory)
+    snapshot = store.get()
+    assert snapshot.version == first["version"]
+
+    with engine.begin() as connection:
+        connection.execute(MatchDB.__table__.insert(), [{"job_id": 1, "candidate_id": 30, "score": 55}])
+    second = export_snapshot(engine, directory)
+    assert store.get().version == second["version"]
+    assert [job["id"] for job in store.get().top_jobs(30, 10)] == [1]
+    # The previous snapshot is removed, but stays readable while mapped
+    assert sorted(os.listdir(directory)) == sorted([CURRENT_FILE, second["version"]])
+    assert [job["id"] for job in snapshot.top_jobs(10, 1)] == [2]
@@ -0,0 +1,32 @@
+from unittest.mock import MagicMock
+from src.experiment_log import ExperimentLogger
+
+def test_log_run_drops_entries_when_queue_is_full():
+    logger = ExperimentLogger(max_queue=2, flush_interval=60)
+    # Keep the background thread from draining the queue during the test
+    logger._ensure_started = lambda: None
+
+    assert logger.log_run(params={"a": 1})
+    assert logger.log_run(params={"a": 2})
+    assert not logger.log_run(params={"a": 3})
+
+def test_log_run_sampling():
+    logger = ExperimentLogger(sample_rate=0)
+    assert not logger.log_run(params={"a": 1})
+    assert logger._queue.qsize() == 0
+
+def test_background_thread_sends_runs_in_batch():
+    logger = ExperimentLogger(flush_interval=0.05, batch_size=10)
+    client = MagicMock()
+    logger._client = client
+
+    logger.log_run(params={"generation_profile": "deterministic"}, metrics={"num_extracted_skills": 3}, dicts={"skills.json": {"skills": []}})
+    logger.log_run(params={"generation_profile": "creative"})
+    logger.close()
+
+    assert client.create_run.call_count == 2
+    assert client.log_batch.call_count == 2
+    params = client.log_batch.call_args_list[0].kwargs["params"]
+    assert [(param.key, param.value) for param in params] == [("generation_profile", "deterministic")]
+    client.log_dict.assert_called_once()
+    assert client.set_terminated.call_count == 2
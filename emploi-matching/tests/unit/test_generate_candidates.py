@@ -0,0 +1,38 @@
+import pandas as pd
+import pytest
+from src.generate_candidates import MAX_SKILLS, MIN_SKILLS, SKILLS, generate_candidates_csv, iter_chunks, write_dataset
+
+def test_candidates_have_the_etl_columns_and_distinct_skills():
+    candidates = pd.concat(iter_chunks("candidates", 2500, seed=3, chunk_size=1000))
+    assert list(candidates.columns) == ["id", "nom", "email", "compétences", "expérience", "localisation", "secteur"]
+    assert candidates["id"].tolist() == list(range(1, 2501))
+    assert candidates["email"].is_unique
+    assert candidates["expérience"].between(0, 10).all()
+    for skills in candidates["compétences"]:
+        names = skills.split(", ")
+        assert MIN_SKILLS <= len(names) <= MAX_SKILLS
+        assert len(set(names)) == len(names)
+        assert set(names) <= set(SKILLS)
+
+def test_output_does_not_depend_on_the_number_of_workers(tmp_path):
+    single = tmp_path / "single.csv"
+    pooled = tmp_path / "pooled.csv"
+    assert write_dataset("jobs", 1200, str(single), seed=7, chunk_size=500, workers=1) == 1200
+    write_dataset("jobs", 1200, str(pooled), seed=7, chunk_size=500, workers=2)
+    assert single.read_bytes() == pooled.read_bytes()
+
+    jobs = pd.read_csv(single)
+    assert len(jobs) == 1200
+    assert list(jobs.columns) == ["id", "title", "company", "location", "description"]
+
+def test_parquet_output(tmp_path):
+    pytest.importorskip("pyarrow")
+    path = tmp_path / "candidats.parquet"
+    write_dataset("candidates", 1500, str(path), seed=1, chunk_size=1000, workers=1)
+    from_parquet = pd.read_parquet(path)
+    assert from_parquet.equals(pd.concat(iter_chunks("candidates", 1500, seed=1, chunk_size=1000), ignore_index=True))
+
+def test_generate_candidates_csv_keeps_its_defaults(tmp_path):
+    path = tmp_path / "data" / "candidats.csv"
+    generate_candidates_csv(path=str(path))
+    assert len(pd.read_csv(path)) == 10
@@ -0,0 +1,56 @@
+import io
+import json
+import logging
+from src.logging_config import SamplingFilter, configure_logging, get_logger, request_id_var, truncate
+
+def test_truncate_keeps_scalars_and_cuts_long_text():
+    assert truncate(42) == 42
+    assert truncate(None) is None
+    assert truncate("short", 10) == "short"
+    assert truncate("x" * 25, 10) == "x" * 10 + "... [15 more chars]"
+    assert truncate({"skill": "Python"}, 100) == "{'skill': 'Python'}"
+
+def test_json_lines_carry_request_id_and_extra_fields():
+    stream = io.StringIO()
+    configure_logging(level="DEBUG", log_format="json", stream=stream)
+    try:
+        token = request_id_var.set("req-1")
+        try:
+            get_logger("src.ai_recommender").debug("Ollama response", extra={"function": "matching", "response": "y" * 1000})
+        finally:
+            request_id_var.reset(token)
+    finally:
+        configure_logging()
+
+    entry = json.loads(stream.getvalue())
+    assert entry["level"] == "DEBUG"
+    assert entry["logger"] == "emploi.ai_recommender"
+    assert entry["msg"] == "Ollama response"
+    assert entry["request_id"] == "req-1"
+    assert entry["function"] == "matching"
+    assert entry["response"].endswith("... [700 more chars]")
+
+def test_disabled_levels_render_nothing():
+    class Expensive:
+        renders = 0
+        def __repr__(self):
+            Expensive.renders += 1
+            return "prompt"
+
+    stream = io.StringIO()
+    configure_logging(level="INFO", stream=stream)
+    try:
+        get_logger("src.matching").debug("Prompt built", extra={"prompt": Expensive()})
+    finally:
+        configure_logging()
+    assert stream.getvalue() == ""
+    assert Expensive.renders == 0
+
+def test_sampling_only_drops_debug_records():
+    sampling = SamplingFilter(rate=0)
+    def record(level):
+        return logging.LogRecord("emploi.test", level, __file__, 1, "message", (), None)
+    assert not sampling.filter(record(logging.DEBUG))
+    assert sampling.filter(record(logging.INFO))
+    assert sampling.filter(record(logging.ERROR))
+    assert SamplingFilter(rate=1).filter(record(logging.DEBUG))
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+import httpx
+import pytest
+import uvicorn
+from prometheus_client import REGISTRY
+
+from src import ollama_client
+from src.ai_recommender import get_ai_recommendations, get_ai_recommendations_async, extract_skills_with_scores_from_cv_async
+from src.fallback import call_with_fallback
+from src.mock_ollama import create_app, MockOllamaConfig, ScriptedResponse
+
+ALL_JOBS = [
+    {"id": 1, "title": "Dev", "company": "CompA", "location": "LocA", "description": "DescA"},
+    {"id": 2, "title": "QA", "company": "CompB", "location": "LocB", "description": "DescB"},
+]
+
+@pytest.fixture(name="mock_ollama")
+def mock_ollama_fixture(monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    app = create_app(MockOllamaConfig(seed=0))
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    url = f"http://127.0.0.1:{port}/api/generate"
+    monkeypatch.setattr("src.ollama_client.OLLAMA_API_URL", url)
+    ollama_client.clear_memo()
+    ollama_client.ollama_circuit_breaker.reset()
+    yield app.state.mock, f"http://127.0.0.1:{port}"
+
+    ollama_client.clear_memo()
+    ollama_client.ollama_circuit_breaker.reset()
+    server.should_exit = True
+    thread.join()
+
+def run_async(coroutine_function):
+    async def scenario():
+        try:
+            return await coroutine_function()
+        finally:
+            await ollama_client.close_async_client()
+    return asyncio.run(scenario())
+
+def test_recommendations_over_real_http(mock_ollama):
+    mock, _ = mock_ollama
+
+    assert get_ai_recommendations({"nom": "CandA"}, ALL_JOBS) == ALL_JOBS
+    assert run_async(lambda: extract_skills_with_scores_from_cv_async("Python"))[0] == {"skill": "Python", "score": 90}
+    assert mock.requests_served == 2
+
+    # The sync and async entry points share the memo of deterministic generations
+    assert run_async(lambda: get_ai_recommendations_async({"nom": "CandA"}, ALL_JOBS)) == ALL_JOBS
+    assert get_ai_recommendations({"nom": "CandA"}, ALL_JOBS) == ALL_JOBS
+    assert mock.requests_served == 2
+
+def test_scripted_response_latency_and_stats(mock_ollama):
+    mock, base_url = mock_ollama
+    mock.config.latency_ms = 50
+    mock.config.script = [ScriptedResponse(pattern="CandA", response="1. QA")]
+
+    started = time.perf_counter()
+    result = httpx.post(f"{base_url}/api/generate", json={"prompt": "CandA", "stream": False}).json()
+    assert time.perf_counter() - started >= 0.05
+    assert result["response"] == "1. QA"
+    assert result["eval_count"] == 2
+    assert result["done"] is True
+
+def test_streaming_generate_and_embeddings(mock_ollama):
+    _, base_url = mock_ollama
+
+    with httpx.stream("POST", f"{base_url}/api/generate", json={"prompt": "Job Title: Dev\n", "stream": True}) as response:
+        chunks = [json.loads(line) for line in response.iter_lines() if line]
+    assert "".join(chunk["response"] for chunk in chunks) == "1. Dev"
+    assert chunks[-1]["done"] is True and "eval_duration" in chunks[-1]
+
+    first = httpx.post(f"{base_url}/api/embeddings", json={"prompt": "Python"}).json()["embedding"]
+    second = httpx.post(f"{base_url}/api/embeddings", json={"prompt": "Python"}).json()["embedding"]
+    assert len(first) == 384 and first == second
+
+def test_injected_errors_feed_the_circuit_breaker(mock_ollama):
+    mock, _ = mock_ollama
+    mock.config.error_rate = 1.0
+
+    def recommend():
+        return call_with_fallback(
+            "recommendations",
+            lambda: get_ai_recommendations_async({"nom": "CandA"}, ALL_JOBS),
+            lambda: ["local"],
+        )
+
+    # Each failure is answered by the degraded fallback until the circuit opens
+    for _ in range(ollama_client.ollama_circuit_breaker.failure_threshold):
+        assert run_async(recommend) == (["local"], "error")
+    assert ollama_client.ollama_circuit_breaker.is_open
+    assert run_async(recommend) == (["local"], "circuit_open")
+    assert mock.requests_served == ollama_client.ollama_circuit_breaker.failure_threshold
+
+def test_generation_telemetry_is_exported(mock_ollama):
+    mock, _ = mock_ollama
+    mock.config.tokens_per_second = 1000
+    mock.config.script = [ScriptedResponse(pattern="'skill'", response="pas du JSON")]
+    labels = {"function": "extract_skills", "model": "mistral"}
+
+    def sample(name, **extra):
+        return REGISTRY.get_sample_value(name, {**labels, **extra}) or 0
+
+    generated_before = sample("llm_generated_tokens_count")
+    failures_before = sample("llm_parse_failures_total")
+    cache_hits_before = sample("llm_cache_hits_total")
+
+    # Deterministic profile: the second call is answered from the memo
+    assert run_async(lambda: extract_skills_with_scores_from_cv_async("Python")) == []
+    assert run_async(lambda: extract_skills_with_scores_from_cv_async("Python")) == []
+
+    assert sample("llm_generated_tokens_count") == generated_before + 1
+    assert sample("llm_tokens_per_second_count") >= 1
+    assert sample("llm_parse_failures_total") == failures_before + 2
+    assert sample("llm_cache_hits_total") == cache_hits_before + 1
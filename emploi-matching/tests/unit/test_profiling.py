@@ -0,0 +1,40 @@
+import threading
+import time
+from src.profiling import ProfileStore, SamplingProfiler, profiling_requested
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+def test_profiling_requested():
+    assert profiling_requested({"query_string": b"page=2&profile=1", "headers": []})
+    assert profiling_requested({"query_string": b"", "headers": [(b"x-profile", b"1")]})
+    assert not profiling_requested({"query_string": b"profile=0", "headers": [(b"accept", b"*/*")]})
+
+def test_sampling_profiler_sees_busy_threads():
+    profiler = SamplingProfiler(interval=0.001).start()
+    worker = threading.Thread(target=busy_loop, args=(0.1,), name="worker")
+    worker.start()
+    worker.join()
+    profiler.stop()
+
+    assert profiler.samples > 0
+    collapsed = profiler.collapsed()
+    assert any(line.startswith("worker;") and "busy_loop (test_profiling.py:" in line for line in collapsed.splitlines())
+    assert "busy_loop (test_profiling.py:" in profiler.call_tree()
+
+def test_profile_store_keeps_the_latest_profiles(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=2)
+    ids = []
+    for _ in range(3):
+        profiler = SamplingProfiler()
+        store.save(profiler, "/jobs/")
+        ids.append(profiler.id)
+        time.sleep(0.01)
+
+    assert store.list() == [ids[2], ids[1]]
+    assert len(list(tmp_path.iterdir())) == 4
+    assert store.path(ids[0]) is None
+    assert store.path(ids[2], "collapsed").endswith(".collapsed")
+    assert store.path("../emploi") is None
@@ -0,0 +1,23 @@
+import asyncio
+
+from src.singleflight import SingleFlight
+
+def test_single_flight_shares_one_call_between_concurrent_callers():
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["shared"]
+
+    async def scenario():
+        flights = SingleFlight("test")
+        results = await asyncio.gather(*[flights.do(("CandA", "v1"), generate) for _ in range(5)])
+        later = await flights.do(("CandA", "v1"), generate)
+        return results, later, len(flights)
+
+    results, later, inflight = asyncio.run(scenario())
+    assert results == [["shared"]] * 5
+    assert later == ["shared"]
+    assert len(calls) == 2
+    assert inflight == 0
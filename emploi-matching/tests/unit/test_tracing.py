@@ -0,0 +1,54 @@
+import asyncio
+import json
+from src.tracing import ChromeTraceExporter, span, start_trace, end_trace
+
+def test_span_is_a_no_op_outside_a_trace():
+    with span("parse"):
+        pass
+
+def test_spans_are_recorded_across_tasks_and_threads():
+    async def handle_request():
+        trace, token = start_trace("/ai_smartjob/recommend_from_cv/")
+        try:
+            with span("upload_read"):
+                await asyncio.sleep(0)
+            def extract():
+                with span("pdf_extract"):
+                    pass
+            await asyncio.to_thread(extract)
+            async def call_llm():
+                with span("ollama"):
+                    await asyncio.sleep(0.01)
+            await asyncio.wait_for(call_llm(), timeout=1)
+        finally:
+            end_trace(token)
+        return trace
+
+    trace = asyncio.run(handle_request())
+    durations = trace.stage_durations()
+    assert list(durations) == ["upload_read", "pdf_extract", "ollama"]
+    assert durations["ollama"] >= 0.01
+
+    header = trace.server_timing(0.5)
+    assert header.startswith("upload_read;dur=")
+    assert header.endswith("total;dur=500.0")
+
+def test_chrome_trace_export(tmp_path):
+    path = tmp_path / "trace.json"
+    exporter = ChromeTraceExporter(str(path))
+    for _ in range(2):
+        trace, token = start_trace("/jobs/")
+        with span("catalog_load"):
+            pass
+        end_trace(token)
+        # Queued from the request path, written by the exporter thread
+        assert exporter.submit(trace, "/jobs/", 0.002)
+    exporter.close()
+
+    content = path.read_text()
+    assert content.startswith("[\n")
+    # The closing bracket is optional in the format; add it to parse the file here
+    events = json.loads(content.rstrip().rstrip(",") + "]")
+    assert [event["name"] for event in events] == ["/jobs/", "catalog_load"] * 2
+    assert all(event["ph"] == "X" for event in events)
+    assert events[0]["tid"] != events[2]["tid"]